@@ -11,274 +11,265 @@ Analyzes Joe's writing style from processed emails:
 5. Common phrases and vocabulary
 6. Response patterns
 
-Usage: python3 analyze-style.py
+Usage:
+  python3 analyze-style.py
+  python3 analyze-style.py --phrase-counters 500000
+  python3 analyze-style.py --whole-words
+  python3 analyze-style.py --input output/new-emails.json --update
+  python3 analyze-style.py --workers 8
+  python3 analyze-style.py --input output/cleaned-emails.store
+  python3 analyze-style.py --profile
+  python3 analyze-style.py --index
+  python3 analyze-style.py --dedup
+  python3 analyze-style.py --categorizer output/categorizer.npz
+  python3 analyze-style.py --drift --drift-window 60
+  python3 analyze-style.py --top-recipients 50
 """
 
+import argparse
 import json
-import re
 import os
-from collections import Counter, defaultdict
+from collections import Counter
 from datetime import datetime
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Sequence, Set, Sized, Tuple
+
+from categorizer import default_categorizer
+from email_index import DEFAULT_INDEX_FILE, EmailIndex
+from email_store import EmailStore, is_email_store
+from indicators import style_indicator_scanner
+from near_duplicates import DEFAULT_THRESHOLD, NearDuplicateCollapser
+from phrase_mining import DEFAULT_MAX_COUNTERS
+from profiling import DEFAULT_SLOWEST, NO_STAGE, Profiler, trace_path
+from recipient_profiles import DEFAULT_TOP_RECIPIENTS, RecipientAccumulator
+from style_drift import DEFAULT_DRIFT_FILE, DEFAULT_HALF_LIFE_DAYS, DEFAULT_WINDOW_DAYS, DriftAccumulator
+from style_features import (
+    Accumulator,
+    CategoryAccumulator,
+    CharacteristicsAccumulator,
+    GreetingAccumulator,
+    PhraseAccumulator,
+    SignoffAccumulator,
+    ToneAccumulator,
+    default_accumulators,
+    extract_features,
+    extract_features_parallel,
+)
+from style_state import DEFAULT_STATE_FILE, email_key, load_state, save_state, state_settings
+
+DEFAULT_PROFILE_FILE = 'output/analyze-profile.json'
+
+# Written next to the style profile once the profile and index are both
+# up to date; style-service.py reloads when it changes
+GENERATION_SUFFIX = '.generation'
+
 
 class StyleAnalyzer:
-    def __init__(self, input_file='output/cleaned-emails.json', output_file='output/style-profile.json'):
+    def __init__(self, input_file='output/cleaned-emails.json', output_file='output/style-profile.json',
+                 phrase_counters: int = DEFAULT_MAX_COUNTERS, whole_words: bool = False,
+                 state_file: str = DEFAULT_STATE_FILE, update: bool = False,
+                 merge_states: Optional[List[str]] = None, from_state: bool = False,
+                 workers: int = 1, profile_file: Optional[str] = None,
+                 profile_slowest: int = DEFAULT_SLOWEST, index_file: Optional[str] = None,
+                 dedup: Optional[float] = None, categorizer_file: Optional[str] = None,
+                 drift_file: Optional[str] = None, drift_window_days: int = DEFAULT_WINDOW_DAYS,
+                 half_life_days: float = DEFAULT_HALF_LIFE_DAYS,
+                 top_recipients: int = DEFAULT_TOP_RECIPIENTS):
         self.input_file = input_file
         self.output_file = output_file
         self.training_output = 'output/training-data.txt'
         self.emails = []
-
-    def load_emails(self) -> List[Dict[str, Any]]:
-        """Load processed emails."""
+        # Memory cap for phrase mining, in counters (see phrase_mining.py)
+        self.phrase_counters = phrase_counters
+        # Match tone indicators as whole words only
+        self.whole_words = whole_words
+        # Scores emails per category: trained (train-categorizer.py) or keyword-seeded
+        self.categorizer = default_categorizer(categorizer_file)
+        # Raw statistics behind the profile (see style_state.py)
+        self.state_file = state_file
+        self.update = update
+        self.merge_states = merge_states or []
+        self.from_state = from_state
+        # Worker processes for feature extraction (1 = serial)
+        self.workers = workers
+        # Opt-in stage and per-email timings (profiling.py), saved to profile_file
+        self.profile_file = profile_file
+        self.profiler: Optional[Profiler] = Profiler(profile_slowest) if profile_file else None
+        # BM25 index of the emails for similar-email lookups (email_index.py)
+        self.index_file = index_file
+        # Similarity at which near-duplicates are collapsed before analysis (None = off)
+        self.dedup = dedup
+        # Weekly/monthly style time series (style_drift.py), saved to drift_file
+        self.drift_file = drift_file
+        self.drift_window_days = drift_window_days
+        self.half_life_days = half_life_days
+        # Individual profiles reported for this many of the most frequent recipients
+        self.top_recipients = top_recipients
+
+    def _stage(self, name: str):
+        """Time a stage if profiling, otherwise do nothing."""
+        return self.profiler.stage(name) if self.profiler is not None else NO_STAGE
+
+    def load_emails(self) -> Sequence[Dict[str, Any]]:
+        """Load processed emails.
+
+        A columnar store (process-emails.py --store) is memory-mapped rather
+        than read: emails are decoded one at a time as they are analyzed.
+        """
         if not os.path.exists(self.input_file):
             raise FileNotFoundError(f"Input file not found: {self.input_file}")
 
+        if is_email_store(self.input_file):
+            return EmailStore(self.input_file)
+
         with open(self.input_file, 'r', encoding='utf-8') as f:
             data = json.load(f)
 
         return data.get('emails', [])
 
+    def build_accumulators(self) -> List[Accumulator]:
+        """Accumulators for the single feature-extraction pass (extend to add analyses)."""
+        accumulators = default_accumulators(phrase_counters=self.phrase_counters,
+                                            categorizer=self.categorizer)
+        accumulators.append(RecipientAccumulator(self.top_recipients))
+        if self.drift_file:
+            accumulators.append(DriftAccumulator(self.drift_window_days, self.half_life_days))
+        return accumulators
+
+    def extract_features(self, accumulators: Optional[List[Accumulator]] = None,
+                         merge_after: Sequence[List[Accumulator]] = (),
+                         emails: Optional[Iterable[Dict[str, Any]]] = None,
+                         shard_size: Optional[int] = None) -> Dict[str, Any]:
+        """Visit every email once, feeding all accumulators; results by name.
+
+        `emails` default to self.emails and may be an iterator.
+        `accumulators` (default: a fresh build_accumulators()) may already
+        hold statistics from a saved state; `merge_after` (--merge-state)
+        are folded in after the emails. With workers > 1, shards of
+        `shard_size` emails are analyzed in a process pool and merged into
+        them.
+        """
+        if emails is None:
+            emails = self.emails
+        if accumulators is None:
+            accumulators = self.build_accumulators()
+        if self.workers > 1 and (not isinstance(emails, Sized) or len(emails) > 1):
+            return extract_features_parallel(emails, accumulators, self.build_accumulators,
+                                             self.workers, self.whole_words, self.profiler, merge_after,
+                                             shard_size)
+        return extract_features(emails, accumulators, style_indicator_scanner(self.whole_words),
+                                self.profiler, merge_after)
+
+    def _run_single(self, accumulator: Accumulator) -> Any:
+        scanner = style_indicator_scanner(self.whole_words)
+        return extract_features(self.emails, [accumulator], scanner)[accumulator.name]
+
     def analyze_greetings(self) -> Dict[str, Any]:
         """Analyze greeting patterns."""
-        greeting_patterns = [
-            (r'^Hi\s+\[Customer\],?', "Hi [Name],"),
-            (r'^Hello\s+\[Customer\],?', "Hello [Name],"),
-            (r'^Hey\s+\[Customer\],?', "Hey [Name],"),
-            (r'^Dear\s+\[Customer\],?', "Dear [Name],"),
-            (r'^\[Customer\],?', "[Name],"),
-            (r'^Good\s+(?:morning|afternoon|evening)\s+\[Customer\],?', "Good [time] [Name],"),
-        ]
-
-        greeting_counts = Counter()
-
-        for email in self.emails:
-            body = email['body']
-            # Check first 100 characters for greeting
-            first_line = body[:100].strip()
-
-            for pattern, label in greeting_patterns:
-                if re.search(pattern, first_line, re.IGNORECASE):
-                    greeting_counts[label] += 1
-                    break
-
-        total = sum(greeting_counts.values())
-
-        if total == 0:
-            return {
-                "most_common": "Hi [Name],",
-                "variations": [],
-                "usage_percentages": {}
-            }
-
-        # Calculate percentages
-        percentages = {
-            greeting: round((count / total) * 100, 2)
-            for greeting, count in greeting_counts.items()
-        }
-
-        return {
-            "most_common": greeting_counts.most_common(1)[0][0] if greeting_counts else "Hi [Name],",
-            "variations": [g for g, _ in greeting_counts.most_common()],
-            "usage_percentages": percentages,
-        }
+        return self._run_single(GreetingAccumulator())
 
     def analyze_signoffs(self) -> Dict[str, Any]:
         """Analyze sign-off patterns."""
-        signoff_patterns = [
-            (r'Thanks,?\s*(?:Joe|Joe Newman)', "Thanks,\nJoe"),
-            (r'Best,?\s*(?:Joe|Joe Newman)', "Best,\nJoe"),
-            (r'Best regards,?\s*(?:Joe|Joe Newman)', "Best regards,\nJoe"),
-            (r'Regards,?\s*(?:Joe|Joe Newman)', "Regards,\nJoe"),
-            (r'Sincerely,?\s*(?:Joe|Joe Newman)', "Sincerely,\nJoe"),
-            (r'Cheers,?\s*(?:Joe|Joe Newman)', "Cheers,\nJoe"),
-            (r'(?:^|\n)Joe(?:\s+Newman)?$', "Joe"),
-        ]
-
-        signoff_counts = Counter()
-
-        for email in self.emails:
-            body = email['body']
-            # Check last 150 characters for sign-off
-            last_part = body[-150:].strip()
-
-            for pattern, label in signoff_patterns:
-                if re.search(pattern, last_part, re.IGNORECASE | re.MULTILINE):
-                    signoff_counts[label] += 1
-                    break
-
-        total = sum(signoff_counts.values())
-
-        if total == 0:
-            return {
-                "most_common": "Thanks,\nJoe",
-                "variations": [],
-                "usage_percentages": {}
-            }
-
-        percentages = {
-            signoff: round((count / total) * 100, 2)
-            for signoff, count in signoff_counts.items()
-        }
-
-        return {
-            "most_common": signoff_counts.most_common(1)[0][0] if signoff_counts else "Thanks,\nJoe",
-            "variations": [s for s, _ in signoff_counts.most_common()],
-            "usage_percentages": percentages,
-        }
+        return self._run_single(SignoffAccumulator())
 
     def analyze_tone(self) -> Dict[str, Any]:
         """Analyze overall tone and formality."""
-        formal_indicators = [
-            'dear', 'sincerely', 'regards', 'please find', 'i am writing to',
-            'hereby', 'pursuant to', 'kindly', 'appreciate your', 'furthermore'
-        ]
-
-        friendly_indicators = [
-            'hey', 'thanks', 'great', 'awesome', 'love', 'excited',
-            'looking forward', '!', 'happy to', 'glad to'
-        ]
-
-        professional_indicators = [
-            'please', 'thank you', 'appreciate', 'per our discussion',
-            'as discussed', 'following up', 'wanted to', 'just checking'
-        ]
-
-        formal_count = 0
-        friendly_count = 0
-        professional_count = 0
-
-        for email in self.emails:
-            body_lower = email['body'].lower()
-
-            formal_count += sum(1 for ind in formal_indicators if ind in body_lower)
-            friendly_count += sum(1 for ind in friendly_indicators if ind in body_lower)
-            professional_count += sum(1 for ind in professional_indicators if ind in body_lower)
-
-        total_emails = len(self.emails)
-
-        # Calculate scores (0-10 scale)
-        formality_score = min(10, (formal_count / total_emails) * 2)
-        warmth_score = min(10, (friendly_count / total_emails) * 1.5)
-        professionalism_score = min(10, (professional_count / total_emails) * 1.5)
-
-        # Determine overall tone
-        if formality_score > 7:
-            overall_tone = "Formal"
-        elif warmth_score > 7:
-            overall_tone = "Friendly"
-        elif professionalism_score > 6:
-            overall_tone = "Professional-Friendly"
-        else:
-            overall_tone = "Casual-Professional"
-
-        return {
-            "overall_tone": overall_tone,
-            "formality_score": round(formality_score, 1),
-            "warmth_score": round(warmth_score, 1),
-            "professionalism_score": round(professionalism_score, 1),
-        }
+        return self._run_single(ToneAccumulator())
 
     def analyze_writing_characteristics(self) -> Dict[str, Any]:
         """Analyze sentence and paragraph structure."""
-        email_lengths = []
-        sentence_lengths = []
-        paragraph_lengths = []
-
-        for email in self.emails:
-            body = email['body']
-            words = body.split()
-            email_lengths.append(len(words))
-
-            # Count sentences (rough approximation)
-            sentences = re.split(r'[.!?]+', body)
-            sentences = [s.strip() for s in sentences if s.strip()]
-
-            for sentence in sentences:
-                sentence_lengths.append(len(sentence.split()))
-
-            # Count paragraphs
-            paragraphs = [p.strip() for p in body.split('\n\n') if p.strip()]
-            paragraph_lengths.append(len(paragraphs))
-
-        return {
-            "avg_email_length": round(sum(email_lengths) / len(email_lengths)) if email_lengths else 0,
-            "avg_sentence_length": round(sum(sentence_lengths) / len(sentence_lengths)) if sentence_lengths else 0,
-            "avg_paragraph_count": round(sum(paragraph_lengths) / len(paragraph_lengths), 1) if paragraph_lengths else 0,
-        }
+        return self._run_single(CharacteristicsAccumulator())
 
     def extract_common_phrases(self, min_length=3, max_length=8, top_n=15) -> List[str]:
-        """Extract commonly used phrases."""
-        phrase_counter = Counter()
-
-        for email in self.emails:
-            body = email['body'].lower()
-            # Remove punctuation for phrase extraction
-            body = re.sub(r'[^\w\s]', ' ', body)
-            words = body.split()
-
-            # Extract n-grams
-            for n in range(min_length, max_length + 1):
-                for i in range(len(words) - n + 1):
-                    phrase = ' '.join(words[i:i+n])
-                    # Skip if contains customer placeholder
-                    if '[customer]' not in phrase:
-                        phrase_counter[phrase] += 1
-
-        # Filter to phrases that appear at least 3 times
-        common_phrases = [
-            phrase for phrase, count in phrase_counter.most_common(top_n * 3)
-            if count >= 3
-        ]
-
-        return common_phrases[:top_n]
-
-    def categorize_emails(self) -> Dict[str, List[Dict[str, Any]]]:
-        """Categorize emails by type based on subject and content."""
-        categories = defaultdict(list)
-
-        quote_keywords = ['quote', 'pricing', 'price', 'cost', 'estimate']
-        delivery_keywords = ['delivery', 'schedule', 'ship', 'pickup']
-        order_keywords = ['order', 'purchase', 'buy', 'need']
-        question_keywords = ['question', 'wondering', 'inquiry', 'ask']
-
-        for email in self.emails:
-            subject_lower = email['subject'].lower()
-            body_lower = email['body'].lower()
-
-            if any(kw in subject_lower or kw in body_lower[:200] for kw in quote_keywords):
-                categories['quote_requests'].append(email)
-            elif any(kw in subject_lower or kw in body_lower[:200] for kw in delivery_keywords):
-                categories['delivery_scheduling'].append(email)
-            elif any(kw in subject_lower or kw in body_lower[:200] for kw in order_keywords):
-                categories['orders'].append(email)
-            elif any(kw in subject_lower or kw in body_lower[:200] for kw in question_keywords):
-                categories['questions'].append(email)
-            else:
-                categories['general'].append(email)
+        """Extract commonly used phrases (bounded memory, see phrase_mining.py)."""
+        return self._run_single(PhraseAccumulator(min_length, max_length, top_n, self.phrase_counters))
 
-        return categories
+    def categorize_emails(self) -> Dict[str, Dict[str, Any]]:
+        """Categorize emails by type based on subject and content (count, mentions, word total, samples)."""
+        return self._run_single(CategoryAccumulator(self.categorizer))
 
-    def analyze_response_patterns(self, categories: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    def analyze_response_patterns(self, categories: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
         """Analyze response patterns by email type."""
         patterns = {}
 
-        for category, emails in categories.items():
-            if not emails:
+        for category, summary in categories.items():
+            if not summary['count']:
                 continue
 
-            lengths = [email['wordCount'] for email in emails]
-            avg_length = round(sum(lengths) / len(lengths)) if lengths else 0
-
             patterns[category] = {
-                "count": len(emails),
-                "avg_length": avg_length,
-                "sample": emails[0]['body'][:200] + "..." if emails else ""
+                "count": summary['count'],
+                "mentions": summary['mentions'],
+                "avg_length": round(summary['word_total'] / summary['count']),
+                "sample": summary['samples'][0]['body'][:200] + "..." if summary['samples'] else ""
             }
 
         return patterns
 
-    def save_training_data(self, categories: Dict[str, List[Dict[str, Any]]]):
-        """Save representative samples for AI training."""
+    def state_settings(self) -> Dict[str, Any]:
+        """Settings saved states must share with this run (style_state.py)."""
+        return state_settings(self.whole_words, self.dedup, self.categorizer.fingerprint(),
+                              drift=bool(self.drift_file))
+
+    def load_saved_state(self, accumulators: List[Accumulator],
+                         seen: Set[str]) -> Tuple[int, List[List[Accumulator]]]:
+        """Seed the accumulators from the saved state (--update, --from-state).
+
+        The --merge-state states are loaded into accumulators of their own,
+        to be merged after the input emails. The keys of the emails all the
+        states cover are added to `seen`. Returns how many emails the states
+        cover, and the merge-state accumulators.
+        """
+        settings = self.state_settings()
+        total = 0
+
+        if self.update or self.from_state:
+            if os.path.exists(self.state_file):
+                total = load_state(self.state_file, accumulators, settings, seen)
+                print(f"📂 Loaded state for {total} emails from {self.state_file}")
+            elif self.from_state:
+                raise FileNotFoundError(f"State file not found: {self.state_file}")
+            else:
+                print(f"⚠️  No state at {self.state_file} yet; analyzing from scratch")
+
+        merged = []
+        for path in self.merge_states:
+            others = self.build_accumulators()
+            covered: Set[str] = set()
+            count = load_state(path, others, settings, covered)
+            if not seen.isdisjoint(covered):
+                raise ValueError(f"{path} covers emails already in another state; "
+                                 f"merged states must cover different emails")
+            seen.update(covered)
+            merged.append(others)
+            total += count
+            print(f"📂 Merging state for {count} emails from {path}")
+
+        return total, merged
+
+    @staticmethod
+    def unseen(emails: Iterable[Dict[str, Any]], seen: Set[str], keys: Set[str],
+               counts: Counter) -> Iterator[Dict[str, Any]]:
+        """Yield the emails the saved states (`seen`) do not cover yet.
+
+        Their keys are added to `keys`, to be saved with the state;
+        counts['emails'] and counts['skipped'] count what was yielded and
+        what was skipped.
+        """
+        for email in emails:
+            key = email_key(email)
+            if key in seen:
+                counts['skipped'] += 1
+                continue
+            keys.add(key)
+            counts['emails'] += 1
+            yield email
+
+    def save_training_data(self, categories: Dict[str, Dict[str, Any]]):
+        """Save representative samples for AI training.
+
+        The samples of each category are chosen for being typical of it and
+        different from each other (sample_selection.py), and are written
+        with their selection scores.
+        """
         os.makedirs(os.path.dirname(self.training_output), exist_ok=True)
 
         with open(self.training_output, 'w', encoding='utf-8') as f:
@@ -286,7 +277,8 @@ class StyleAnalyzer:
             f.write("# Generated: " + datetime.now().isoformat() + "\n\n")
             f.write("=" * 80 + "\n\n")
 
-            for category, emails in categories.items():
+            for category, summary in categories.items():
+                emails = summary['samples']
                 if not emails:
                     continue
 
@@ -298,79 +290,178 @@ class StyleAnalyzer:
                 for i, email in enumerate(emails[:5], 1):
                     f.write(f"--- Sample {i} ---\n")
                     f.write(f"Subject: {email['subject']}\n")
-                    f.write(f"Length: {email['wordCount']} words\n\n")
+                    f.write(f"Length: {email['wordCount']} words\n")
+                    selection = email.get('selection')
+                    if selection:
+                        f.write(f"Centrality: {selection['centrality']} "
+                                f"(coverage gain {selection['coverage_gain']})\n")
+                    f.write("\n")
                     f.write(email['body'])
                     f.write("\n\n")
 
         print(f"💾 Training samples saved to {self.training_output}")
 
-    def run(self):
-        """Run complete style analysis."""
+    def collapse_near_duplicates(self) -> List[Dict[str, Any]]:
+        """Collapse near-duplicate emails into weighted representatives (near_duplicates.py)."""
+        collapser = NearDuplicateCollapser(self.dedup).add_all(self.emails)
+        distinct = len(collapser.representatives)
+        print(f"🧬 {collapser.emails} emails collapsed to {distinct} distinct "
+              f"(similarity ≥ {self.dedup})\n")
+        return collapser.representatives
+
+    def save_drift(self, drift: Dict[str, Any]):
+        """Write the style time series and print how the current style compares."""
+        directory = os.path.dirname(self.drift_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_file = self.drift_file + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(dict(drift, generated_at=datetime.now().isoformat()), f, indent=2, ensure_ascii=False)
+        os.replace(temp_file, self.drift_file)
+
+        print(f"💾 Style drift saved to {self.drift_file} "
+              f"({len(drift['monthly'])} months, {len(drift['weekly'])} weeks)")
+        current = drift['current']
+        if current['emails']:
+            greeting = next(iter(current['greetings'].items()), ('none', 0))
+            signoff = next(iter(current['sign_offs'].items()), ('none', 0))
+            print(f"   Current style (half-life {drift['half_life_days']} days, "
+                  f"up to the week of {drift['latest_week']}):")
+            print(f"   Greeting {greeting[0]} ({greeting[1]}%), sign-off "
+                  f"{signoff[0].replace(chr(10), ' ')} ({signoff[1]}%), "
+                  f"{current['email_length']['mean']} words per email")
+
+    def mark_generation(self):
+        """Record that the profile and index written by this run belong together."""
+        marker = self.output_file + GENERATION_SUFFIX
+        temp_file = marker + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({'generated_at': datetime.now().isoformat(), 'index': self.index_file}, f)
+        os.replace(temp_file, marker)
+
+    def update_index(self):
+        """Add the emails not indexed yet to the similar-email index."""
+        index = EmailIndex(self.index_file)
+        try:
+            added = index.add(self.emails)
+        finally:
+            index.close()
+        print(f"💾 Similar-email index saved to {self.index_file} ({added} new, {len(index)} total)")
+
+    def run(self, emails: Optional[Iterable[Dict[str, Any]]] = None):
+        """Run complete style analysis.
+
+        `emails` are cleaned emails handed over by run-pipeline.py, analyzed
+        instead of reading the input file. They are fed to the accumulators
+        as they arrive, and only kept in memory for --dedup and --index,
+        which need them all.
+        """
         print("📊 Writing Style Analysis")
         print("=" * 50 + "\n")
 
         try:
-            # Load emails
-            print(f"📂 Reading {self.input_file}...")
-            self.emails = self.load_emails()
-            print(f"✅ Loaded {len(self.emails)} emails\n")
+            # Statistics from earlier runs, if updating
+            accumulators = self.build_accumulators()
+            seen: Set[str] = set()
+            previous_emails, merged = self.load_saved_state(accumulators, seen)
 
-            if len(self.emails) < 10:
-                print("⚠️  Warning: Less than 10 emails. Analysis may not be accurate.")
-                print("   Consider extracting more emails for better results.\n")
+            # Load emails
+            if emails is not None:
+                self.emails = emails
+                print("✅ Analyzing cleaned emails as they are processed\n")
+            elif not self.from_state:
+                print(f"📂 Reading {self.input_file}...")
+                with self._stage('load_emails'):
+                    self.emails = self.load_emails()
+                print(f"✅ Loaded {len(self.emails)} emails\n")
+
+            # Input emails the saved states already cover are skipped
+            new_keys: Set[str] = set()
+            counts = Counter()
+            stream = self.unseen(self.emails, seen, new_keys, counts)
+            shard_size = None
+            if self.dedup is not None or self.index_file:
+                self.emails = stream = list(stream)
+                if self.dedup is not None and self.emails:
+                    with self._stage('collapse_near_duplicates'):
+                        self.emails = stream = self.collapse_near_duplicates()
+            elif isinstance(self.emails, Sized):
+                # One shard per worker, as for a list
+                shard_size = -(-len(self.emails) // self.workers)
 
             print("🔍 Analyzing writing style...\n")
 
-            # Analyze components
-            print("   Analyzing greetings...")
-            greetings = self.analyze_greetings()
-
-            print("   Analyzing sign-offs...")
-            signoffs = self.analyze_signoffs()
-
-            print("   Analyzing tone...")
-            tone = self.analyze_tone()
-
-            print("   Analyzing writing characteristics...")
-            characteristics = self.analyze_writing_characteristics()
-
-            print("   Extracting common phrases...")
-            common_phrases = self.extract_common_phrases()
-
-            print("   Categorizing emails...")
-            categories = self.categorize_emails()
+            # All analyses share one pass over the emails
+            print("   Extracting greetings, sign-offs, tone, structure, phrases and categories...")
+            with self._stage('extract_features'):
+                features = self.extract_features(accumulators, merged, stream, shard_size)
+            seen.update(new_keys)
+            if counts['skipped']:
+                print(f"   Skipped {counts['skipped']} emails already in the saved state")
+
+            total_emails = previous_emails + counts['emails']
+            if total_emails < 10:
+                print("\n⚠️  Warning: Less than 10 emails. Analysis may not be accurate.")
+                print("   Consider extracting more emails for better results.")
+            greetings = features['greetings']
+            signoffs = features['signoffs']
+            tone = features['tone']
+            characteristics = features['characteristics']
+            common_phrases = features['common_phrases']
+            categories = features['categories']
 
             print("   Analyzing response patterns...")
-            response_patterns = self.analyze_response_patterns(categories)
+            with self._stage('analyze_response_patterns'):
+                response_patterns = self.analyze_response_patterns(categories)
 
             # Build style profile
             style_profile = {
                 "generated_at": datetime.now().isoformat(),
-                "total_emails_analyzed": len(self.emails),
+                "total_emails_analyzed": total_emails,
                 "greeting_patterns": greetings,
                 "sign_offs": signoffs,
                 "tone_analysis": tone,
                 "writing_characteristics": characteristics,
                 "common_phrases": common_phrases,
                 "response_patterns": response_patterns,
+                "recipient_profiles": features['recipients'],
             }
 
             # Save profile
-            os.makedirs(os.path.dirname(self.output_file), exist_ok=True)
-            with open(self.output_file, 'w', encoding='utf-8') as f:
-                json.dump(style_profile, f, indent=2, ensure_ascii=False)
+            with self._stage('save_outputs'):
+                directory = os.path.dirname(self.output_file)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                # Replaced atomically, so style-service.py never reads half a profile
+                temp_file = self.output_file + '.tmp'
+                with open(temp_file, 'w', encoding='utf-8') as f:
+                    json.dump(style_profile, f, indent=2, ensure_ascii=False)
+                os.replace(temp_file, self.output_file)
+
+                print(f"\n💾 Style profile saved to {self.output_file}")
+
+                save_state(self.state_file, accumulators, total_emails,
+                           self.state_settings(), seen)
+                print(f"💾 Profile state saved to {self.state_file}")
+
+                # Save training samples
+                self.save_training_data(categories)
+
+                if self.drift_file:
+                    self.save_drift(features['drift'])
 
-            print(f"\n💾 Style profile saved to {self.output_file}")
+            if self.index_file:
+                with self._stage('update_index'):
+                    self.update_index()
 
-            # Save training samples
-            self.save_training_data(categories)
+            self.mark_generation()
 
             # Print summary
             print("\n" + "=" * 50)
             print("📊 STYLE ANALYSIS SUMMARY")
             print("=" * 50 + "\n")
 
-            print(f"📧 Emails analyzed: {len(self.emails)}\n")
+            print(f"📧 Emails analyzed: {total_emails}\n")
 
             print("👋 Greeting:")
             print(f"   Most common: {greetings['most_common']}")
@@ -391,13 +482,29 @@ class StyleAnalyzer:
             print(f"   Professionalism: {tone['professionalism_score']}/10\n")
 
             print("✏️  Writing Style:")
-            print(f"   Avg email length: {characteristics['avg_email_length']} words")
-            print(f"   Avg sentence length: {characteristics['avg_sentence_length']} words")
+            email_length = characteristics['email_length']
+            sentence_length = characteristics['sentence_length']
+            print(f"   Avg email length: {characteristics['avg_email_length']} words "
+                  f"(median {email_length['p50']}, p90 {email_length['p90']})")
+            print(f"   Avg sentence length: {characteristics['avg_sentence_length']} words "
+                  f"(median {sentence_length['p50']}, p90 {sentence_length['p90']})")
             print(f"   Avg paragraphs: {characteristics['avg_paragraph_count']}\n")
 
             print("📂 Email Categories:")
             for category, pattern in response_patterns.items():
-                print(f"   {category.replace('_', ' ').title()}: {pattern['count']} emails")
+                print(f"   {category.replace('_', ' ').title()}: {pattern['count']} emails "
+                      f"(mentioned in {pattern['mentions']})")
+
+            recipient_profiles = features['recipients']
+            print(f"\n👥 Recipient profiles: {len(recipient_profiles['domains'])} domains, "
+                  f"{len(recipient_profiles['recipients'])} recipients "
+                  f"(of {recipient_profiles['recipients_tracked']} tracked)")
+
+            if self.profiler is not None:
+                self.profiler.finish()
+                self.profiler.print_summary()
+                self.profiler.save(self.profile_file)
+                print(f"   Saved to {self.profile_file} and {trace_path(self.profile_file)}")
 
             print("\n✅ Analysis complete!")
             print("\n📝 Next steps:")
@@ -410,6 +517,64 @@ class StyleAnalyzer:
             raise
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Analyze Joe's writing style from cleaned emails")
+    parser.add_argument('--input', '-i', default='output/cleaned-emails.json',
+                        help="Cleaned emails from process-emails.py")
+    parser.add_argument('--output', '-o', default='output/style-profile.json',
+                        help="Style profile output file")
+    parser.add_argument('--phrase-counters', type=int, default=DEFAULT_MAX_COUNTERS,
+                        help=f"Memory cap for phrase mining, in counters (default: {DEFAULT_MAX_COUNTERS})")
+    parser.add_argument('--state', default=DEFAULT_STATE_FILE,
+                        help=f"Profile state file, written on every run (default: {DEFAULT_STATE_FILE})")
+    parser.add_argument('--update', action='store_true',
+                        help="Add the input emails to the saved state instead of starting over")
+    parser.add_argument('--merge-state', action='append', default=[], metavar='PATH',
+                        help="Also fold in a state saved by another run (repeatable)")
+    parser.add_argument('--from-state', action='store_true',
+                        help="Rebuild the profile from the saved state without reading emails")
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                        help="Number of worker processes (default: 1, 0 = all cores)")
+    parser.add_argument('--whole-words', action='store_true',
+                        help="Match tone indicators as whole words "
+                             "(by default 'ask' also matches inside 'basket')")
+    parser.add_argument('--profile', nargs='?', const=DEFAULT_PROFILE_FILE, default=None, metavar='PATH',
+                        help=f"Record per-stage and per-email timings "
+                             f"(default path: {DEFAULT_PROFILE_FILE}, plus a Chrome trace)")
+    parser.add_argument('--profile-slowest', type=int, default=DEFAULT_SLOWEST, metavar='N',
+                        help=f"How many of the slowest emails to report (default: {DEFAULT_SLOWEST})")
+    parser.add_argument('--index', nargs='?', const=DEFAULT_INDEX_FILE, default=None, metavar='PATH',
+                        help=f"Add the emails to the similar-email index used by find-similar.py "
+                             f"(default path: {DEFAULT_INDEX_FILE})")
+    parser.add_argument('--dedup', nargs='?', type=float, const=DEFAULT_THRESHOLD, default=None,
+                        metavar='SIMILARITY',
+                        help=f"Analyze near-duplicate emails once, weighted by how many there are "
+                             f"(default similarity: {DEFAULT_THRESHOLD})")
+    parser.add_argument('--categorizer', default=None, metavar='PATH',
+                        help="Categorizer trained by train-categorizer.py "
+                             "(default: scores from the keyword lists in indicators.py)")
+    parser.add_argument('--top-recipients', type=int, default=DEFAULT_TOP_RECIPIENTS, metavar='N',
+                        help=f"Individual style profiles for the N most frequent recipients "
+                             f"(default: {DEFAULT_TOP_RECIPIENTS}; domains are always profiled)")
+    parser.add_argument('--drift', nargs='?', const=DEFAULT_DRIFT_FILE, default=None, metavar='PATH',
+                        help=f"Also write weekly, monthly and rolling style time series and a "
+                             f"recency-weighted profile (default path: {DEFAULT_DRIFT_FILE})")
+    parser.add_argument('--drift-window', type=int, default=DEFAULT_WINDOW_DAYS, metavar='DAYS',
+                        help=f"Rolling window for --drift (default: {DEFAULT_WINDOW_DAYS} days)")
+    parser.add_argument('--half-life', type=float, default=DEFAULT_HALF_LIFE_DAYS, metavar='DAYS',
+                        help=f"Age at which mail counts half in the current profile "
+                             f"(default: {DEFAULT_HALF_LIFE_DAYS} days)")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    analyzer = StyleAnalyzer()
+    args = parse_args()
+    analyzer = StyleAnalyzer(args.input, args.output, phrase_counters=args.phrase_counters,
+                             whole_words=args.whole_words, state_file=args.state, update=args.update,
+                             merge_states=args.merge_state, from_state=args.from_state,
+                             workers=args.workers or os.cpu_count() or 1,
+                             profile_file=args.profile, profile_slowest=args.profile_slowest,
+                             index_file=args.index, dedup=args.dedup, categorizer_file=args.categorizer,
+                             drift_file=args.drift, drift_window_days=args.drift_window,
+                             half_life_days=args.half_life, top_recipients=args.top_recipients)
     analyzer.run()
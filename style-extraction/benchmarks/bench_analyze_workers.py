@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark: serial vs. process-pool style analysis (and determinism check)
+
+Runs StyleAnalyzer.extract_features() serially and with --workers N on the
+same synthetic cleaned emails, and checks that every profile section
+(greetings, sign-offs, tone, characteristics with their percentiles,
+phrases, categories with their samples) comes out identical
+(tests/test_parallel_features.py checks the same on a smaller corpus).
+Exits with status 1 if anything differs.
+
+Usage: python3 benchmarks/bench_analyze_workers.py [--emails 20000] [--workers 2 4]
+"""
+
+import argparse
+import os
+import random
+import sys
+
+from common import best_of, load_script
+from bench_anonymize import SENTENCES
+
+GREETINGS = ["Hi [Customer],", "Hello [Customer],", "Hey [Customer],", "Good morning [Customer],", ""]
+SIGNOFFS = ["Thanks,\nJoe", "Best,\nJoe", "Best regards,\nJoe Newman", "Cheers,\nJoe", "Joe", ""]
+SUBJECTS = ["Quote for lumber", "Delivery schedule", "Your order", "Question about drywall", "Hello"]
+
+
+def make_emails(count: int, seed: int = 11):
+    """Cleaned-email records shaped like process-emails.py output."""
+    rng = random.Random(seed)
+    emails = []
+    for i in range(count):
+        paragraphs = [
+            ' '.join(rng.choice(SENTENCES) for _ in range(rng.randint(1, 5)))
+            for _ in range(rng.randint(1, 4))
+        ]
+        body = '\n\n'.join([rng.choice(GREETINGS)] + paragraphs + [rng.choice(SIGNOFFS)]).strip()
+        emails.append({
+            'id': f'email_{i}',
+            'subject': rng.choice(SUBJECTS),
+            'body': body,
+            'wordCount': len(body.split()),
+        })
+    return emails
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--emails', type=int, default=20000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, os.cpu_count() or 2])
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    analyze_style = load_script('analyze-style.py')
+    emails = make_emails(args.emails)
+
+    def analyze(workers):
+        analyzer = analyze_style.StyleAnalyzer(workers=workers)
+        analyzer.emails = emails
+        return analyzer.extract_features()
+
+    serial_time, expected = best_of(args.repeat, lambda: analyze(1))
+
+    print(f"📧 {args.emails} emails, {os.cpu_count()} cores\n")
+    print(f"   serial:     {serial_time:.2f}s")
+
+    identical = True
+    for workers in sorted(set(args.workers)):
+        elapsed, result = best_of(args.repeat, lambda: analyze(workers))
+        same = result == expected
+        identical = identical and same
+        print(f"   {workers} workers:  {elapsed:.2f}s  ({serial_time / elapsed:.1f}x)  identical: {same}")
+
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
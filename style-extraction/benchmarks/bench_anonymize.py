@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark: single-pass redaction vs. per-pattern findall + sub
+
+Compares EmailProcessor.anonymize_text (one compiled scanner) against the
+original implementation, which ran re.findall and re.sub once per pattern
+in PATTERNS. Prints throughput for both and how many outputs differ.
+
+Usage: python3 benchmarks/bench_anonymize.py [--emails 5000] [--repeat 3]
+"""
+
+import argparse
+import random
+import re
+
+from common import best_of, load_script
+
+
+SENTENCES = [
+    "Thanks for reaching out about the lumber order.",
+    "I can get you pricing on the 2x4s by Friday.",
+    "Let me know if you have any questions.",
+    "We will deliver to 1420 Oak Ridge Road on Tuesday morning.",
+    "You can reach me at 555-214-8890 or (555) 301-7720.",
+    "The total comes to $4,250.00 including delivery.",
+    "Please send the invoice to billing@contractor-example.com.",
+    "Your account # 88213344 is set up for net 30 terms.",
+    "The card ending 4111 1111 1111 1111 was declined.",
+    "The drywall is in stock and ready for pickup.",
+    "Per our discussion, the quote is good for 30 days.",
+    "Happy to help with anything else you need.",
+]
+
+
+def make_bodies(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    return [
+        ' '.join(rng.choice(SENTENCES) for _ in range(rng.randint(4, 20)))
+        for _ in range(count)
+    ]
+
+
+def legacy_anonymize(text, patterns, replacements, counts):
+    """The original per-pattern implementation, kept for comparison."""
+    anonymized = text
+    for pattern_name, pattern in patterns.items():
+        matches = re.findall(pattern, anonymized, re.IGNORECASE)
+        if matches:
+            counts[pattern_name] += len(matches)
+            replacement = replacements.get(pattern_name, '[removed]')
+            anonymized = re.sub(pattern, replacement, anonymized, flags=re.IGNORECASE)
+    return anonymized
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--emails', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    process_emails = load_script('process-emails.py')
+    bodies = make_bodies(args.emails)
+    total_mb = sum(len(b) for b in bodies) / 1e6
+
+    legacy_counts = {name: 0 for name in process_emails.PATTERNS}
+    legacy_time, legacy_out = best_of(args.repeat, lambda: [
+        legacy_anonymize(b, process_emails.PATTERNS, process_emails.REPLACEMENTS, legacy_counts)
+        for b in bodies
+    ])
+
+    processor = process_emails.EmailProcessor()
+    engine_time, engine_out = best_of(args.repeat, lambda: [
+        processor.anonymize_text(b) for b in bodies
+    ])
+
+    differing = sum(1 for a, b in zip(legacy_out, engine_out) if a != b)
+
+    print(f"📧 {args.emails} emails, {total_mb:.1f} MB of text (best of {args.repeat})\n")
+    print(f"   per-pattern findall+sub: {legacy_time:.3f}s  ({args.emails / legacy_time:,.0f} emails/s)")
+    print(f"   single-pass scanner:     {engine_time:.3f}s  ({args.emails / engine_time:,.0f} emails/s)")
+    print(f"   speedup: {legacy_time / engine_time:.1f}x")
+    print(f"   outputs differing: {differing}/{args.emails}")
+
+
+if __name__ == "__main__":
+    main()
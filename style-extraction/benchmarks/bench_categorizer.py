@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark: batch hashed-feature categorizer vs. first keyword hit
+
+Categorizes synthetic cleaned emails (bench_analyze_workers.make_emails)
+two ways:
+
+- the original rule: scan the subject and body for every category's
+  keywords, one email at a time, and take the first category in list
+  order with a hit (so "quote" always beats "delivery")
+- categorizer.HashedCategorizer: vectorize the whole batch into one sparse
+  matrix and score every category with one matrix product
+
+Reports the time of each, how often they pick the same category, and how
+many emails score for more than one category (which the first-hit rule
+cannot show).
+
+Usage: python3 benchmarks/bench_categorizer.py [--emails 100000]
+"""
+
+import argparse
+from collections import Counter
+
+from common import best_of
+from bench_analyze_workers import make_emails
+from categorizer import GENERAL, HashedCategorizer, email_text
+from indicators import CATEGORY_KEYWORDS, IndicatorScanner
+
+
+def first_hit(emails, body_chars=200):
+    scanner = IndicatorScanner(CATEGORY_KEYWORDS)
+    order = [category for category, _ in CATEGORY_KEYWORDS]
+    categories = []
+    for email in emails:
+        in_subject = scanner.scan(email['subject'].lower())
+        in_body = scanner.scan(email['body'].lower())
+        for category in order:
+            if category in in_subject or any(end <= body_chars for end in in_body.get(category, {}).values()):
+                categories.append(category)
+                break
+        else:
+            categories.append(GENERAL)
+    return categories
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--emails', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    emails = make_emails(args.emails)
+    categorizer = HashedCategorizer.from_keywords()
+
+    hit_time, expected = best_of(args.repeat, lambda: first_hit(emails))
+    batch_time, scores = best_of(args.repeat, lambda: categorizer.scores(map(email_text, emails)))
+    best = categorizer.best(scores)
+
+    general = categorizer.categories.index(GENERAL)
+    topics = (scores > scores[:, general:general + 1]).sum(axis=1)
+    same = sum(a == b for a, b in zip(expected, best))
+
+    print(f"📧 {args.emails} emails\n")
+    print(f"   first keyword hit:   {hit_time:.2f}s")
+    print(f"   batch categorizer:   {batch_time:.2f}s  ({args.emails / batch_time:,.0f} emails/s)")
+    print(f"\n   same category: {same / len(best):.1%}; "
+          f"scoring for 2+ categories: {(topics >= 2).mean():.1%}")
+    print(f"   first hit: {dict(Counter(expected).most_common())}")
+    print(f"   batch:     {dict(Counter(best).most_common())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark: near-duplicate collapsing before style analysis
+
+Builds synthetic cleaned emails (bench_analyze_workers.make_emails) and
+mixes in copies of a few "templates", each with up to --edits words
+changed, the way templated mail looks after anonymization. Then:
+
+- times collapse_near_duplicates() and the style analysis with and
+  without it
+- compares collapsed emails with their representative by exact Jaccard
+  similarity of word shingles, and for the first --check emails finds
+  every earlier email at or above the threshold by brute force, to count
+  the near-duplicates that were missed
+- checks that the weighted profile still counts every email
+
+Usage: python3 benchmarks/bench_dedup.py [--emails 5000] [--copies 15000] [--templates 20]
+       [--edits 1] [--threshold 0.8] [--check 2000]
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from common import load_script
+from bench_analyze_workers import make_emails
+from near_duplicates import DEFAULT_THRESHOLD, NearDuplicateCollapser
+from phrase_mining import tokenize
+
+EDIT_WORDS = ['Friday', 'Monday', 'tomorrow', '2x4', 'drywall', 'PVC', '$[amount]']
+
+
+def templated(emails, copies, templates, edits, seed=5):
+    rng = random.Random(seed)
+    bases = rng.sample(emails, templates)
+    corpus = list(emails)
+    for i in range(copies):
+        base = rng.choice(bases)
+        words = base['body'].split(' ')
+        for _ in range(rng.randint(0, edits)):
+            words[rng.randrange(len(words))] = rng.choice(EDIT_WORDS)
+        body = ' '.join(words)
+        corpus.insert(rng.randrange(len(corpus) + 1),
+                      dict(base, id=f'copy_{i}', body=body, wordCount=len(body.split())))
+    return corpus
+
+
+def shingles(body):
+    words = tokenize(body.lower())
+    return set(zip(words, words[1:], words[2:])) or {tuple(words)}
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--emails', type=int, default=5000)
+    parser.add_argument('--copies', type=int, default=15000)
+    parser.add_argument('--templates', type=int, default=20)
+    parser.add_argument('--edits', type=int, default=1, help="Most words changed per copy")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--check', type=int, default=2000, help="Emails checked by brute force")
+    args = parser.parse_args()
+
+    analyze_style = load_script('analyze-style.py')
+    corpus = templated(make_emails(args.emails), args.copies, args.templates, args.edits)
+
+    started = time.perf_counter()
+    collapser = NearDuplicateCollapser(args.threshold)
+    clusters = [collapser.add(email) for email in corpus]
+    collapse_time = time.perf_counter() - started
+    representatives = collapser.representatives
+
+    def analyze(emails):
+        analyzer = analyze_style.StyleAnalyzer()
+        analyzer.emails = emails
+        began = time.perf_counter()
+        features = analyzer.extract_features()
+        return time.perf_counter() - began, features
+
+    full_time, full = analyze(corpus)
+    collapsed_time, collapsed = analyze(representatives)
+
+    print(f"📧 {len(corpus)} emails ({args.copies} templated copies), threshold {args.threshold}\n")
+    print(f"   collapse:          {collapse_time:.2f}s  "
+          f"({collapse_time / len(corpus) * 1e6:.0f} µs/email) → {len(representatives)} distinct")
+    print(f"   analysis, all:     {full_time:.2f}s")
+    print(f"   analysis, deduped: {collapsed_time:.2f}s  (total {collapse_time + collapsed_time:.2f}s, "
+          f"{full_time / (collapse_time + collapsed_time):.1f}x)")
+
+    # Quality against exact shingle similarity
+    first = {}
+    for i, cluster in enumerate(clusters):
+        first.setdefault(cluster, i)
+    sets = [shingles(email['body']) for email in corpus[:args.check]]
+    merged = [jaccard(sets[i], sets[first[cluster]])
+              for i, cluster in enumerate(clusters[:args.check]) if first[cluster] != i]
+    missed = 0
+    for i in range(len(sets)):
+        if first[clusters[i]] == i and any(jaccard(sets[i], sets[j]) >= args.threshold for j in range(i)):
+            missed += 1
+
+    print(f"\n   first {len(sets)} emails: {len(merged)} collapsed, exact similarity to their "
+          f"representative min {min(merged, default=1):.2f}, mean {sum(merged) / max(len(merged), 1):.2f}; "
+          f"{missed} with an earlier match ≥ {args.threshold} kept apart")
+
+    counted = collapsed['categories']
+    total = sum(summary['count'] for summary in counted.values())
+    print(f"   emails counted by the weighted categories: {total} of {len(corpus)}")
+    print(f"   top phrases, all:     {full['common_phrases'][:3]}")
+    print(f"   top phrases, deduped: {collapsed['common_phrases'][:3]}")
+
+    if total != len(corpus):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
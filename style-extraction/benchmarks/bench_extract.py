@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark: sequential vs. concurrent extraction against the Graph stub
+
+Starts graph_stub.py in-process with per-request latency and some 429
+throttling, then extracts the whole mailbox with extract-emails.py's
+MailboxExtractor: once one window at a time (the extract-emails.js
+paging pattern) and then with several windows in flight. Checks that
+both return the same emails (in arrival order, so possibly in another
+order, numbered 1, 2, 3, ...) and that no more requests were in flight
+than allowed. Exits with status 1 if not.
+
+Usage: python3 benchmarks/bench_extract.py [--emails 20000] [--latency 0.05] [--throttle 0.02]
+       [--windows 16] [--concurrency 2 4 8]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from common import load_script
+from graph_stub import GraphStub
+
+
+def start_stub(stub: GraphStub):
+    """Run the stub's server in a background thread."""
+    ready = threading.Event()
+
+    def run():
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(stub.start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, name='graph-stub', daemon=True).start()
+    ready.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--emails', type=int, default=20000)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--throttle', type=float, default=0.02)
+    parser.add_argument('--windows', type=int, default=16)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[2, 4, 8])
+    args = parser.parse_args()
+
+    extract_emails = load_script('extract-emails.py')
+    stub = GraphStub(args.emails, latency=args.latency, throttle=args.throttle)
+    start_stub(stub)
+
+    oldest, newest = stub.date_range()
+    start = datetime.fromisoformat(oldest.replace('Z', '+00:00'))
+    end = datetime.fromisoformat(newest.replace('Z', '+00:00')) + timedelta(seconds=1)
+
+    def content(emails):
+        # Pages interleave across windows, so only the order and ids differ
+        return sorted((email['sentDate'], json.dumps(dict(email, id=None), sort_keys=True)) for email in emails)
+
+    def extract(windows, concurrency):
+        stub.max_in_flight = 0
+        extractor = extract_emails.MailboxExtractor('stub', start, end, base_url=f"{stub.base_url}/v1.0",
+                                                    windows=windows, concurrency=concurrency)
+        began = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            emails = list(extractor.emails())
+        return time.perf_counter() - began, emails, extractor.client
+
+    print(f"📧 {args.emails} emails, {args.latency * 1000:.0f} ms per request, "
+          f"{args.throttle:.0%} throttled\n")
+    ok = True
+    baseline_time, emails, client = extract(1, 1)
+    expected = content(emails)
+    print(f"   sequential          {baseline_time:6.2f}s   {client.requests} requests, {client.retries} retried")
+
+    for concurrency in args.concurrency:
+        seconds, emails, client = extract(args.windows, concurrency)
+        numbered = [email['id'] for email in emails] == list(range(1, len(emails) + 1))
+        same = numbered and content(emails) == expected
+        bounded = stub.max_in_flight <= concurrency
+        ok = ok and same and bounded and len(emails) == args.emails
+        print(f"   {concurrency} of {args.windows} windows    {seconds:6.2f}s   "
+              f"({baseline_time / seconds:.1f}x)   {client.requests} requests over "
+              f"{client.connections_opened} connections, {client.retries} retried, "
+              f"max in flight {stub.max_in_flight}   identical: {same}")
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark: similar-email index (email_index.py) build and query latency
+
+Indexes seeded synthetic emails (plain text, no quotes, so they need no
+cleaning), then reports build, incremental update, save and load times and
+query latency for queries made from held-out emails. Each query's results
+are also checked against exhaustive BM25 scoring of every posting: the
+scores must be the same, and so must the emails, except among equal
+scores. Exits with status 1 if any query differs.
+
+Usage: python3 benchmarks/bench_index.py [--emails 100000] [--queries 200] [-k 5]
+"""
+
+import argparse
+import heapq
+import json
+import os
+import sys
+import tempfile
+import time
+
+from common import best_of
+from email_index import EmailIndex, terms
+from synthetic_mailbox import MailboxGenerator
+
+
+def exact_top(index: EmailIndex, subject: str, body: str, k: int):
+    """(doc, score) of the exact top k, reading every posting."""
+    scores = {}
+    for term in set(terms(subject) + terms(body)):
+        term_id = index.term_ids.get(term)
+        if term_id is None:
+            continue
+        postings = index.postings[term_id]
+        idf = index.idf(term_id)
+        for doc, weight in zip(postings.docs, postings.weights):
+            scores[doc] = scores.get(doc, 0.0) + idf * weight
+    return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--emails', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('-k', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    generator = MailboxGenerator(args.seed, html_ratio=0, reply_ratio=0)
+    emails = list(generator.emails(args.emails + args.queries))
+    emails, queries = emails[:args.emails], emails[args.emails:]
+    first, rest = emails[:args.emails * 9 // 10], emails[args.emails * 9 // 10:]
+
+    print(f"📧 {args.emails} emails, {len(queries)} queries, k={args.k}\n")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'email-index.sqlite')
+
+        index = EmailIndex(path)
+        build_time, _ = best_of(1, lambda: index.add(first))
+        save_time, _ = best_of(1, index.save)
+        update_time, _ = best_of(1, lambda: index.add(rest))
+        update_save_time, _ = best_of(1, index.close)
+        print(f"   build {len(first)}: {build_time:.2f}s + save {save_time:.2f}s   "
+              f"add {len(rest)}: {update_time:.2f}s + save {update_save_time:.2f}s   "
+              f"({os.path.getsize(path) / 1e6:.1f} MB)")
+
+        load_time, index = best_of(1, lambda: EmailIndex(path))
+        print(f"   load: {load_time:.2f}s ({len(index.postings)} terms)")
+
+        latencies = []
+        differing = 0
+        for query in queries:
+            start = time.perf_counter()
+            results = index.search(query['subject'], query['body'], args.k)
+            latencies.append(time.perf_counter() - start)
+
+            exact = exact_top(index, query['subject'], query['body'], args.k)
+            scores = [result['score'] for result in results]
+            exact_scores = [round(score, 4) for _, score in exact]
+            # Emails tied with the k-th best score may stand in for each other
+            expected = {doc for doc, score in exact if round(score, 4) != exact_scores[-1]}
+            found = {index._id_docs[json.dumps(result['id'])] for result in results}
+            differing += scores != exact_scores or not expected <= found
+        index.close()
+
+    latencies.sort()
+    count = len(latencies)
+    print(f"   query: median {latencies[count // 2] * 1000:.2f} ms, "
+          f"p95 {latencies[int(count * 0.95)] * 1000:.2f} ms, max {latencies[-1] * 1000:.2f} ms")
+    print(f"   vs. exhaustive: {count - differing}/{count} queries identical")
+    if differing:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark: bounded-memory phrase mining vs. exact n-gram Counter
+
+Compares StyleAnalyzer.extract_common_phrases (interned words, packed word-id
+keys, Space-Saving counters) against the original implementation, which
+put every 3- to 8-gram into one Counter as a joined string. Reports time,
+peak traced memory and whether the top phrases agree.
+
+Usage: python3 benchmarks/bench_phrases.py [--emails 2000] [--counters 200000]
+"""
+
+import argparse
+import random
+import re
+import time
+import tracemalloc
+from collections import Counter
+
+from common import load_script
+
+WORDS = (
+    "the a to and for of on in your we you it is be can will order delivery "
+    "lumber drywall quote pricing truck friday monday pickup yard job site "
+    "thanks please let me know if have any questions happy help sheets studs"
+).split()
+
+PHRASES = [
+    "let me know if you have any questions",
+    "thanks for reaching out",
+    "happy to help with anything else",
+    "we can deliver on friday",
+    "please find the quote attached",
+    "looking forward to working with you",
+]
+
+
+def make_emails(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    emails = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(3, 10)):
+            if rng.random() < 0.3:
+                parts.append(rng.choice(PHRASES))
+            else:
+                parts.append(' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 15))))
+        emails.append({'subject': '', 'body': '. '.join(parts) + '.'})
+    return emails
+
+
+def exact_common_phrases(emails, min_length=3, max_length=8, top_n=15):
+    """The original Counter-of-strings implementation, kept for comparison."""
+    phrase_counter = Counter()
+    for email in emails:
+        body = re.sub(r'[^\w\s]', ' ', email['body'].lower())
+        words = body.split()
+        for n in range(min_length, max_length + 1):
+            for i in range(len(words) - n + 1):
+                phrase = ' '.join(words[i:i + n])
+                if '[customer]' not in phrase:
+                    phrase_counter[phrase] += 1
+    common = [p for p, c in phrase_counter.most_common(top_n * 3) if c >= 3]
+    return common[:top_n]
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--emails', type=int, default=2000)
+    parser.add_argument('--counters', type=int, default=200_000)
+    args = parser.parse_args()
+
+    analyze_style = load_script('analyze-style.py')
+    emails = make_emails(args.emails)
+
+    analyzer = analyze_style.StyleAnalyzer(phrase_counters=args.counters)
+    analyzer.emails = emails
+
+    exact_time, exact_peak, exact = measure(lambda: exact_common_phrases(emails))
+    mined_time, mined_peak, mined = measure(analyzer.extract_common_phrases)
+
+    print(f"📧 {args.emails} emails, {args.counters:,} counters\n")
+    print(f"   exact Counter:  {exact_time:.2f}s, peak {exact_peak / 1e6:.1f} MB")
+    print(f"   phrase miner:   {mined_time:.2f}s, peak {mined_peak / 1e6:.1f} MB")
+    print(f"   same top phrases: {exact == mined}")
+    if exact != mined:
+        overlap = len(set(exact) & set(mined))
+        print(f"   overlap: {overlap}/{len(exact)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark: cleaned-emails.json vs. the memory-mapped columnar store
+
+Writes the same synthetic cleaned emails as JSON and as email_store files
+(with and without pre-tokenized bodies), then for each compares load time,
+full style-analysis time and peak Python heap use (tracemalloc; pages of
+the mapped file are OS page cache and not counted), and checks that every
+profile section comes out identical. Exits with status 1 if they differ.
+
+Usage: python3 benchmarks/bench_store.py [--emails 20000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from common import best_of, load_script
+from bench_analyze_workers import make_emails
+from email_store import EmailStoreWriter
+
+
+def write_inputs(emails, directory):
+    json_path = os.path.join(directory, 'cleaned-emails.json')
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump({'emails': emails}, f, indent=2, ensure_ascii=False)
+
+    paths = {'json': json_path}
+    for name, tokens in (('store', False), ('store+tokens', True)):
+        paths[name] = os.path.join(directory, f'{name}.store')
+        with EmailStoreWriter(paths[name], tokens=tokens) as writer:
+            for email in emails:
+                writer.write(email)
+    return paths
+
+
+def peak_heap(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--emails', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    analyze_style = load_script('analyze-style.py')
+    emails = make_emails(args.emails)
+    for i, email in enumerate(emails):
+        email['sentDate'] = f'2024-01-{i % 28 + 1:02d}T09:00:00Z'
+        email['originalWordCount'] = email['wordCount']
+
+    def load(path):
+        analyzer = analyze_style.StyleAnalyzer(input_file=path)
+        analyzer.emails = analyzer.load_emails()
+        return analyzer
+
+    def analyze(path):
+        return load(path).extract_features()
+
+    print(f"📧 {args.emails} emails\n")
+    identical = True
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_inputs(emails, directory)
+        expected = None
+        for name, path in paths.items():
+            load_time, _ = best_of(args.repeat, lambda: load(path))
+            analyze_time, result = best_of(args.repeat, lambda: analyze(path))
+            load_peak = peak_heap(lambda: load(path))
+            analyze_peak = peak_heap(lambda: analyze(path))
+
+            if expected is None:
+                expected = result
+            same = result == expected
+            identical = identical and same
+
+            print(f"   {name:13s} {os.path.getsize(path) / 1e6:6.1f} MB   "
+                  f"load {load_time:.3f}s ({load_peak / 1e6:6.1f} MB heap)   "
+                  f"load+analyze {analyze_time:.2f}s ({analyze_peak / 1e6:6.1f} MB heap)   "
+                  f"identical: {same}")
+
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
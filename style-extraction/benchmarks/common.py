@@ -0,0 +1,38 @@
+"""Shared helpers for the benchmark scripts."""
+
+import importlib.util
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.dirname(HERE)
+
+# Make the style-extraction modules importable from the benchmarks
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+
+def load_script(name: str):
+    """Import a hyphenated script (e.g. process-emails.py) as a module."""
+    module_name = name[:-3].replace('-', '_')
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    path = os.path.join(SCRIPTS_DIR, name)
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def best_of(repeat, func):
+    """Run func `repeat` times; return the fastest time and the last result."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+
+"""
+Local stub of the Graph Sent Items API
+
+Serves a seeded synthetic mailbox (synthetic_mailbox.py) over HTTP with
+the same paging contract extract-emails.py relies on:
+
+  GET /v1.0/me/mailFolders/SentItems/messages
+      ?$filter=sentDateTime ge <ISO> and sentDateTime lt|le <ISO>
+      &$top=<page size>&$select=<fields>&$orderby=sentDateTime desc
+
+returns {"value": [...messages, newest first...]} plus an
+"@odata.nextLink" (an absolute URL with $skip) while more remain. A bearer
+token is required. For testing clients it can also add per-request
+latency and answer a fraction of requests with 429 and a Retry-After, and
+it records the most requests it had in flight at once.
+
+Usage:
+  python3 benchmarks/graph_stub.py --emails 20000 --port 8780 --latency 0.05 --throttle 0.02
+  python3 extract-emails.py --base-url http://127.0.0.1:8780/v1.0 --token stub --months 12
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Tuple
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from synthetic_mailbox import MailboxGenerator
+
+MESSAGES_PATH = '/v1.0/me/mailFolders/SentItems/messages'
+MAX_PAGE_SIZE = 1000
+
+FILTER_PATTERN = re.compile(r"sentDateTime ge (\S+) and sentDateTime (lt|le) (\S+)")
+
+
+def to_graph_message(email: Dict[str, Any]) -> Dict[str, Any]:
+    """A synthetic raw email in the shape Graph returns messages."""
+    return {
+        'id': f"AAMkAD{email['id']:010d}",
+        'subject': email['subject'],
+        'sentDateTime': email['sentDate'],
+        'body': {'contentType': email['bodyType'], 'content': email['body']},
+        'from': {'emailAddress': {'name': 'Joe Newman', 'address': email['from']}},
+        'toRecipients': [
+            {'emailAddress': {'name': name, 'address': address}}
+            for name, address in zip(email['toRecipientNames'], email['toRecipients'])
+        ],
+        'importance': email['importance'],
+    }
+
+
+class GraphStub:
+    def __init__(self, count: int, seed: int = 1, latency: float = 0.0, throttle: float = 0.0,
+                 retry_after: float = 0.05):
+        # Oldest first, so date ranges are found by bisection
+        self.messages = [to_graph_message(email) for email in MailboxGenerator(seed).emails(count)]
+        self.messages.reverse()
+        self.dates = [message['sentDateTime'] for message in self.messages]
+        self.latency = latency
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.throttled = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.base_url = ''
+
+    def page(self, query: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+        match = FILTER_PATTERN.fullmatch(query.get('$filter', ''))
+        if match is None:
+            return 400, {'error': {'code': 'BadRequest', 'message': 'Unsupported $filter'}}
+        start, comparison, end = match.groups()
+        if query.get('$orderby', 'sentDateTime desc') != 'sentDateTime desc':
+            return 400, {'error': {'code': 'BadRequest', 'message': 'Unsupported $orderby'}}
+
+        low = bisect_left(self.dates, start)
+        high = (bisect_right if comparison == 'le' else bisect_left)(self.dates, end)
+        top = min(int(query.get('$top', 10)), MAX_PAGE_SIZE)
+        skip = int(query.get('$skip', 0))
+
+        # Newest first: the window's messages from high - 1 down to low
+        first, last = high - skip, max(high - skip - top, low)
+        selected = self.messages[last:max(first, last)][::-1]
+        fields = query.get('$select')
+        if fields:
+            keep = set(fields.split(',')) | {'id'}
+            selected = [{name: value for name, value in message.items() if name in keep} for message in selected]
+
+        response: Dict[str, Any] = {'@odata.context': f"{self.base_url}/$metadata#messages", 'value': selected}
+        if last > low:
+            response['@odata.nextLink'] = (
+                f"{self.base_url}{MESSAGES_PATH}?" + urlencode(dict(query, **{'$skip': skip + top}))
+            )
+        return 200, response
+
+    async def handle(self, method: str, target: str, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], Any]:
+        url = urlsplit(target)
+        if not headers.get('authorization', '').startswith('Bearer '):
+            return 401, {}, {'error': {'code': 'InvalidAuthenticationToken', 'message': 'Access token is empty.'}}
+        if method != 'GET' or url.path != MESSAGES_PATH:
+            return 404, {}, {'error': {'code': 'ResourceNotFound', 'message': f'{method} {url.path}'}}
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.throttle and self.rng.random() < self.throttle:
+            self.throttled += 1
+            return 429, {'Retry-After': str(self.retry_after)}, {
+                'error': {'code': 'ApplicationThrottled', 'message': 'Too many requests'}}
+
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        status, body = self.page(query)
+        return status, {}, body
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except asyncio.IncompleteReadError:
+                    return
+                lines = head.decode('latin-1').split('\r\n')
+                method, target, _ = lines[0].split(' ', 2)
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+
+                self.requests += 1
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                try:
+                    status, extra_headers, body = await self.handle(method, target, headers)
+                finally:
+                    self.in_flight -= 1
+
+                payload = json.dumps(body).encode('utf-8')
+                head_lines = [f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}",
+                              'Content-Type: application/json', f'Content-Length: {len(payload)}']
+                head_lines += [f'{name}: {value}' for name, value in extra_headers.items()]
+                writer.write(('\r\n'.join(head_lines) + '\r\n\r\n').encode('latin-1') + payload)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> asyncio.AbstractServer:
+        """Start serving; base_url is set to the stub's /v1.0 root."""
+        server = await asyncio.start_server(self.serve_connection, host, port)
+        port = server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}"
+        return server
+
+    def date_range(self) -> Tuple[str, str]:
+        """The oldest and newest sentDateTime in the mailbox."""
+        return self.dates[0], self.dates[-1]
+
+
+async def serve(args):
+    stub = GraphStub(args.emails, args.seed, args.latency, args.throttle, args.retry_after)
+    server = await stub.start(args.host, args.port)
+    oldest, newest = stub.date_range()
+    print(f"📬 Graph stub with {args.emails} emails ({oldest} to {newest}) on {stub.base_url}/v1.0")
+    async with server:
+        await server.serve_forever()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--emails', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8780)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument('--throttle', type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument('--retry-after', type=float, default=0.05, help="Retry-After sent with 429s (seconds)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve(parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark suite: every EmailProcessor and StyleAnalyzer stage at scale
+
+For each corpus size, generates a seeded synthetic mailbox
+(synthetic_mailbox.py), then times each processing stage on the input it
+sees in the real pipeline (HTML conversion on HTML bodies, quote removal on the converted
+text, and so on), the full process_emails() run, each StyleAnalyzer
+analysis on the cleaned emails, and the fused extract_features() pass.
+Every stage also records its peak Python heap (tracemalloc, measured in a
+separate run so tracing does not skew the times).
+
+Results are written as JSON. Given --baseline (an earlier results file),
+stages that got slower or bigger than the thresholds are reported and the
+exit status is 1, so the suite can gate changes:
+
+  python3 benchmarks/suite.py --sizes 1000 10000 --output baseline.json
+  ... change code ...
+  python3 benchmarks/suite.py --sizes 1000 10000 --baseline baseline.json
+
+Usage: python3 benchmarks/suite.py [--sizes 1000 10000] [--seed 1] [--output PATH]
+       [--baseline PATH] [--time-threshold 0.25] [--memory-threshold 0.25] [--no-memory]
+       python3 benchmarks/suite.py --compare results.json --baseline baseline.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+from common import best_of, load_script
+from synthetic_mailbox import generate
+
+DEFAULT_RESULTS_FILE = 'output/benchmark-results.json'
+
+_FORMAT = 1
+
+# Differences below these are noise, whatever the ratio
+MIN_SECONDS = 0.005
+MIN_MEMORY_MB = 1.0
+
+
+def quietly(func: Callable[[], Any]) -> Callable[[], Any]:
+    """Wrap func so the scripts' progress output is discarded."""
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func()
+    return run
+
+
+def peak_memory_mb(func: Callable[[], Any]) -> float:
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def processor_stages(process_emails, data: Dict[str, Any]) -> List[Tuple[str, Callable[[], Any], int]]:
+    """(name, function, emails handled) for each EmailProcessor stage."""
+    emails = data['emails']
+    processor = process_emails.EmailProcessor()
+    quietly(lambda: processor.build_name_dictionary(emails))()
+
+    # Each stage gets the text it sees inside clean_email_body
+    html_bodies = [email['body'] for email in emails if email.get('bodyType') == 'html']
+    texts = [
+        processor.remove_html_tags(email['body']) if email.get('bodyType') == 'html' else email['body']
+        for email in emails
+    ]
+    unquoted = [processor.remove_quoted_text(text) for text in texts]
+    names = [processor.extract_sender_names(text) for text in unquoted]
+    named = [processor.anonymize_names(text, found) for text, found in zip(unquoted, names)]
+
+    def process_all():
+        return process_emails.EmailProcessor().process_emails(data)
+
+    return [
+        ('build_name_dictionary', lambda: process_emails.EmailProcessor().build_name_dictionary(emails),
+         len(emails)),
+        ('remove_html_tags', lambda: [processor.remove_html_tags(body) for body in html_bodies],
+         len(html_bodies)),
+        ('remove_quoted_text', lambda: [processor.remove_quoted_text(text) for text in texts], len(texts)),
+        ('extract_sender_names', lambda: [processor.extract_sender_names(text) for text in unquoted],
+         len(unquoted)),
+        ('anonymize_names', lambda: [
+            processor.anonymize_names(text, found) for text, found in zip(unquoted, names)
+        ], len(unquoted)),
+        ('anonymize_text', lambda: [processor.anonymize_text(text) for text in named], len(named)),
+        ('clean_email_body', lambda: [processor.clean_email_body(email) for email in emails], len(emails)),
+        ('process_emails', process_all, len(emails)),
+    ]
+
+
+def analyzer_stages(analyze_style, cleaned: List[Dict[str, Any]]) -> List[Tuple[str, Callable[[], Any], int]]:
+    """(name, function, emails handled) for each StyleAnalyzer analysis."""
+    analyzer = analyze_style.StyleAnalyzer()
+    analyzer.emails = cleaned
+    categories = analyzer.categorize_emails()
+
+    return [
+        (name, func, len(cleaned)) for name, func in [
+            ('analyze_greetings', analyzer.analyze_greetings),
+            ('analyze_signoffs', analyzer.analyze_signoffs),
+            ('analyze_tone', analyzer.analyze_tone),
+            ('analyze_writing_characteristics', analyzer.analyze_writing_characteristics),
+            ('extract_common_phrases', analyzer.extract_common_phrases),
+            ('categorize_emails', analyzer.categorize_emails),
+            ('analyze_response_patterns', lambda: analyzer.analyze_response_patterns(categories)),
+            ('extract_features', analyzer.extract_features),
+        ]
+    ]
+
+
+def run_suite(sizes: List[int], seed: int, repeat: int, memory: bool) -> Dict[str, Any]:
+    process_emails = load_script('process-emails.py')
+    analyze_style = load_script('analyze-style.py')
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for size in sizes:
+        print(f"\n📧 {size} emails (seed {seed})")
+        data = generate(size, seed)
+        cleaned = quietly(lambda: process_emails.EmailProcessor().process_emails(data))()['emails']
+
+        stages = [('EmailProcessor', stage) for stage in processor_stages(process_emails, data)]
+        stages += [('StyleAnalyzer', stage) for stage in analyzer_stages(analyze_style, cleaned)]
+
+        for component, (method, func, count) in stages:
+            func = quietly(func)
+            seconds, _ = best_of(repeat, func)
+            result = {
+                'size': size,
+                'seconds': round(seconds, 6),
+                'emailsPerSecond': round(count / seconds, 1) if seconds else None,
+            }
+            if memory:
+                result['peakMemoryMB'] = round(peak_memory_mb(func), 3)
+            results[f"{size}/{component}.{method}"] = result
+
+            peak = f"  {result['peakMemoryMB']:8.1f} MB" if memory else ""
+            print(f"   {component + '.' + method:48s} {seconds:8.3f}s  "
+                  f"{result['emailsPerSecond'] or 0:>12,.0f} emails/s{peak}")
+
+    return {
+        'format': _FORMAT,
+        'createdAt': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpuCount': os.cpu_count(),
+        'seed': seed,
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            time_threshold: float, memory_threshold: float) -> List[str]:
+    """Stages that regressed beyond the thresholds, as printable lines."""
+    regressions = []
+    print(f"\n📏 Compared with baseline from {baseline.get('createdAt', '?')}")
+    for key, result in current['results'].items():
+        before = baseline['results'].get(key)
+        if before is None:
+            continue
+
+        checks = [('seconds', 's', time_threshold, MIN_SECONDS)]
+        if 'peakMemoryMB' in result and 'peakMemoryMB' in before:
+            checks.append(('peakMemoryMB', ' MB', memory_threshold, MIN_MEMORY_MB))
+
+        for field, unit, threshold, minimum in checks:
+            old, new = before[field], result[field]
+            change = (new - old) / old if old else 0.0
+            marker = '  '
+            if change > threshold and new - old > minimum:
+                marker = '❌'
+                regressions.append(f"{key} {field}: {old}{unit} → {new}{unit} ({change:+.0%})")
+            print(f"   {marker} {key:55s} {field:13s} {old:10.3f} → {new:10.3f}{unit}  ({change:+.0%})")
+
+    missing = sorted(set(baseline['results']) - set(current['results']))
+    if missing:
+        print(f"   (not in this run: {', '.join(missing)})")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000],
+                        help="Corpus sizes to benchmark (1k to 1M emails)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true', help="Skip peak memory measurement")
+    parser.add_argument('--output', '-o', default=DEFAULT_RESULTS_FILE, help="Results file to write")
+    parser.add_argument('--baseline', metavar='PATH', help="Earlier results file to compare against")
+    parser.add_argument('--compare', metavar='PATH',
+                        help="Compare this results file with --baseline instead of running")
+    parser.add_argument('--time-threshold', type=float, default=0.25,
+                        help="Allowed slowdown per stage (default: 0.25 = 25%%)")
+    parser.add_argument('--memory-threshold', type=float, default=0.25,
+                        help="Allowed peak memory growth per stage (default: 0.25 = 25%%)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.compare:
+        if not args.baseline:
+            sys.exit("--compare needs --baseline")
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            current = json.load(f)
+    else:
+        current = run_suite(args.sizes, args.seed, args.repeat, memory=not args.no_memory)
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+        print(f"\n💾 Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('format') != _FORMAT:
+            sys.exit(f"{args.baseline}: unsupported results format {baseline.get('format')!r}")
+
+        regressions = compare(current, baseline, args.time_threshold, args.memory_threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s):")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print("\n✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
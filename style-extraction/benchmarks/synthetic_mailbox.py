@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+
+"""
+Synthetic mailbox generator
+
+Produces seeded, reproducible corpora shaped like extract-emails.js output
+(raw-emails.json), for benchmarking at sizes no real test mailbox has:
+
+- Plain-text and HTML bodies (Outlook-style markup, styles, entities)
+- Reply chains: Gmail-style "On ... wrote:" quotes and Outlook
+  "-----Original Message-----" / "From:" header blocks, nested 1-3 deep
+- PII (phones, emails, addresses, amounts, account and card numbers, SSNs)
+  at a configurable density
+- A realistic spread of greetings and sign-offs, customers and subjects
+
+The same seed and options always give the same emails. Emails are
+generated lazily, so a 1M-email file is written without holding it.
+
+Usage:
+  python3 benchmarks/synthetic_mailbox.py --emails 100000 --output output/raw-emails.json
+  python3 benchmarks/synthetic_mailbox.py --emails 1000000 --output output/raw-emails.jsonl --seed 3
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List
+
+FIRST_NAMES = [
+    'Alice', 'Bob', 'Carol', 'Dave', 'Erin', 'Frank', 'Grace', 'Heidi', 'Ivan', 'Judy',
+    'Mallory', 'Oscar', 'Peggy', 'Rupert', 'Sybil', 'Trent', 'Victor', 'Walter', 'Maria',
+    'Luis', 'Priya', 'Chen', 'Fatima', 'Kevin', "O'Neil", 'Anne-Marie',
+]
+LAST_NAMES = [
+    'Smith', 'Johnson', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez', 'Lee',
+    'Walker', 'Hall', 'Young', 'King', 'Wright', 'Lopez', 'Hill', 'Green', 'Baker',
+]
+COMPANIES = [
+    'oakridge-builders', 'summit-contracting', 'bluepine', 'harbor-homes', 'redline-roofing',
+    'northside-remodel', 'cedar-and-stone', 'apex-framing', 'riverbend', 'keystone-dev',
+]
+
+GREETINGS = [
+    'Hi {first},', 'Hi {first},', 'Hi {first},', 'Hello {first},', 'Hey {first}!',
+    'Hey {first},', 'Good morning {first},', 'Good afternoon {first},',
+    'Dear {first} {last},', '{first},', 'Hi there,', 'Hello all,', '',
+]
+SIGNOFFS = [
+    'Thanks,\nJoe', 'Thanks,\nJoe', 'Thanks!\nJoe', 'Best,\nJoe', 'Best regards,\nJoe Newman',
+    'Regards,\nJoe', 'Sincerely,\nJoe Newman', 'Cheers,\nJoe', 'Joe', '-Joe', '',
+]
+
+SUBJECTS = {
+    'quote': ['Quote for {item}', 'Pricing on {item}', 'Estimate for the {project} job',
+              'Updated cost for {item}'],
+    'delivery': ['Delivery schedule', 'Delivery for {project}', 'Pickup on {day}',
+                 'Shipping update'],
+    'order': ['Your order', 'Order confirmation #{number}', 'Purchase of {item}',
+              'Re: order for {project}'],
+    'question': ['Question about {item}', 'Quick question', 'Inquiry about {project}'],
+    'other': ['Hello', 'Following up', 'Re: {project}', 'Checking in', 'Fwd: documents'],
+}
+
+SENTENCES = {
+    'quote': [
+        "I can get you pricing on the {item} by {day}.",
+        "The quote for the {project} job is attached.",
+        "Per our discussion, the estimate is good for 30 days.",
+        "I put together a cost breakdown for the {item}.",
+        "Pricing went up a little on {item} this month.",
+    ],
+    'delivery': [
+        "We will deliver to the {project} site on {day} morning.",
+        "The {item} is in stock and ready for pickup.",
+        "Delivery is scheduled for {day} between 8 and 10.",
+        "Can someone be on site to sign for the delivery?",
+    ],
+    'order': [
+        "Your order for the {item} is confirmed.",
+        "I need a purchase order number before we can ship.",
+        "Your account is set up for net 30 terms.",
+    ],
+    'question': [
+        "I was wondering if you need the {item} cut to length.",
+        "Quick question about the {project} plans.",
+        "Do you want me to ask the yard about a substitute?",
+    ],
+    'other': [
+        "Thanks for reaching out.",
+        "Let me know if you have any questions.",
+        "Happy to help with anything else you need.",
+        "Looking forward to working with you on this.",
+        "Just checking in to see how the {project} project is going.",
+        "I appreciate your patience while we sort this out.",
+    ],
+}
+
+# Only these carry PII, so pii_density controls how much there is
+PII_SENTENCES = [
+    "Call me at {phone} if anything changes.",
+    "You can reach me at {phone} or on my cell.",
+    "You can also email {email} directly.",
+    "Please send the paperwork to {email}.",
+    "We will deliver to {address} on {day} morning.",
+    "The total comes to {amount} including delivery.",
+    "The quote for the {project} job comes to {amount}.",
+    "Your account # {account} is set up for net 30 terms.",
+    "The card ending {card} was declined, can you send another?",
+    "We still need the SSN {ssn} confirmed for the credit application.",
+]
+
+ITEMS = ['2x4s', 'drywall', 'plywood sheets', 'roofing shingles', 'concrete mix', 'rebar',
+         'PVC pipe', 'insulation', 'deck screws', 'pressure treated posts']
+PROJECTS = ['Maple Street', 'Henderson', 'warehouse', 'kitchen remodel', 'Lakeside', 'duplex']
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+STREETS = ['Oak Ridge Road', 'Main Street', 'Pine Ave', 'Sunset Blvd', 'Elm Lane', 'Harbor Drive']
+
+HTML_HEAD = (
+    '<html><head><meta http-equiv="Content-Type" content="text/html; charset=utf-8">'
+    '<style type="text/css">p.MsoNormal{margin:0in;font-size:11.0pt;font-family:Calibri}'
+    '</style></head><body lang="EN-US"><div class="WordSection1">'
+)
+HTML_TAIL = '</div></body></html>'
+
+_TAGS = re.compile(r'<[^>]*>')
+
+
+def count_words(text: str) -> int:
+    """Word count as extract-emails.js computes it (tags removed)."""
+    return len(_TAGS.sub(' ', text).split())
+
+
+class MailboxGenerator:
+    """Seeded generator of raw emails.
+
+    html_ratio, reply_ratio and pii_density are the fractions of HTML
+    bodies, of emails that quote earlier messages, and of sentences that
+    carry a piece of PII.
+    """
+
+    def __init__(self, seed: int = 1, html_ratio: float = 0.4, reply_ratio: float = 0.35,
+                 pii_density: float = 0.15, customers: int = 500):
+        self.rng = random.Random(seed)
+        self.html_ratio = html_ratio
+        self.reply_ratio = reply_ratio
+        self.pii_density = pii_density
+        self.customers = [self._customer() for _ in range(customers)]
+
+    def _customer(self) -> Dict[str, str]:
+        rng = self.rng
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        company = rng.choice(COMPANIES)
+        address = f"{re.sub('[^a-z]', '', first.lower())}.{last.lower()}@{company}.com"
+        return {'first': first, 'last': last, 'address': address}
+
+    def _fill(self, template: str, customer: Dict[str, str]) -> str:
+        rng = self.rng
+        values = {
+            'item': rng.choice(ITEMS),
+            'project': rng.choice(PROJECTS),
+            'day': rng.choice(DAYS),
+            'number': rng.randint(10000, 99999),
+            'amount': f"${rng.randint(50, 25000):,}.{rng.randint(0, 99):02d}",
+            'address': f"{rng.randint(10, 9999)} {rng.choice(STREETS)}",
+            'phone': rng.choice(['{}-{}-{}', '({}) {}-{}', '{}.{}.{}']).format(
+                rng.randint(200, 999), rng.randint(200, 999), rng.randint(1000, 9999)),
+            'email': customer['address'],
+            'account': rng.randint(10000, 99999999),
+            'card': ' '.join(str(rng.randint(1000, 9999)) for _ in range(4)),
+            'ssn': f"{rng.randint(100, 899)}-{rng.randint(10, 99)}-{rng.randint(1000, 9999)}",
+        }
+        return template.format(**values)
+
+    def _paragraphs(self, topic: str, customer: Dict[str, str]) -> List[str]:
+        rng = self.rng
+        pool = SENTENCES[topic] + SENTENCES['other']
+        paragraphs = []
+        for _ in range(rng.choice([1, 1, 2, 2, 3, 4])):
+            sentences = []
+            for _ in range(rng.randint(1, 4)):
+                sentences.append(self._fill(rng.choice(pool), customer))
+                if rng.random() < self.pii_density:
+                    sentences.append(self._fill(rng.choice(PII_SENTENCES), customer))
+            paragraphs.append(' '.join(sentences))
+        return paragraphs
+
+    def _quoted(self, customer: Dict[str, str], earlier: datetime, html: bool) -> str:
+        """An earlier message in the thread, quoted the way mail clients do."""
+        rng = self.rng
+        name = f"{customer['first']} {customer['last']}"
+        text = '\n\n'.join(self._paragraphs(rng.choice(list(SENTENCES)), customer))
+
+        if rng.random() < 0.5:
+            header = f"On {earlier.strftime('%a, %b %d, %Y at %I:%M %p')}, {name} <{customer['address']}> wrote:"
+            quoted = '\n'.join('> ' + line if line else '>' for line in text.split('\n'))
+            block = f"{header}\n{quoted}"
+        else:
+            block = (
+                "-----Original Message-----\n"
+                f"From: {name} <{customer['address']}>\n"
+                f"Sent: {earlier.strftime('%A, %B %d, %Y %I:%M %p')}\n"
+                "To: Joe Newman <joe@jnbuildingsupply.com>\n"
+                f"Subject: {rng.choice(SUBJECTS['other']).format(project=rng.choice(PROJECTS))}\n\n"
+                f"{text}"
+            )
+        if html:
+            block = '<div style="border-top:solid #E1E1E1 1.0pt">' + _html_paragraphs(block) + '</div>'
+        return block
+
+    def email(self, index: int, sent: datetime) -> Dict[str, Any]:
+        rng = self.rng
+        recipients = rng.sample(self.customers, rng.choice([1, 1, 1, 2, 3]))
+        customer = recipients[0]
+        topic = rng.choice(list(SUBJECTS))
+        fields = {'item': rng.choice(ITEMS), 'project': rng.choice(PROJECTS),
+                  'day': rng.choice(DAYS), 'number': rng.randint(1000, 99999)}
+        subject = rng.choice(SUBJECTS[topic]).format(**fields)
+
+        parts = [rng.choice(GREETINGS).format(**customer)]
+        parts.extend(self._paragraphs(topic, customer))
+        parts.append(rng.choice(SIGNOFFS))
+        body = '\n\n'.join(part for part in parts if part)
+
+        html = rng.random() < self.html_ratio
+        if html:
+            body = _html_paragraphs(body)
+        if rng.random() < self.reply_ratio:
+            subject = 'Re: ' + subject
+            quotes = []
+            earlier = sent
+            for _ in range(rng.choice([1, 1, 2, 3])):
+                earlier -= timedelta(hours=rng.randint(1, 72))
+                quotes.append(self._quoted(customer, earlier, html))
+            body += ('' if html else '\n\n') + ('' if html else '\n\n').join(quotes)
+        if html:
+            body = HTML_HEAD + body + HTML_TAIL
+
+        return {
+            'id': index + 1,
+            'subject': subject,
+            'sentDate': sent.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'body': body,
+            'bodyType': 'html' if html else 'text',
+            'from': 'joe@jnbuildingsupply.com',
+            'toRecipients': [r['address'] for r in recipients],
+            'toRecipientNames': [f"{r['first']} {r['last']}" for r in recipients],
+            'importance': 'high' if rng.random() < 0.05 else 'normal',
+            'wordCount': count_words(body),
+        }
+
+    def emails(self, count: int, newest: datetime = datetime(2025, 6, 30, 17, 0)) -> Iterator[Dict[str, Any]]:
+        """`count` emails, newest first (like the Graph API's Sent Items order)."""
+        sent = newest
+        for index in range(count):
+            yield self.email(index, sent)
+            sent -= timedelta(minutes=self.rng.randint(5, 24 * 60))
+
+
+def _html_paragraphs(text: str) -> str:
+    paragraphs = []
+    for paragraph in text.split('\n\n'):
+        escaped = paragraph.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+        paragraphs.append('<p class="MsoNormal">' + escaped.replace('\n', '<br>') + '</p>')
+    return '<p class="MsoNormal">&nbsp;</p>'.join(paragraphs)
+
+
+def generate(count: int, seed: int = 1, **options) -> Dict[str, Any]:
+    """A whole raw-emails.json document in memory."""
+    emails = list(MailboxGenerator(seed, **options).emails(count))
+    return _document(emails)
+
+
+def _document(emails: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        'extractedAt': datetime(2025, 7, 1).isoformat(),
+        'totalEmails': len(emails),
+        'dateRange': {
+            'oldest': emails[-1]['sentDate'] if emails else None,
+            'newest': emails[0]['sentDate'] if emails else None,
+        },
+        'emails': emails,
+    }
+
+
+def write_mailbox(path: str, emails: Iterable[Dict[str, Any]], count: int):
+    """Write emails as a raw-emails.json document, or JSONL if path ends in .jsonl."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(path, 'w', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            for email in emails:
+                f.write(json.dumps(email, ensure_ascii=False) + '\n')
+            return
+
+        # The header is written before the emails exist, so dateRange is left out
+        f.write('{\n  "extractedAt": ' + json.dumps(datetime(2025, 7, 1).isoformat()))
+        f.write(',\n  "totalEmails": ' + str(count) + ',\n  "emails": [')
+        for i, email in enumerate(emails):
+            f.write(('\n    ' if i == 0 else ',\n    ') + json.dumps(email, ensure_ascii=False))
+        f.write('\n  ]\n}\n')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate a synthetic raw-emails.json mailbox")
+    parser.add_argument('--emails', '-n', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', '-o', default='output/raw-emails.json',
+                        help="Output file (.jsonl for one email per line)")
+    parser.add_argument('--html-ratio', type=float, default=0.4)
+    parser.add_argument('--reply-ratio', type=float, default=0.35)
+    parser.add_argument('--pii-density', type=float, default=0.15)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    generator = MailboxGenerator(args.seed, html_ratio=args.html_ratio,
+                                 reply_ratio=args.reply_ratio, pii_density=args.pii_density)
+    write_mailbox(args.output, generator.emails(args.emails), args.emails)
+    print(f"📧 Wrote {args.emails} synthetic emails to {args.output}")
@@ -0,0 +1,269 @@
+"""
+Hashed-Feature Email Categorizer
+
+Scores every email against every category at once, instead of checking
+the keyword lists one category at a time and stopping at the first hit:
+
+- The subject and the start of the body (CATEGORY_BODY_CHARS) are split
+  into words (as in phrase_mining.py) and crudely stemmed, so "prices"
+  and "pricing" count as "price"
+- Each word, and each pair of neighbouring words, is hashed to one of
+  2**HASH_BITS feature columns, separately for the subject and the body.
+  A batch of emails becomes one sparse 0/1 matrix (SciPy CSR); the word
+  pairs are derived from the word columns with NumPy, not per email
+- A weight matrix (features x categories) turns it into scores with one
+  matrix product. The weights are seeded from indicators.CATEGORY_KEYWORDS
+  (1 per keyword in the body, SUBJECT_WEIGHT in the subject; a keyword of
+  several words is spread over its word pairs), and 'general' gets a bias
+  of GENERAL_BIAS, so it only wins when no keyword is found
+- fit() trains the weights on labeled emails (multinomial logistic
+  regression by gradient descent, pulled toward the seed weights), and
+  may add categories; save() and load() keep a trained model in a .npz file
+
+Scores are returned for every category, so an email about both a quote
+and its delivery counts for both. Where one category is needed, the
+highest score wins, and ties go to the category listed first.
+"""
+
+import hashlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from indicators import CATEGORY_KEYWORDS
+from phrase_mining import tokenize
+
+# How much of the body is categorized, besides the subject
+CATEGORY_BODY_CHARS = 200
+
+HASH_BITS = 18
+N_FEATURES = 1 << HASH_BITS
+
+# Seed weight of a keyword found in the subject (in the body: 1)
+SUBJECT_WEIGHT = 2.0
+
+GENERAL = 'general'
+# Score of 'general': below a single keyword hit
+GENERAL_BIAS = 0.5
+
+# Emails vectorized and scored together by CategoryAccumulator
+BATCH_SIZE = 4096
+
+_FEATURE_MASK = N_FEATURES - 1
+_SUFFIXES = ('ing', 'es', 'ed', 's', 'e')
+_VOWELS = set('aeiouy')
+
+# Joins the texts of a batch; upper case, so it never occurs in them
+_BREAK = ' BREAK '
+_BREAK_ID = -1
+
+# (subject, body) of an email, lowercased
+EmailText = Tuple[str, str]
+
+
+def stem(word: str) -> str:
+    """Strip one common English suffix ("scheduled", "schedules" -> "schedul")."""
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            # "shipping" -> "ship"
+            if len(word) > 3 and word[-1] == word[-2] and word[-1] not in _VOWELS and word[-1] not in 'ls':
+                word = word[:-1]
+            return word
+    return word
+
+
+def email_text(email: Dict[str, Any]) -> EmailText:
+    """The part of an email the categorizer looks at."""
+    return email['subject'].lower(), email['body'][:CATEGORY_BODY_CHARS].lower()
+
+
+def _bigram_ids(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """Feature columns of word pairs, from the columns of their words."""
+    mixed = first.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15) + second.astype(np.uint64)
+    mixed ^= mixed >> np.uint64(29)
+    return (mixed & np.uint64(_FEATURE_MASK)).astype(np.int64)
+
+
+class _FeatureIds(dict):
+    """word -> feature column for one field, hashed on first lookup."""
+
+    def __init__(self, field: str):
+        super().__init__({_BREAK.strip(): _BREAK_ID})
+        self.prefix = (field + '\0').encode('utf-8')
+
+    def __missing__(self, word: str) -> int:
+        digest = hashlib.blake2b(self.prefix + stem(word).encode('utf-8'), digest_size=8).digest()
+        column = self[word] = int.from_bytes(digest, 'little') & _FEATURE_MASK
+        return column
+
+
+class HashedCategorizer:
+    """Linear scores of hashed word features, one column per category."""
+
+    def __init__(self, categories: Sequence[str], weights: sparse.spmatrix, bias: np.ndarray):
+        if weights.shape != (N_FEATURES, len(categories)) or bias.shape != (len(categories),):
+            raise ValueError("weights must be (N_FEATURES, categories) and bias (categories,)")
+        self.categories = list(categories)
+        self.weights = sparse.csr_matrix(weights, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self._subject_ids = _FeatureIds('subject')
+        self._body_ids = _FeatureIds('body')
+
+    def __getstate__(self):
+        # Sent to worker processes without the word caches, which rebuild on use
+        state = dict(self.__dict__)
+        state['_subject_ids'] = _FeatureIds('subject')
+        state['_body_ids'] = _FeatureIds('body')
+        return state
+
+    @classmethod
+    def from_keywords(cls, keyword_lists: Iterable[Tuple[str, Iterable[str]]] = CATEGORY_KEYWORDS
+                      ) -> 'HashedCategorizer':
+        """Untrained categorizer: keyword hits per category, else 'general'."""
+        keyword_lists = list(keyword_lists)
+        categories = [category for category, _ in keyword_lists] + [GENERAL]
+        categorizer = cls(categories, sparse.csr_matrix((N_FEATURES, len(categories))),
+                          np.zeros(len(categories)))
+
+        # (feature, category) -> weight; keywords that stem alike count once
+        seeds: Dict[Tuple[int, int], float] = {}
+        for column, (_, keywords) in enumerate(keyword_lists):
+            for keyword in keywords:
+                for ids, weight in ((categorizer._subject_ids, SUBJECT_WEIGHT), (categorizer._body_ids, 1.0)):
+                    words = np.array([ids[word] for word in tokenize(keyword.lower())], dtype=np.int64)
+                    if len(words) == 0:
+                        continue
+                    features = words if len(words) == 1 else _bigram_ids(words[:-1], words[1:])
+                    for feature in features.tolist():
+                        key = (feature, column)
+                        seeds[key] = max(seeds.get(key, 0.0), weight / len(features))
+
+        if seeds:
+            rows, columns = zip(*seeds)
+            categorizer.weights = sparse.csr_matrix(
+                (np.array(list(seeds.values()), dtype=np.float32), (rows, columns)),
+                shape=(N_FEATURES, len(categories)),
+            )
+        categorizer.bias[-1] = GENERAL_BIAS
+        return categorizer
+
+    @classmethod
+    def load(cls, path: str) -> 'HashedCategorizer':
+        """A categorizer written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['hash_bits']) != HASH_BITS:
+                raise ValueError(f"{path} was saved with {int(data['hash_bits'])} hash bits, not {HASH_BITS}")
+            weights = sparse.csr_matrix((data['data'], data['indices'], data['indptr']),
+                                        shape=(N_FEATURES, len(data['categories'])))
+            return cls([str(category) for category in data['categories']], weights, data['bias'])
+
+    def save(self, path: str):
+        np.savez_compressed(path, hash_bits=HASH_BITS, categories=np.array(self.categories),
+                            data=self.weights.data, indices=self.weights.indices,
+                            indptr=self.weights.indptr, bias=self.bias)
+
+    def fingerprint(self) -> str:
+        """Short hash of the categories and weights (recorded in saved profile states)."""
+        digest = hashlib.sha256('\0'.join(self.categories).encode('utf-8'))
+        for array, dtype in ((self.weights.data, np.float32), (self.weights.indices, np.int64),
+                             (self.weights.indptr, np.int64), (self.bias, np.float32)):
+            digest.update(np.ascontiguousarray(array, dtype=dtype).tobytes())
+        return digest.hexdigest()[:16]
+
+    def vectorize(self, texts: Iterable[EmailText]) -> sparse.csr_matrix:
+        """0/1 matrix of the features found in each (subject, body), one row per email."""
+        texts = list(texts)
+        rows, columns = [], []
+        for field, ids in enumerate((self._subject_ids, self._body_ids)):
+            field_rows, field_columns = self._field_features([text[field] for text in texts], ids)
+            rows.append(field_rows)
+            columns.append(field_columns)
+
+        rows, columns = np.concatenate(rows), np.concatenate(columns)
+        matrix = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, columns)),
+                                   shape=(len(texts), N_FEATURES))
+        # A feature counts once per email
+        matrix.sum_duplicates()
+        matrix.data[:] = 1
+        return matrix
+
+    @staticmethod
+    def _field_features(texts: List[str], ids: '_FeatureIds') -> Tuple[np.ndarray, np.ndarray]:
+        """(row, column) of each word and word pair in one field of every email."""
+        # All texts are tokenized at once, with a break between them
+        words = np.fromiter(map(ids.__getitem__, tokenize(_BREAK.join(texts))), dtype=np.int64)
+        breaks = words == _BREAK_ID
+        rows = np.cumsum(breaks)
+        paired = ~(breaks[1:] | breaks[:-1])
+        pairs = _bigram_ids(words[:-1][paired], words[1:][paired])
+        words_only = ~breaks
+        return (np.concatenate([rows[words_only], rows[:-1][paired]]),
+                np.concatenate([words[words_only], pairs]))
+
+    def scores(self, texts: Iterable[EmailText]) -> np.ndarray:
+        """(emails, categories) array of scores; higher means more likely."""
+        return self.score_matrix(self.vectorize(texts))
+
+    def score_matrix(self, matrix: sparse.spmatrix) -> np.ndarray:
+        return (matrix @ self.weights).toarray() + self.bias
+
+    def best(self, scores: np.ndarray) -> List[str]:
+        """Highest-scoring category of each row (the first listed on ties)."""
+        return [self.categories[column] for column in scores.argmax(axis=1)]
+
+    def categorize(self, emails: Iterable[Dict[str, Any]]) -> List[str]:
+        return self.best(self.scores(map(email_text, emails)))
+
+    def fit(self, texts: Iterable[EmailText], labels: Sequence[str], epochs: int = 200,
+            learning_rate: float = 2.0, regularization: float = 1e-3) -> 'HashedCategorizer':
+        """Train on labeled emails, starting from the current weights.
+
+        Minimizes the cross-entropy of softmax(scores) plus
+        regularization/2 * |weights - current weights|^2, so features
+        absent from the training emails keep their weights and keywords
+        the labels do not contradict stay in effect. Unknown labels
+        become new categories, listed before 'general'.
+        """
+        for label in labels:
+            if label not in self.categories:
+                self._add_category(label)
+        matrix = self.vectorize(texts)
+        if matrix.shape[0] != len(labels):
+            raise ValueError("need one label per email")
+
+        index = {category: column for column, category in enumerate(self.categories)}
+        targets = np.zeros((len(labels), len(self.categories)))
+        targets[np.arange(len(labels)), [index[label] for label in labels]] = 1
+
+        prior = self.weights.toarray().astype(np.float64)
+        weights, bias = prior.copy(), self.bias.astype(np.float64)
+        transposed = matrix.T.tocsr()
+        for _ in range(epochs):
+            logits = matrix @ weights + bias
+            logits -= logits.max(axis=1, keepdims=True)
+            probabilities = np.exp(logits)
+            probabilities /= probabilities.sum(axis=1, keepdims=True)
+            gradient = (probabilities - targets) / len(labels)
+            weights -= learning_rate * (transposed @ gradient + regularization * (weights - prior))
+            bias -= learning_rate * gradient.sum(axis=0)
+
+        self.weights = sparse.csr_matrix(weights.astype(np.float32))
+        self.bias = bias.astype(np.float32)
+        return self
+
+    def _add_category(self, category: str):
+        position = self.categories.index(GENERAL) if GENERAL in self.categories else len(self.categories)
+        self.categories.insert(position, category)
+        weights = self.weights.tocsc()
+        empty = sparse.csc_matrix((N_FEATURES, 1), dtype=np.float32)
+        self.weights = sparse.hstack([weights[:, :position], empty, weights[:, position:]], format='csr')
+        self.bias = np.insert(self.bias, position, 0).astype(np.float32)
+
+
+def default_categorizer(path: Optional[str] = None) -> HashedCategorizer:
+    """A trained categorizer saved at `path`, or the keyword-seeded one."""
+    return HashedCategorizer.load(path) if path else HashedCategorizer.from_keywords()
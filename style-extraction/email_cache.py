@@ -0,0 +1,93 @@
+"""
+Incremental Processing Cache
+
+Persists cleaned email bodies in a SQLite file so that re-runs of
+process-emails.py only clean emails that are new or changed.
+
+Entries are keyed by a hash of the processing-rules version, the body type
+and the raw body. Email ids are positional (assigned by extract-emails.js)
+and change between extractions, so they are deliberately not part of the
+key. Every entry looked up or stored during a run is marked with that run's
+number; entries not seen by the end of a run are evicted.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+from typing import Any, Dict, List, Optional, Tuple
+
+# Pending "seen" marks are flushed to the database in batches of this size
+_TOUCH_BATCH = 1000
+
+
+class EmailCache:
+    """On-disk cache of cleaned bodies and their per-email stats."""
+
+    def __init__(self, path: str, rules_version: str):
+        self.path = path
+        self.rules_version = rules_version
+        self.hits = 0
+        self.misses = 0
+        self._touched: List[Tuple[int, str]] = []
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, body TEXT NOT NULL, stats TEXT NOT NULL, run INTEGER NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_run ON entries (run)")
+        self.run = (self.db.execute("SELECT MAX(run) FROM entries").fetchone()[0] or 0) + 1
+
+    def key(self, email: Dict[str, Any]) -> str:
+        """Content hash of an email under the current rules version.
+
+        Recipient display names are part of it, since they are redacted
+        from the body.
+        """
+        digest = hashlib.sha256()
+        recipient_names = '\x1f'.join(name or '' for name in email.get('toRecipientNames') or [])
+        for part in (self.rules_version, email.get('bodyType') or '', email.get('body') or '', recipient_names):
+            digest.update(part.encode('utf-8', 'surrogatepass'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Return (cleaned body, stats delta) or None, marking the entry as seen."""
+        row = self.db.execute("SELECT body, stats FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._touched.append((self.run, key))
+        if len(self._touched) >= _TOUCH_BATCH:
+            self._flush()
+        return row[0], json.loads(row[1])
+
+    def put(self, key: str, body: str, stats: Dict[str, Any]):
+        """Store a freshly cleaned body."""
+        self.db.execute(
+            "INSERT OR REPLACE INTO entries (key, body, stats, run) VALUES (?, ?, ?, ?)",
+            (key, body, json.dumps(stats, separators=(',', ':')), self.run),
+        )
+
+    def _flush(self):
+        if self._touched:
+            self.db.executemany("UPDATE entries SET run = ? WHERE key = ?", self._touched)
+            self._touched = []
+
+    def evict_stale(self) -> int:
+        """Delete entries not seen in this run. Returns the number removed."""
+        self._flush()
+        cursor = self.db.execute("DELETE FROM entries WHERE run < ?", (self.run,))
+        return cursor.rowcount
+
+    def close(self):
+        self._flush()
+        self.db.commit()
+        self.db.close()
@@ -0,0 +1,357 @@
+"""
+Similar-Email Index (BM25)
+
+A persistent inverted index over cleaned emails, for picking the past
+responses most relevant to an incoming message (few-shot examples)
+instead of the first few per category.
+
+- Subject and body are lowercased and split into words (as in
+  phrase_mining.py); common English stopwords are skipped
+- Each term has a postings list of (document, weight), where the weight is
+  BM25's saturated, length-normalized term frequency
+  tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / average length)).
+  A query scores documents by the sum of idf(term) * weight
+- Postings are kept in document order, along with each term's largest
+  weight, so idf * largest weight bounds what a term adds to any score
+  (MaxScore). A query adds up the postings of its terms with the highest
+  bounds into an array of scores, one per document, and skips its lowest
+  bound terms (usually its most common words, with the longest lists)
+  while their bounds add up to at most NON_ESSENTIAL_SHARE of the total.
+  Only documents within that sum of the k-th best score so far can still
+  make the top k; they look the skipped terms up by binary search. If
+  there are too many of them, the skipped terms are read after all. The
+  result is exactly that of scoring every posting, in a few milliseconds
+  at 100k emails (benchmarks/bench_index.py checks both)
+
+The index lives in a SQLite file (documents, and one row of packed arrays
+per term) and is loaded into memory when opened.
+add() indexes new emails and save() writes back the new documents and
+only the terms they touched. Documents are keyed on the email's content
+(style_state.email_key), since ids are positions in an extraction and a
+new extraction numbers the same emails differently. The id is kept only
+to report and exclude results by: each document has the id its email had
+in the latest extraction that contained it, or none once that id belongs
+to another email.
+Weights use the average length at the time they were added; rebuild the
+index after the corpus changes a lot.
+"""
+
+import json
+import math
+import os
+import sqlite3
+import sys
+from array import array
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from phrase_mining import tokenize
+from style_state import email_key
+
+DEFAULT_INDEX_FILE = 'output/email-index.sqlite'
+
+DEFAULT_TOP_K = 5
+
+# BM25 parameters (the usual defaults)
+K1 = 1.2
+B = 0.75
+
+# A query skips its lowest bound terms while their bounds add up to at
+# most this share of the total, and looks them up only for the documents
+# that can still make the top k
+NON_ESSENTIAL_SHARE = 0.06
+# Looking a term up for one document costs about this many postings read
+LOOKUP_COST = 4
+# Postings lists longer than 1 / DENSE_SHARE of the documents are added
+# with bincount, shorter ones by indexing
+DENSE_SHARE = 6
+
+_FORMAT = 3
+
+STOPWORDS = frozenset("""
+a about after all also am an and any are as at be because been before but by can could
+did do does for from had has have he her here him his how i if in into is it its just
+me more my no not of on or our out over she so some than that the their them then
+there these they this to up us was we were what when where which who will with would
+you your
+""".split())
+
+
+def terms(text: str) -> List[str]:
+    """Indexable words of a text."""
+    return [word for word in tokenize(text.lower()) if word not in STOPWORDS]
+
+
+def _pack(values: array) -> bytes:
+    # Arrays are stored little-endian
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _unpack(typecode: str, blob: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(blob)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def _weighted(weights: np.ndarray, idf: float) -> np.ndarray:
+    # idf * weight in double precision, whatever the numpy casting rules
+    return np.multiply(weights, idf, dtype=np.float64)
+
+
+class _Postings:
+    __slots__ = ('docs', 'weights', 'max_weight')
+
+    def __init__(self, docs: array, weights: array):
+        # Ordered by document
+        self.docs = docs
+        self.weights = weights
+        self.max_weight = max(weights, default=0.0)
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Docs and weights as numpy views (drop them before appending)."""
+        return np.frombuffer(self.docs, dtype=np.uint32), np.frombuffer(self.weights, dtype=np.float32)
+
+
+class EmailIndex:
+    """BM25 index of cleaned emails, backed by a SQLite file."""
+
+    def __init__(self, path: str = DEFAULT_INDEX_FILE):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # May be opened in one thread and queried in another (style-service.py
+        # loads it in the background), never from two at once
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " doc INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE, email_id TEXT UNIQUE,"
+            " subject TEXT NOT NULL, body TEXT NOT NULL, length INTEGER NOT NULL)"
+        )
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            " term_id INTEGER PRIMARY KEY, term TEXT NOT NULL UNIQUE, docs BLOB NOT NULL, weights BLOB NOT NULL)"
+        )
+
+        fmt = self.db.execute("SELECT value FROM meta WHERE key = 'format'").fetchone()
+        if fmt is None:
+            self.db.execute("INSERT INTO meta VALUES ('format', ?)", (str(_FORMAT),))
+        elif int(fmt[0]) != _FORMAT:
+            raise ValueError(f"{path}: unsupported index format {fmt[0]}; delete it and rebuild")
+
+        # Documents are numbered 0, 1, 2, ...; email ids (as JSON) are unique
+        # but not every document has one
+        self._doc_keys: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._id_docs: Dict[str, int] = {}
+        self.total_length = 0
+        for doc, key, email_id, length in self.db.execute(
+                "SELECT doc, key, email_id, length FROM documents ORDER BY doc"):
+            self._doc_keys[key] = doc
+            self._ids.append(email_id)
+            if email_id is not None:
+                self._id_docs[email_id] = doc
+            self.total_length += length
+        self._count = len(self._doc_keys)
+
+        self.term_ids: Dict[str, int] = {}
+        self.postings: List[_Postings] = []
+        for term_id, term, docs_blob, weights_blob in self.db.execute(
+                "SELECT term_id, term, docs, weights FROM postings ORDER BY term_id"):
+            self.term_ids[term] = term_id
+            self.postings.append(_Postings(_unpack('I', docs_blob), _unpack('f', weights_blob)))
+
+        self._dirty = set()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, email_id: Any) -> bool:
+        return json.dumps(email_id) in self._id_docs
+
+    def _set_id(self, doc: int, email_id: str, changed: Set[int]):
+        """Give a document an email id, taking it from the document that had it."""
+        previous = self._ids[doc]
+        if previous == email_id:
+            return
+        if previous is not None:
+            del self._id_docs[previous]
+        holder = self._id_docs.get(email_id)
+        if holder is not None:
+            self._ids[holder] = None
+            changed.add(holder)
+        self._id_docs[email_id] = doc
+        self._ids[doc] = email_id
+        changed.add(doc)
+
+    def add(self, emails: Iterable[Dict[str, Any]]) -> int:
+        """Index new emails (those not indexed yet, by content). Returns how many were added.
+
+        Emails already indexed only take their id from this extraction.
+        """
+        batch = []
+        changed: Set[int] = set()
+        for email in emails:
+            key = email_key(email)
+            doc = self._doc_keys.get(key)
+            if doc is None:
+                doc = self._doc_keys[key] = len(self._ids)
+                self._ids.append(None)
+                subject = email.get('subject', '')
+                words = terms(subject) + terms(email['body'])
+                batch.append((key, subject, email['body'], words))
+                self.total_length += len(words)
+            self._set_id(doc, json.dumps(email['id']), changed)
+
+        # Ids moved between indexed documents; every id is unique at every
+        # step, so those losing theirs are cleared first
+        moved = sorted(doc for doc in changed if doc < len(self))
+        self.db.executemany("UPDATE documents SET email_id = NULL WHERE doc = ?", [(doc,) for doc in moved])
+        self.db.executemany("UPDATE documents SET email_id = ? WHERE doc = ?",
+                            [(self._ids[doc], doc) for doc in moved if self._ids[doc] is not None])
+        if not batch:
+            return 0
+
+        average_length = self.total_length / (len(self) + len(batch)) or 1.0
+        rows = []
+        for key, subject, body, words in batch:
+            frequencies: Dict[str, int] = {}
+            for word in words:
+                frequencies[word] = frequencies.get(word, 0) + 1
+
+            doc = len(self)
+            norm = K1 * (1 - B + B * len(words) / average_length)
+            for term, tf in frequencies.items():
+                term_id = self.term_ids.get(term)
+                if term_id is None:
+                    term_id = self.term_ids[term] = len(self.postings)
+                    self.postings.append(_Postings(array('I'), array('f')))
+                weight = tf * (K1 + 1) / (tf + norm)
+                postings = self.postings[term_id]
+                postings.docs.append(doc)
+                postings.weights.append(weight)
+                # As stored (single precision), so it bounds the stored weights
+                postings.max_weight = max(postings.max_weight, postings.weights[-1])
+                self._dirty.add(term_id)
+            self._count += 1
+            rows.append((doc, key, self._ids[doc], subject, body, len(words)))
+
+        # Written now so search() can return them; committed by save()
+        self.db.executemany("INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?)", rows)
+        return len(batch)
+
+    def idf(self, term_id: int) -> float:
+        df = len(self.postings[term_id].docs)
+        return math.log(1 + (len(self) - df + 0.5) / (df + 0.5))
+
+    def _top_documents(self, query: Dict[int, float], k: int, excluded: set) -> List[Tuple[float, int]]:
+        """The k best (score, doc) pairs for a query of {term id: idf}, best first."""
+        # (bound, idf, docs, weights) per query term, highest bound first
+        lists = []
+        for term_id, idf in query.items():
+            postings = self.postings[term_id]
+            lists.append((idf * postings.max_weight, idf) + postings.arrays())
+        lists.sort(key=itemgetter(0), reverse=True)
+
+        # Read all but the lowest bound terms worth NON_ESSENTIAL_SHARE in all
+        limit = NON_ESSENTIAL_SHARE * sum(bound for bound, *_ in lists)
+        read, skipped = len(lists), 0.0
+        while read > 0 and skipped + lists[read - 1][0] <= limit:
+            read -= 1
+            skipped += lists[read][0]
+
+        # Scores from the terms read: a lower bound of each document's score,
+        # since every weight is positive
+        scores = np.zeros(len(self))
+        for _, idf, docs, weights in lists[:read]:
+            if len(docs) * DENSE_SHARE > len(scores):
+                scores += np.bincount(docs, weights=_weighted(weights, idf), minlength=len(scores))
+            else:
+                scores[docs] += _weighted(weights, idf)
+        scores[list(excluded)] = -np.inf
+
+        # The k-th best score so far is at most the final k-th best, so only
+        # documents within the skipped bounds of it can still make the top
+        # k (less a little, for rounding). Read the skipped terms after all
+        # while looking them up for those would cost more
+        k = min(k, len(scores))
+        while True:
+            bounds = sum(bound for bound, *_ in lists[read:])
+            threshold = np.partition(scores, -k)[-k] - bounds - 1e-9
+            candidates = np.flatnonzero(scores >= threshold).astype(np.uint32)
+            unread = sum(len(docs) for _, _, docs, _ in lists[read:])
+            if len(candidates) * (len(lists) - read) * LOOKUP_COST <= unread:
+                break
+            _, idf, docs, weights = lists[read]
+            scores += np.bincount(docs, weights=_weighted(weights, idf), minlength=len(scores))
+            read += 1
+
+        candidate_scores = scores[candidates]
+        for _, idf, docs, weights in lists[read:]:
+            found = np.searchsorted(docs, candidates)
+            found[found == len(docs)] = 0
+            hit = docs[found] == candidates
+            candidate_scores[hit] += _weighted(weights[found[hit]], idf)
+
+        order = np.lexsort((candidates, -candidate_scores))[:k]
+        return [(score, doc) for score, doc in zip(candidate_scores[order].tolist(), candidates[order].tolist())
+                if score > 0]
+
+    def search(self, subject: str = '', body: str = '', k: int = DEFAULT_TOP_K,
+               exclude_ids: Iterable[Any] = ()) -> List[Dict[str, Any]]:
+        """The k indexed emails most similar to the given subject and body, best first.
+
+        Each result has the email's id (None if no longer current, see the
+        module docstring), subject and body and its BM25 score.
+        `exclude_ids` (e.g. the email being answered) are left out.
+        """
+        query = {}
+        for term in set(terms(subject) + terms(body)):
+            term_id = self.term_ids.get(term)
+            if term_id is not None:
+                query[term_id] = self.idf(term_id)
+        if not query or k <= 0:
+            return []
+
+        excluded = {self._id_docs[key] for key in map(json.dumps, exclude_ids) if key in self._id_docs}
+        top = self._top_documents(query, k, excluded)
+        if not top:
+            return []
+
+        rows = {
+            doc: (email_id, subject_text, body_text)
+            for doc, email_id, subject_text, body_text in self.db.execute(
+                f"SELECT doc, email_id, subject, body FROM documents WHERE doc IN ({','.join('?' * len(top))})",
+                [doc for _, doc in top],
+            )
+        }
+        results = []
+        for score, doc in top:
+            email_id, subject_text, body_text = rows[doc]
+            results.append({'id': None if email_id is None else json.loads(email_id),
+                            'subject': subject_text, 'body': body_text, 'score': round(score, 4)})
+        return results
+
+    def save(self):
+        """Commit the documents added and write the postings they changed since opening (or the last save)."""
+        terms_by_id = {term_id: term for term, term_id in self.term_ids.items() if term_id in self._dirty}
+        rows = []
+        for term_id in sorted(self._dirty):
+            postings = self.postings[term_id]
+            rows.append((term_id, terms_by_id[term_id], _pack(postings.docs), _pack(postings.weights)))
+        self.db.executemany("INSERT OR REPLACE INTO postings VALUES (?, ?, ?, ?)", rows)
+        self.db.commit()
+        self._dirty = set()
+
+    def close(self):
+        self.save()
+        self.db.close()
@@ -0,0 +1,368 @@
+"""
+Columnar Email Store
+
+A compact, memory-mappable alternative to cleaned-emails.json for passing
+cleaned emails from process-emails.py to analyze-style.py. One file holds:
+
+- Fixed-width columns: id, sentDate and the recipient fields (as ASCII
+  JSON, NUL-padded, so their types round-trip), wordCount and
+  originalWordCount (uint32)
+- One contiguous UTF-8 blob with every subject and body, plus an offsets
+  array (uint64) into it
+- Optionally, each body pre-tokenized for phrase mining: a vocabulary
+  (blob + offsets) and an array of uint32 word ids per email
+
+EmailStore opens the file with mmap: nothing is parsed up front, bodies are
+decoded only when an email is read (body_bytes() and token_ids() return
+zero-copy views), and pages the OS loads can be dropped again under memory
+pressure. Slices of a store are cheap views that pickle as (path, range),
+so pool workers open the file themselves instead of receiving the emails.
+
+All integers are little-endian. Sections start on 8-byte boundaries.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from collections.abc import Sequence
+from typing import Any, Dict, Iterator, List, Optional
+
+from phrase_mining import tokenize
+
+DEFAULT_STORE_FILE = 'output/cleaned-emails.store'
+
+MAGIC = b'JNSTORE2'
+
+_SECTIONS = (
+    'text', 'text_offsets', 'ids', 'dates', 'recipients', 'word_counts', 'original_word_counts',
+    'vocabulary', 'vocabulary_offsets', 'token_offsets', 'tokens',
+)
+
+# magic, email count, flags, id, date and recipients widths, then (offset, length) per section
+_HEADER = struct.Struct('<8sQQQQQ' + 'QQ' * len(_SECTIONS))
+
+# Cleaned-email fields kept in the recipients column (see recipients.py)
+_RECIPIENT_FIELDS = ('recipient', 'recipientDomain', 'recipientCount', 'importance')
+
+_FLAG_TOKENS = 1
+
+_ALIGNMENT = 8
+
+
+def is_email_store(path: str) -> bool:
+    """Whether `path` is a columnar store (as opposed to JSON/JSONL)."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _little_endian(values: array) -> array:
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+class EmailStoreWriter:
+    """Write cleaned emails to a columnar store, one at a time.
+
+    Subjects and bodies go straight to disk; only the small fixed-width
+    columns are kept in memory until close(). The file appears at `path`
+    only once close() succeeds.
+    """
+
+    def __init__(self, path: str, tokens: bool = False):
+        self.path = path
+        self.tokens = tokens
+        self.count = 0
+        self._file = None
+        self._token_spool = None
+
+    def open(self) -> 'EmailStoreWriter':
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._file = open(self.path + '.tmp', 'wb')
+        self._file.write(b'\0' * _HEADER.size)
+        self._text_start = _HEADER.size
+        self._text_offsets = array('Q', [0])
+        self._ids: List[bytes] = []
+        self._dates: List[bytes] = []
+        self._recipients: List[bytes] = []
+        self._word_counts = array('I')
+        self._original_word_counts = array('I')
+
+        if self.tokens:
+            # Word ids start at 1, like PhraseMiner's
+            self._vocabulary: Dict[str, int] = {}
+            self._token_offsets = array('Q', [0])
+            self._token_spool = tempfile.TemporaryFile()
+        return self
+
+    def __enter__(self) -> 'EmailStoreWriter':
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, email: Dict[str, Any]):
+        for text in (email.get('subject', ''), email['body']):
+            data = text.encode('utf-8', 'surrogatepass')
+            self._file.write(data)
+            self._text_offsets.append(self._text_offsets[-1] + len(data))
+
+        self._ids.append(json.dumps(email['id']).encode('ascii'))
+        self._dates.append(json.dumps(email.get('sentDate', '')).encode('ascii'))
+        self._recipients.append(json.dumps(
+            [email.get(name) for name in _RECIPIENT_FIELDS], separators=(',', ':')
+        ).encode('ascii'))
+        self._word_counts.append(email.get('wordCount', 0))
+        self._original_word_counts.append(email.get('originalWordCount', 0))
+
+        if self.tokens:
+            vocabulary = self._vocabulary
+            ids = array('I', [
+                vocabulary.get(word) or vocabulary.setdefault(word, len(vocabulary) + 1)
+                for word in tokenize(email['body'].lower())
+            ])
+            _little_endian(ids).tofile(self._token_spool)
+            self._token_offsets.append(self._token_offsets[-1] + len(ids))
+
+        self.count += 1
+
+    def _append(self, data: bytes) -> List[int]:
+        """Write a section at the next aligned position; return (offset, length)."""
+        position = self._file.tell()
+        padding = -position % _ALIGNMENT
+        self._file.write(b'\0' * padding)
+        self._file.write(data)
+        return [position + padding, len(data)]
+
+    def close(self):
+        """Write the columns and header, and move the file into place."""
+        f = self._file
+        sections = {'text': [self._text_start, self._text_offsets[-1]]}
+
+        id_width = max(map(len, self._ids), default=0)
+        date_width = max(map(len, self._dates), default=0)
+        recipients_width = max(map(len, self._recipients), default=0)
+        sections['text_offsets'] = self._append(_little_endian(self._text_offsets).tobytes())
+        sections['ids'] = self._append(b''.join(value.ljust(id_width, b'\0') for value in self._ids))
+        sections['dates'] = self._append(b''.join(value.ljust(date_width, b'\0') for value in self._dates))
+        sections['recipients'] = self._append(
+            b''.join(value.ljust(recipients_width, b'\0') for value in self._recipients)
+        )
+        sections['word_counts'] = self._append(_little_endian(self._word_counts).tobytes())
+        sections['original_word_counts'] = self._append(
+            _little_endian(self._original_word_counts).tobytes()
+        )
+
+        flags = 0
+        if self.tokens:
+            flags |= _FLAG_TOKENS
+            words = [word.encode('utf-8', 'surrogatepass') for word in self._vocabulary]
+            offsets = array('Q', [0])
+            for word in words:
+                offsets.append(offsets[-1] + len(word))
+            sections['vocabulary'] = self._append(b''.join(words))
+            sections['vocabulary_offsets'] = self._append(_little_endian(offsets).tobytes())
+            sections['token_offsets'] = self._append(_little_endian(self._token_offsets).tobytes())
+
+            spool = self._token_spool
+            spool.seek(0)
+            f.write(b'\0' * (-f.tell() % _ALIGNMENT))
+            start = f.tell()
+            while True:
+                block = spool.read(1 << 20)
+                if not block:
+                    break
+                f.write(block)
+            sections['tokens'] = [start, f.tell() - start]
+            spool.close()
+
+        layout = []
+        for name in _SECTIONS:
+            layout.extend(sections.get(name, [0, 0]))
+
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, self.count, flags, id_width, date_width, recipients_width, *layout))
+        f.close()
+        self._file = None
+        os.replace(self.path + '.tmp', self.path)
+
+    def abort(self):
+        """Discard a partially written store."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            os.remove(self.path + '.tmp')
+        if self._token_spool is not None:
+            self._token_spool.close()
+
+
+class StoredEmail(dict):
+    """An email record read from a store; `token_ids` is set if the store has tokens."""
+
+    token_ids: Optional[memoryview] = None
+    store: Optional['EmailStore'] = None
+
+
+class EmailStore(Sequence):
+    """Read-only, memory-mapped view of a columnar store (or a range of it)."""
+
+    def __init__(self, path: str, start: int = 0, stop: Optional[int] = None):
+        self.path = path
+        self._start = start
+        self._stop = stop
+        self._mmap = None
+        self._vocabulary: Optional[List[str]] = None
+        self._open()
+
+    def _open(self):
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        fields = _HEADER.unpack_from(view)
+        if fields[0] != MAGIC:
+            if fields[0][:7] == MAGIC[:7]:
+                raise ValueError(f"{self.path} was written by an older version; "
+                                 f"write it again with process-emails.py --store")
+            raise ValueError(f"{self.path} is not an email store")
+        count, flags, self._id_width, self._date_width, self._recipients_width = fields[1:6]
+        layout = fields[6:]
+        sections = {name: view[layout[2 * i]:layout[2 * i] + layout[2 * i + 1]]
+                    for i, name in enumerate(_SECTIONS)}
+
+        if sys.byteorder != 'little':
+            raise ValueError("email stores can only be read on little-endian machines")
+
+        self._view = view
+        self._text = sections['text']
+        self._text_offsets = sections['text_offsets'].cast('Q')
+        self._ids = sections['ids']
+        self._dates = sections['dates']
+        self._recipients = sections['recipients']
+        self._word_counts = sections['word_counts'].cast('I')
+        self._original_word_counts = sections['original_word_counts'].cast('I')
+
+        self.has_tokens = bool(flags & _FLAG_TOKENS)
+        if self.has_tokens:
+            self._vocabulary_blob = sections['vocabulary']
+            self._vocabulary_offsets = sections['vocabulary_offsets'].cast('Q')
+            self._token_offsets = sections['token_offsets'].cast('Q')
+            self._tokens = sections['tokens'].cast('I')
+
+        self._stop = count if self._stop is None else min(self._stop, count)
+        self._start = min(self._start, self._stop)
+
+    # Pickled as (path, range): the receiving process maps the file itself
+    def __getstate__(self):
+        return {'path': self.path, 'start': self._start, 'stop': self._stop}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'], state['start'], state['stop'])
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("email store slices must be contiguous")
+            return EmailStore(self.path, self._start + start, self._start + max(start, stop))
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("email store index out of range")
+        return self.record(self._start + index)
+
+    def __iter__(self) -> Iterator[StoredEmail]:
+        for i in range(self._start, self._stop):
+            yield self.record(i)
+
+    # Zero-copy access by absolute position in the file
+
+    def _text_bytes(self, slot: int) -> memoryview:
+        return self._text[self._text_offsets[slot]:self._text_offsets[slot + 1]]
+
+    def body_bytes(self, i: int) -> memoryview:
+        """UTF-8 bytes of email i's body, without copying."""
+        return self._text_bytes(2 * i + 1)
+
+    def subject_bytes(self, i: int) -> memoryview:
+        return self._text_bytes(2 * i)
+
+    def token_ids(self, i: int) -> Optional[memoryview]:
+        """Word ids of email i's body (into `vocabulary`), without copying."""
+        if not self.has_tokens:
+            return None
+        return self._tokens[self._token_offsets[i]:self._token_offsets[i + 1]]
+
+    @property
+    def vocabulary(self) -> List[str]:
+        """Words by id; id 0 is unused."""
+        if self._vocabulary is None:
+            if not self.has_tokens:
+                raise ValueError(f"{self.path} was written without tokens")
+            blob, offsets = self._vocabulary_blob, self._vocabulary_offsets
+            self._vocabulary = [''] + [
+                str(blob[offsets[i]:offsets[i + 1]], 'utf-8', 'surrogatepass')
+                for i in range(len(offsets) - 1)
+            ]
+        return self._vocabulary
+
+    def _fixed(self, column: memoryview, width: int, i: int) -> Any:
+        raw = column[i * width:(i + 1) * width].tobytes().rstrip(b'\0')
+        # Plain strings are by far the common case; skip the JSON parser for them
+        if raw[:1] == b'"' and b'\\' not in raw:
+            return raw[1:-1].decode('ascii')
+        return json.loads(raw)
+
+    def record(self, i: int) -> StoredEmail:
+        """Email i as a cleaned-email record (same fields as cleaned-emails.json)."""
+        email = StoredEmail(
+            id=self._fixed(self._ids, self._id_width, i),
+            subject=str(self.subject_bytes(i), 'utf-8', 'surrogatepass'),
+            sentDate=self._fixed(self._dates, self._date_width, i),
+            body=str(self.body_bytes(i), 'utf-8', 'surrogatepass'),
+            wordCount=self._word_counts[i],
+            originalWordCount=self._original_word_counts[i],
+        )
+        recipients = self._fixed(self._recipients, self._recipients_width, i)
+        email.update((name, value) for name, value in zip(_RECIPIENT_FIELDS, recipients) if value is not None)
+        if self.has_tokens:
+            email.token_ids = self.token_ids(i)
+            email.store = self
+        return email
+
+    def close(self):
+        """Unmap the file. Views handed out earlier must no longer be in use."""
+        if self._mmap is None:
+            return
+        for name in ('_text', '_text_offsets', '_ids', '_dates', '_recipients', '_word_counts',
+                     '_original_word_counts', '_vocabulary_blob', '_vocabulary_offsets',
+                     '_token_offsets', '_tokens', '_view'):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        self._mmap.close()
+        self._mmap = None
+
+    def __enter__(self) -> 'EmailStore':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,250 @@
+"""
+Streaming Email Readers and Writers
+
+Reads email records one at a time so that peak memory stays at roughly one
+email regardless of corpus size:
+
+- JSONL files (one email object per line)
+- The `{"emails": [...]}` documents written by extract-emails.js and
+  process-emails.py, parsed incrementally without loading the whole file
+
+Also provides a writer that emits cleaned emails as they are produced, in
+either format, and appends the processing statistics at the end.
+"""
+
+import json
+import os
+import re
+from datetime import datetime
+from typing import Dict, Any, Iterator, Optional
+
+READ_CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = ' \t\n\r'
+
+# Top-level keys of the documents written by extract-emails.js and process-emails.py
+DOCUMENT_KEYS = {'extractedAt', 'processedAt', 'totalEmails', 'dateRange', 'emails'}
+
+
+def detect_format(path: str) -> str:
+    """Return 'json' for a `{...}` document and 'jsonl' for line-delimited records."""
+    if path.endswith('.jsonl'):
+        return 'jsonl'
+
+    with open(path, 'r', encoding='utf-8') as f:
+        head = f.read(READ_CHUNK_SIZE).lstrip(_WHITESPACE + '\ufeff')
+
+    if not head or head[0] != '{':
+        return 'json'
+
+    # A JSONL file also starts with '{', so look at whether the first
+    # record closes on the first line.
+    first_line, newline, _ = head.partition('\n')
+    if newline:
+        try:
+            record = json.loads(first_line)
+        except json.JSONDecodeError:
+            return 'json'
+        # A whole (small) document written on one line
+        if isinstance(record, dict) and isinstance(record.get('emails'), list):
+            return 'json'
+        return 'jsonl'
+
+    # First line longer than the sample: decide from the first key
+    match = re.match(r'\{\s*"([^"\\]*)"', head)
+    return 'json' if match and match.group(1) in DOCUMENT_KEYS else 'jsonl'
+
+
+class EmailStreamReader:
+    """Iterate over email records in a JSON document or JSONL file.
+
+    Top-level keys other than `emails` that appear in a JSON document are
+    collected into `metadata` as they are encountered. With JSONL input, a
+    trailing record without a `body` (as written by `EmailStreamWriter`) is
+    treated as metadata rather than an email.
+    """
+
+    def __init__(self, path: str, chunk_size: int = READ_CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.format = detect_format(path)
+        self.metadata: Dict[str, Any] = {}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if self.format == 'jsonl':
+            return self._iter_jsonl()
+        return self._iter_document()
+
+    def _iter_jsonl(self) -> Iterator[Dict[str, Any]]:
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"{self.path}:{line_no}: invalid JSON record ({e.msg})")
+
+                if 'body' not in record and 'id' not in record:
+                    self.metadata.update(record)
+                    continue
+                yield record
+
+    def _iter_document(self) -> Iterator[Dict[str, Any]]:
+        decoder = json.JSONDecoder()
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            buf = ''
+            pos = 0
+            eof = False
+
+            def fill(min_extra: int) -> bool:
+                """Drop consumed input and append at least one more chunk."""
+                nonlocal buf, pos, eof
+                if eof:
+                    return False
+                chunk = f.read(max(self.chunk_size, min_extra))
+                if not chunk:
+                    eof = True
+                    return False
+                buf = buf[pos:] + chunk
+                pos = 0
+                return True
+
+            def skip_ws() -> None:
+                nonlocal pos
+                while True:
+                    while pos < len(buf) and buf[pos] in _WHITESPACE:
+                        pos += 1
+                    if pos < len(buf) or not fill(0):
+                        return
+
+            def expect(chars: str) -> str:
+                skip_ws()
+                if pos >= len(buf) or buf[pos] not in chars:
+                    found = buf[pos] if pos < len(buf) else 'end of file'
+                    raise ValueError(f"{self.path}: expected one of {chars!r}, found {found!r}")
+                return buf[pos]
+
+            def decode_value() -> Any:
+                nonlocal pos
+                skip_ws()
+                while True:
+                    try:
+                        value, end = decoder.raw_decode(buf, pos)
+                    except json.JSONDecodeError:
+                        # Probably a value split across chunks; double the
+                        # read size so one large email costs amortized O(n).
+                        if not fill(len(buf) - pos):
+                            raise
+                        continue
+                    # A number at the end of the buffer may be truncated.
+                    if end == len(buf) and not eof and fill(0):
+                        continue
+                    pos = end
+                    return value
+
+            skip_ws()
+            if pos < len(buf) and buf[pos] == '\ufeff':
+                pos += 1
+            expect('{')
+            pos += 1
+
+            if expect('"}') == '}':
+                return
+
+            while True:
+                key = decode_value()
+                expect(':')
+                pos += 1
+
+                if key == 'emails':
+                    expect('[')
+                    pos += 1
+                    if expect(']{') == ']':
+                        pos += 1
+                    else:
+                        while True:
+                            yield decode_value()
+                            sep = expect(',]')
+                            pos += 1
+                            if sep == ']':
+                                break
+                else:
+                    self.metadata[key] = decode_value()
+
+                sep = expect(',}')
+                pos += 1
+                if sep == '}':
+                    return
+
+
+class EmailStreamWriter:
+    """Write cleaned emails incrementally as a JSON document or JSONL file.
+
+    The JSON document has the same keys as the batch output of
+    process-emails.py. Since the totals (and, for streamed input, the source
+    metadata) are only known at the end, they follow the `emails` array. In
+    JSONL mode they are written as a final record without a `body`.
+    """
+
+    def __init__(self, path: str, fmt: str = 'json'):
+        if fmt not in ('json', 'jsonl'):
+            raise ValueError(f"Unknown output format: {fmt}")
+
+        self.path = path
+        self.format = fmt
+        self.count = 0
+        self._file = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def open(self):
+        output_dir = os.path.dirname(self.path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        self._file = open(self.path, 'w', encoding='utf-8')
+
+        if self.format == 'json':
+            self._file.write('{\n')
+            self._file.write(f'  "processedAt": {json.dumps(datetime.now().isoformat())},\n')
+            self._file.write('  "emails": [')
+
+    def write(self, email: Dict[str, Any]):
+        """Append one cleaned email."""
+        record = json.dumps(email, ensure_ascii=False)
+
+        if self.format == 'jsonl':
+            self._file.write(record + '\n')
+        else:
+            self._file.write((',\n    ' if self.count else '\n    ') + record)
+
+        self.count += 1
+
+    def close(self, stats: Dict[str, Any], metadata: Optional[Dict[str, Any]] = None):
+        """Write metadata, totals and processing statistics, then close the file."""
+        trailer = dict(metadata or {})
+        trailer['totalEmails'] = self.count
+
+        if self.format == 'jsonl':
+            trailer['processingStats'] = stats
+            self._file.write(json.dumps(trailer, ensure_ascii=False) + '\n')
+        else:
+            self._file.write('\n  ],\n' if self.count else '],\n')
+            for key, value in trailer.items():
+                self._file.write(f'  {json.dumps(key)}: {json.dumps(value, ensure_ascii=False)},\n')
+            stats_json = json.dumps(stats, indent=2, ensure_ascii=False).replace('\n', '\n  ')
+            self._file.write(f'  "processingStats": {stats_json}\n')
+            self._file.write('}\n')
+
+        self._file.close()
+        self._file = None
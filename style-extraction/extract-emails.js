@@ -151,6 +151,7 @@ async function extractEmails(client, options) {
             bodyType: email.body.contentType, // Text or HTML
             from: email.from?.emailAddress?.address || 'unknown',
             toRecipients: (email.toRecipients || []).map(r => r.emailAddress.address),
+            toRecipientNames: (email.toRecipients || []).map(r => r.emailAddress.name || ''),
             importance: email.importance || 'normal',
             wordCount: countWords(email.body.content),
         }));
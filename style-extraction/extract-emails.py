@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+
+"""
+Concurrent Email Extraction from Microsoft Graph API
+
+Python counterpart of extract-emails.js for large mailboxes. Instead of
+following @odata.nextLink one page at a time and holding every message
+until the end, it:
+
+1. Splits the date range into windows
+2. Pages through several windows at once (--concurrency) over pooled
+   keep-alive connections, backing off on 429 throttling (graph_client.py)
+3. Hands pages on as they arrive, so a window is never held up waiting
+   for an earlier one. Windows start newest first, but their pages
+   interleave: emails are numbered in the order they are written, not
+   newest first as in extract-emails.js. Ids are positions either way;
+   the profile state and similar-email index recognize emails by content
+
+Emails are written to a raw JSONL file as they arrive and, with
+--process, cleaned by EmailProcessor at the same time, so neither step
+holds the whole mailbox.
+
+Usage:
+  python3 extract-emails.py --months 6
+  python3 extract-emails.py --months 24 --windows 24 --concurrency 6 --process
+  python3 extract-emails.py --base-url http://127.0.0.1:8780/v1.0 --token stub   # benchmarks/graph_stub.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import queue
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from graph_client import DEFAULT_MAX_CONNECTIONS, GRAPH_BASE_URL, GraphClient, GraphError
+
+DEFAULT_TOKEN_FILE = '.token.json'
+DEFAULT_OUTPUT_FILE = 'output/raw-emails.jsonl'
+DEFAULT_WINDOWS = 12
+DEFAULT_CONCURRENCY = 4
+
+MESSAGES_PATH = 'me/mailFolders/SentItems/messages'
+SELECT_FIELDS = 'subject,sentDateTime,body,from,toRecipients,importance'
+PAGE_SIZE = 100  # Max per request
+
+# Pages each window in flight may fetch ahead of the consumer
+WINDOW_BUFFER_PAGES = 4
+
+_DONE = object()
+
+
+def load_token(path: str = DEFAULT_TOKEN_FILE) -> str:
+    """The access token saved by auth.js."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No authentication token found at {path}; run: node auth.js")
+
+    with open(path, 'r', encoding='utf-8') as f:
+        token_data = json.load(f)
+
+    expires_on = datetime.fromisoformat(token_data['expiresOn'].replace('Z', '+00:00'))
+    if expires_on.tzinfo is None:
+        expires_on = expires_on.replace(tzinfo=timezone.utc)
+    if expires_on < datetime.now(timezone.utc):
+        raise ValueError("Access token has expired; re-authenticate: node auth.js")
+    return token_data['accessToken']
+
+
+def _graph_time(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def date_windows(start: datetime, end: datetime, count: int) -> List[Tuple[datetime, datetime]]:
+    """Split [start, end) into `count` equal windows, newest first."""
+    step = (end - start) / max(count, 1)
+    bounds = [start + step * i for i in range(count)] + [end]
+    return [(bounds[i], bounds[i + 1]) for i in reversed(range(count))]
+
+
+def count_words(text: Optional[str]) -> int:
+    """Words in a body, ignoring HTML tags (as extract-emails.js counts)."""
+    if not text:
+        return 0
+    return len(re.sub(r'<[^>]*>', ' ', text).split())
+
+
+def to_raw_email(message: Dict[str, Any], email_id: int) -> Dict[str, Any]:
+    """A Graph message as a raw-emails.json record (same fields as extract-emails.js)."""
+    body = message.get('body') or {}
+    recipients = [recipient.get('emailAddress') or {} for recipient in message.get('toRecipients') or []]
+    return {
+        'id': email_id,
+        'subject': message.get('subject') or '(no subject)',
+        'sentDate': message.get('sentDateTime'),
+        'body': body.get('content') or '',
+        'bodyType': body.get('contentType'),
+        'from': ((message.get('from') or {}).get('emailAddress') or {}).get('address') or 'unknown',
+        'toRecipients': [recipient.get('address') for recipient in recipients],
+        'toRecipientNames': [recipient.get('name') or '' for recipient in recipients],
+        'importance': message.get('importance') or 'normal',
+        'wordCount': count_words(body.get('content')),
+    }
+
+
+class MailboxExtractor:
+    """Fetch Sent Items over a date range, several windows at a time."""
+
+    def __init__(self, access_token: str, start: datetime, end: datetime,
+                 base_url: str = GRAPH_BASE_URL, windows: int = DEFAULT_WINDOWS,
+                 concurrency: int = DEFAULT_CONCURRENCY, connections: int = DEFAULT_MAX_CONNECTIONS,
+                 limit: Optional[int] = None):
+        self.access_token = access_token
+        self.start = start
+        self.end = end
+        self.base_url = base_url
+        self.windows = date_windows(start, end, windows)
+        self.concurrency = concurrency
+        self.connections = connections
+        self.limit = limit
+        self.client: Optional[GraphClient] = None
+
+    async def _fetch_window(self, number: int, window: Tuple[datetime, datetime], pages: asyncio.Queue,
+                            slots: asyncio.Semaphore):
+        start, end = window
+        try:
+            # Pages share one bounded queue: when the consumer falls behind,
+            # every window waits, and none starts that it could not take
+            async with slots:
+                response = await self.client.get_json(MESSAGES_PATH, {
+                    '$filter': f"sentDateTime ge {_graph_time(start)} and sentDateTime lt {_graph_time(end)}",
+                    '$top': PAGE_SIZE,
+                    '$select': SELECT_FIELDS,
+                    '$orderby': 'sentDateTime desc',
+                })
+                while True:
+                    await pages.put((number, response.get('value') or []))
+                    next_link = response.get('@odata.nextLink')
+                    if not next_link:
+                        break
+                    response = await self.client.get_json(next_link)
+        except Exception as e:
+            await pages.put(e)
+        else:
+            await pages.put(_DONE)
+
+    async def pages(self) -> AsyncIterator[Tuple[int, List[Dict[str, Any]]]]:
+        """(window number, messages) per page, in the order they arrive."""
+        async with GraphClient(self.access_token, self.base_url, max_connections=self.connections) as client:
+            self.client = client
+            slots = asyncio.Semaphore(self.concurrency)
+            pages = asyncio.Queue(WINDOW_BUFFER_PAGES * self.concurrency)
+            # Semaphore waiters are woken in order, so windows start newest first
+            tasks = [
+                asyncio.ensure_future(self._fetch_window(number, window, pages, slots))
+                for number, window in enumerate(self.windows, 1)
+            ]
+            try:
+                remaining = len(tasks)
+                while remaining:
+                    page = await pages.get()
+                    if page is _DONE:
+                        remaining -= 1
+                    elif isinstance(page, Exception):
+                        raise page
+                    else:
+                        yield page
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _produce(self, handoff: 'queue.Queue', stop: threading.Event):
+        loop = asyncio.get_running_loop()
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    handoff.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        pages = self.pages()
+        try:
+            async for page in pages:
+                if not await loop.run_in_executor(None, put, page):
+                    break
+        finally:
+            await pages.aclose()
+
+    def emails(self) -> Iterator[Dict[str, Any]]:
+        """Raw email records, numbered as they arrive, fetched in a background thread while they are consumed."""
+        handoff: 'queue.Queue' = queue.Queue(maxsize=WINDOW_BUFFER_PAGES)
+        stop = threading.Event()
+
+        def run():
+            try:
+                asyncio.run(self._produce(handoff, stop))
+                item = _DONE
+            except BaseException as e:
+                item = e
+            while not stop.is_set():
+                try:
+                    handoff.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+
+        thread = threading.Thread(target=run, name='graph-extract', daemon=True)
+        thread.start()
+
+        count = 0
+        try:
+            while True:
+                item = handoff.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+
+                number, messages = item
+                for message in messages:
+                    count += 1
+                    yield to_raw_email(message, count)
+                    if self.limit and count >= self.limit:
+                        return
+                start, end = self.windows[number - 1]
+                print(f"📥 Window {number}/{len(self.windows)} ({start.date().isoformat()} to "
+                      f"{end.date().isoformat()}): {len(messages)} emails in this page (total: {count})")
+        finally:
+            stop.set()
+            thread.join()
+
+
+def write_raw(emails: Iterator[Dict[str, Any]], path: str) -> Iterator[Dict[str, Any]]:
+    """Pass raw emails through, also appending each to a JSONL file."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        for email in emails:
+            f.write(json.dumps(email, ensure_ascii=False) + '\n')
+            yield email
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extract sent emails from Microsoft Graph concurrently")
+    parser.add_argument('--months', '-m', type=int, default=int(os.environ.get('DEFAULT_MONTHS_BACK') or 6),
+                        help="Number of months to look back")
+    parser.add_argument('--limit', '-l', type=int, default=None, help="Maximum number of emails to extract")
+    parser.add_argument('--output', '-o', default=DEFAULT_OUTPUT_FILE,
+                        help=f"Raw emails, one JSON object per line (default: {DEFAULT_OUTPUT_FILE})")
+    parser.add_argument('--windows', type=int, default=DEFAULT_WINDOWS,
+                        help=f"Date windows to split the range into (default: {DEFAULT_WINDOWS})")
+    parser.add_argument('--concurrency', '-c', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Windows fetched at once (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument('--connections', type=int, default=DEFAULT_MAX_CONNECTIONS,
+                        help=f"Most open connections (default: {DEFAULT_MAX_CONNECTIONS})")
+    parser.add_argument('--process', action='store_true',
+                        help="Also clean emails with process-emails.py as they arrive")
+    parser.add_argument('--cleaned', default='output/cleaned-emails.json',
+                        help="Cleaned emails output file for --process")
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                        help="Worker processes for --process (default: 1, 0 = all cores)")
+    parser.add_argument('--token-file', default=DEFAULT_TOKEN_FILE,
+                        help=f"Token saved by auth.js (default: {DEFAULT_TOKEN_FILE})")
+    parser.add_argument('--token', default=None, help="Access token to use instead of --token-file")
+    parser.add_argument('--base-url', default=GRAPH_BASE_URL,
+                        help=f"Graph API root (default: {GRAPH_BASE_URL}; a local stub for testing)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    print("🚀 Email Style Extractor (concurrent)\n")
+    print("═" * 50 + "\n")
+
+    try:
+        access_token = args.token or load_token(args.token_file)
+        print("✅ Authentication token loaded\n")
+
+        end = datetime.now(timezone.utc)
+        start = end - timedelta(days=round(args.months * 30.44))
+        extractor = MailboxExtractor(access_token, start, end, base_url=args.base_url, windows=args.windows,
+                                     concurrency=args.concurrency, connections=args.connections,
+                                     limit=args.limit)
+        print(f"📅 Date range: {start.date().isoformat()} to {end.date().isoformat()} "
+              f"({args.windows} windows, {args.concurrency} at a time)\n")
+
+        emails = write_raw(extractor.emails(), args.output)
+        if args.process:
+            from importlib import import_module
+            process_emails = import_module('process-emails')
+            processor = process_emails.EmailProcessor(args.output, args.cleaned)
+            output_format = 'jsonl' if args.cleaned.endswith('.jsonl') else 'json'
+            processor.run(stream=True, output_format=output_format, workers=args.workers or os.cpu_count() or 1,
+                          emails=emails, date_range={'oldest': _graph_time(start), 'newest': _graph_time(end)})
+        else:
+            count = sum(1 for _ in emails)
+            print(f"\n✅ Extracted {count} emails")
+            print(f"💾 Saved to {args.output}")
+
+        client = extractor.client
+        if client is not None:
+            print(f"\n📊 {client.requests} requests over {client.connections_opened} connections, "
+                  f"{client.retries} retried")
+
+        print("\n🎉 Extraction complete!")
+        if not args.process:
+            print("\n📝 Next steps:")
+            print(f"   1. Run: python3 process-emails.py --stream --input {args.output}")
+            print("   2. Run: python3 analyze-style.py\n")
+
+    except GraphError as e:
+        print(f"\n❌ Extraction failed: {e}")
+        if e.status == 401:
+            print("\n📝 Authentication error. Please re-authenticate:\n   node auth.js\n")
+        elif e.status == 403:
+            print("\n📝 Permission error. Please check:")
+            print("   1. API permissions in Azure portal")
+            print("   2. Admin consent granted")
+            print("   3. User has access to mailbox\n")
+        raise SystemExit(1)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"\n❌ {e}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+"""
+Find Similar Emails
+
+Looks up the past responses most similar to an incoming message in the
+index built by `analyze-style.py --index`, for use as few-shot examples
+in place of the fixed samples in training-data.txt.
+
+Usage:
+  python3 find-similar.py --subject "Quote for lumber" --body "Can you send a price for..."
+  echo "Can you send a price for..." | python3 find-similar.py --subject "Quote" -k 3
+  python3 find-similar.py --subject "Delivery" --body "..." --json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from email_index import DEFAULT_INDEX_FILE, DEFAULT_TOP_K, EmailIndex
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Find past responses similar to an incoming email")
+    parser.add_argument('--index', default=DEFAULT_INDEX_FILE,
+                        help=f"Index built by analyze-style.py --index (default: {DEFAULT_INDEX_FILE})")
+    parser.add_argument('--subject', '-s', default='', help="Subject of the incoming email")
+    parser.add_argument('--body', '-b', default=None, help="Body of the incoming email (default: stdin)")
+    parser.add_argument('-k', type=int, default=DEFAULT_TOP_K,
+                        help=f"How many emails to return (default: {DEFAULT_TOP_K})")
+    parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.index):
+        sys.exit(f"❌ Index not found: {args.index}\n   Run: python3 analyze-style.py --index")
+
+    body = args.body if args.body is not None else sys.stdin.read()
+
+    index = EmailIndex(args.index)
+    try:
+        start = time.perf_counter()
+        results = index.search(args.subject, body, args.k)
+        elapsed = time.perf_counter() - start
+    finally:
+        index.close()
+
+    if args.json:
+        json.dump({'results': results}, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+        return
+
+    print(f"🔎 {len(results)} similar emails out of {len(index)} ({elapsed * 1000:.1f} ms)\n")
+    for i, result in enumerate(results, 1):
+        print(f"--- {i}. {result['subject']} (score {result['score']}) ---")
+        print(result['body'])
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Async Microsoft Graph Client
+
+A minimal HTTP/1.1 JSON client on asyncio streams for extract-emails.py:
+
+- Keep-alive connections are pooled per host and reused across requests;
+  at most max_connections are open at once, which also bounds how many
+  requests are in flight
+- 429 (throttled) and 503/504 responses are retried after the server's
+  Retry-After, or with exponential backoff and jitter when it gives none;
+  dropped connections are retried the same way
+- Responses with Content-Length or chunked bodies are supported; no
+  compression is requested
+
+Only what the Sent Items paging needs (GET with a bearer token) is
+implemented; it works the same against https://graph.microsoft.com and a
+local http:// stub (benchmarks/graph_stub.py).
+"""
+
+import asyncio
+import json
+import random
+import ssl
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urljoin, urlsplit
+
+GRAPH_BASE_URL = 'https://graph.microsoft.com/v1.0/'
+
+DEFAULT_MAX_CONNECTIONS = 8
+DEFAULT_MAX_RETRIES = 6
+DEFAULT_TIMEOUT = 60.0
+
+# Backoff before retry n (from 0) is about BACKOFF_BASE * 2 ** n seconds
+BACKOFF_BASE = 0.5
+MAX_BACKOFF = 60.0
+
+RETRY_STATUSES = {429, 503, 504}
+
+
+class GraphError(Exception):
+    """A Graph request that failed (after any retries)."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+
+class _Connection:
+    __slots__ = ('reader', 'writer')
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    def close(self):
+        self.writer.close()
+
+
+class GraphClient:
+    """Pooled keep-alive GET client for Graph JSON APIs. Use as an async context manager."""
+
+    def __init__(self, access_token: str, base_url: str = GRAPH_BASE_URL,
+                 max_connections: int = DEFAULT_MAX_CONNECTIONS, max_retries: int = DEFAULT_MAX_RETRIES,
+                 timeout: float = DEFAULT_TIMEOUT):
+        self.access_token = access_token
+        self.base_url = base_url if base_url.endswith('/') else base_url + '/'
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.timeout = timeout
+        # Idle connections per (scheme, host, port)
+        self._idle: Dict[Tuple[str, str, int], List[_Connection]] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._ssl: Optional[ssl.SSLContext] = None
+        self.requests = 0
+        self.retries = 0
+        self.connections_opened = 0
+
+    async def __aenter__(self):
+        self._slots = asyncio.Semaphore(self.max_connections)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        for connections in self._idle.values():
+            for connection in connections:
+                connection.close()
+        self._idle.clear()
+
+    async def get_json(self, url: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """GET a path (relative to base_url) or an absolute URL such as @odata.nextLink."""
+        url = urljoin(self.base_url, url)
+        if params:
+            url += ('&' if '?' in url else '?') + urlencode(params)
+
+        attempt = 0
+        while True:
+            try:
+                status, headers, body = await asyncio.wait_for(self._request(url), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+                if attempt >= self.max_retries:
+                    raise GraphError(0, f"{type(e).__name__} for {url}") from e
+                retry_after = None
+            else:
+                if 200 <= status < 300:
+                    return json.loads(body) if body else {}
+                if status not in RETRY_STATUSES or attempt >= self.max_retries:
+                    raise GraphError(status, _error_message(body))
+                retry_after = headers.get('retry-after')
+
+            await self._backoff(attempt, retry_after)
+            attempt += 1
+
+    async def _backoff(self, attempt: int, retry_after: Optional[str]):
+        self.retries += 1
+        try:
+            delay = float(retry_after) if retry_after is not None else None
+        except ValueError:
+            delay = None
+        if delay is None:
+            delay = min(BACKOFF_BASE * 2 ** attempt, MAX_BACKOFF) * (0.5 + random.random())
+        await asyncio.sleep(delay)
+
+    async def _request(self, url: str) -> Tuple[int, Dict[str, str], bytes]:
+        parts = urlsplit(url)
+        secure = parts.scheme == 'https'
+        key = (parts.scheme, parts.hostname or '', parts.port or (443 if secure else 80))
+        target = parts.path + ('?' + parts.query if parts.query else '')
+
+        async with self._slots:
+            connection = await self._connection(key, secure)
+            self.requests += 1
+            try:
+                connection.writer.write((
+                    f"GET {target} HTTP/1.1\r\n"
+                    f"Host: {parts.netloc}\r\n"
+                    f"Authorization: Bearer {self.access_token}\r\n"
+                    f"Accept: application/json\r\n"
+                    f"Connection: keep-alive\r\n\r\n"
+                ).encode('latin-1'))
+                await connection.writer.drain()
+                status, headers, body = await _read_response(connection.reader)
+            except BaseException:
+                connection.close()
+                raise
+
+            if headers.get('connection', '').lower() == 'close':
+                connection.close()
+            else:
+                self._idle.setdefault(key, []).append(connection)
+            return status, headers, body
+
+    async def _connection(self, key: Tuple[str, str, int], secure: bool) -> _Connection:
+        idle = self._idle.get(key)
+        while idle:
+            connection = idle.pop()
+            # The server may have closed an idle connection
+            if not connection.reader.at_eof():
+                return connection
+            connection.close()
+
+        context = None
+        if secure:
+            if self._ssl is None:
+                self._ssl = ssl.create_default_context()
+            context = self._ssl
+        reader, writer = await asyncio.open_connection(key[1], key[2], ssl=context)
+        self.connections_opened += 1
+        return _Connection(reader, writer)
+
+
+async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str], bytes]:
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        if name:
+            headers[name.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';', 1)[0], 16)
+            if size == 0:
+                # Trailers, if any, end with an empty line
+                while await reader.readuntil(b'\r\n') != b'\r\n':
+                    pass
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        return status, headers, b''.join(chunks)
+
+    if 'content-length' in headers:
+        return status, headers, await reader.readexactly(int(headers['content-length']))
+
+    # No length: the body runs to the end of the connection
+    headers['connection'] = 'close'
+    return status, headers, await reader.read()
+
+
+def _error_message(body: bytes) -> str:
+    try:
+        error = json.loads(body).get('error', {})
+        return f"{error.get('code', '')} {error.get('message', '')}".strip() or body[:200].decode('utf-8', 'replace')
+    except (ValueError, AttributeError):
+        return body[:200].decode('utf-8', 'replace')
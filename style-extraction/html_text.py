@@ -0,0 +1,196 @@
+"""
+HTML to Plain Text
+
+Converts email HTML to text in a single linear pass, without building a
+document tree. One compiled tokenizer walks the markup and fires start-tag,
+end-tag and text events at a small state machine:
+
+- Block elements (div, br, li, tr, headings, ...) become line breaks and
+  paragraphs end with a blank line, so paragraph structure survives for
+  the style analysis. Outlook's empty spacer paragraphs (<p>&nbsp;</p>)
+  add no further blank lines
+- All named and numeric character references are decoded
+- Content of style, script, head and title elements is dropped
+- Runs of whitespace inside text are collapsed, except in <pre>
+
+Only the text output is accumulated; markup is never copied, so memory
+stays proportional to the visible text even for huge, table-heavy Outlook
+bodies. A tag ends at the first '>' (a '>' inside a quoted attribute value
+is not supported), which keeps the tokenizer free of backtracking.
+"""
+
+import html
+import re
+from typing import List
+
+# Elements whose content is never shown
+SKIP_TAGS = {'style', 'script', 'head', 'title', 'noscript', 'template', 'xml'}
+
+# Elements that start and end on their own line
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'center', 'dd', 'div', 'dl', 'dt',
+    'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4',
+    'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section',
+    'table', 'tbody', 'thead', 'tfoot', 'tr', 'ul',
+}
+
+# Cells are separated by a space within their row
+CELL_TAGS = {'td', 'th'}
+
+_WHITESPACE_RUN = re.compile(r'\s+')
+
+_TOKEN = re.compile(
+    r'<!--.*?(?:-->|\Z)'                     # comment (incl. Outlook conditionals)
+    r'|<[!?][^>]*>'                            # doctype, <![if ...]>, <?xml ...?>
+    r'|<(/?)([A-Za-z][A-Za-z0-9:_-]*)([^>]*)>',  # tag
+    re.DOTALL,
+)
+
+# Where skipped content ends, per element
+_SKIP_END = {tag: re.compile(rf'</{tag}\s*>', re.IGNORECASE) for tag in SKIP_TAGS}
+_SKIP_END['head'] = re.compile(r'</head\s*>|(?=<body[\s>])', re.IGNORECASE)
+
+_HANDLED_TAGS = SKIP_TAGS | BLOCK_TAGS | CELL_TAGS | {'br'}
+
+
+class HTMLToText:
+    """Event-driven HTML-to-text state machine. Use `html_to_text()` to convert."""
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._pre_depth = 0
+        # Trailing newlines at the end of the output (-1 before any output)
+        self._newlines = -1
+        self._pending_space = False
+
+    # Output helpers
+
+    def _emit_text(self, text: str):
+        if self._pending_space and self._newlines == 0:
+            self._parts.append(' ')
+        self._pending_space = False
+        self._parts.append(text)
+        self._newlines = 0
+
+    def _break(self, count: int = 1):
+        """Make sure the output ends with at least `count` newlines."""
+        self._pending_space = False
+        if self._newlines < 0:
+            return  # nothing written yet
+        if self._newlines < count:
+            self._parts.append('\n' * (count - self._newlines))
+            self._newlines = count
+
+    # Parser events
+
+    def feed(self, markup: str):
+        """Tokenize a complete document and dispatch events for it."""
+        pos = 0
+        # Nothing after the last '>' can be markup
+        token_end = markup.rfind('>') + 1
+        search = _TOKEN.search
+
+        while True:
+            match = search(markup, pos, token_end)
+            if match is None:
+                break
+            start, end = match.span()
+
+            if start > pos:
+                text = markup[pos:start]
+                self.handle_data(html.unescape(text) if '&' in text else text)
+            pos = end
+
+            closing, tag, attrs = match.groups()
+            if tag is None:
+                continue  # comment or declaration
+            tag = tag.lower()
+            if tag not in _HANDLED_TAGS:
+                continue  # inline element: no effect on layout
+
+            if closing:
+                self.handle_endtag(tag)
+            elif tag in SKIP_TAGS:
+                if attrs.endswith('/'):
+                    continue
+                # Jump straight past the element's content and tokenize on
+                # from there, so nothing inside it (e.g. "<!--" in a script)
+                # can start a token
+                skip_end = _SKIP_END[tag].search(markup, pos)
+                pos = skip_end.end() if skip_end else len(markup)
+            elif attrs.endswith('/'):
+                self.handle_startendtag(tag)
+            else:
+                self.handle_starttag(tag)
+
+        if pos < len(markup):
+            # A comment left open after the last '>' runs to the end
+            comment = markup.find('<!--', pos)
+            text = markup[pos:] if comment < 0 else markup[pos:comment]
+            self.handle_data(html.unescape(text) if '&' in text else text)
+
+    def handle_starttag(self, tag: str):
+        if tag == 'br':
+            self._force_newline()
+        elif tag in BLOCK_TAGS:
+            self._break()
+            if tag == 'pre':
+                self._pre_depth += 1
+        elif tag in CELL_TAGS:
+            self._pending_space = True
+
+    def handle_startendtag(self, tag: str):
+        self.handle_starttag(tag)
+        if tag != 'br':
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str):
+        if tag in BLOCK_TAGS:
+            # A paragraph ends with a blank line; an empty one (e.g. Outlook's
+            # <p>&nbsp;</p> spacer) only makes sure there is one
+            self._break(2 if tag == 'p' else 1)
+            if tag == 'pre':
+                self._pre_depth = max(0, self._pre_depth - 1)
+        elif tag in CELL_TAGS:
+            self._pending_space = True
+
+    def _force_newline(self):
+        self._pending_space = False
+        if self._newlines < 0:
+            self._newlines = 0
+        self._parts.append('\n')
+        self._newlines += 1
+
+    def handle_data(self, data: str):
+        if not data:
+            return
+
+        if self._pre_depth:
+            self._emit_text(data)
+            self._newlines = len(data) - len(data.rstrip('\n'))
+            return
+
+        if data[0].isspace():
+            self._pending_space = True
+        text = _WHITESPACE_RUN.sub(' ', data).strip()
+        if text:
+            self._emit_text(text)
+            if data[-1].isspace():
+                self._pending_space = True
+
+    # Results
+
+    def get_text(self) -> str:
+        text = ''.join(self._parts)
+        # Drop spaces left at line ends by inline whitespace
+        return re.sub(r'[ \t]+\n', '\n', text).strip()
+
+
+def html_to_text(markup: str) -> str:
+    """Convert an HTML document or fragment to plain text."""
+    if not markup:
+        return ""
+
+    converter = HTMLToText()
+    converter.feed(markup)
+    return converter.get_text()
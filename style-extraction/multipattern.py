@@ -0,0 +1,209 @@
+"""
+Multi-Pattern Matching
+
+Finds every occurrence of any number of literal patterns with one
+compiled regular expression, instead of one search per pattern.
+
+The patterns are stored in a trie, which is compiled into one regex with
+shared prefixes factored out (e.g. "appreciate(?: your)?"). At each text
+position the regex engine follows at most one branch per character, so
+trying a position costs at most the length of the longest pattern,
+however many patterns there are. This is not an Aho-Corasick automaton:
+there are no failure links, and after each hit the search restarts one
+character after the hit's start, so text with many overlapping hits is
+re-read. Shorter patterns that are prefixes of a hit are reported from a
+table built at compile time.
+
+Used for corpus-wide customer name redaction in process-emails.py and,
+for long or whole-word term lists, by indicators.IndicatorScanner.
+"""
+
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union, Callable
+
+Match = Tuple[int, int, Any]
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == '_'
+
+
+def _lower_same_length(text: str) -> str:
+    """Lowercase text without changing character offsets."""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return ''.join(ch if len(ch.lower()) != 1 else ch.lower() for ch in text)
+
+
+# Trie key marking the end of a pattern (real keys are single characters)
+_END = ''
+
+
+def _trie_regex(trie: Dict[str, Any], word_boundaries: bool) -> str:
+    """Regex source for a trie, trying longer patterns before shorter ones."""
+
+    def subtree(node: Dict[str, Any], last_char: str) -> str:
+        alternatives = []
+        for ch, child in node.items():
+            if ch == _END:
+                continue
+            # Follow single-child chains as one literal run
+            parts = [re.escape(ch)]
+            while len(child) == 1 and _END not in child:
+                (ch, child), = child.items()
+                parts.append(re.escape(ch))
+            alternatives.append(''.join(parts) + subtree(child, ch))
+
+        if _END in node:
+            # Tried last, so the longest pattern wins at each position
+            alternatives.append(r'(?!\w)' if word_boundaries and _is_word_char(last_char) else '')
+
+        if len(alternatives) == 1:
+            return alternatives[0]
+        return '(?:' + '|'.join(alternatives) + ')'
+
+    # One shared start-of-word check, so every branch starts with a literal
+    # the regex engine can test before entering it
+    bounded = []
+    unbounded = []
+    for ch, child in trie.items():
+        branch = subtree({ch: child}, '')
+        (bounded if word_boundaries and _is_word_char(ch) else unbounded).append(branch)
+
+    if bounded:
+        unbounded.insert(0, r'(?<!\w)(?:' + '|'.join(bounded) + ')')
+    return '|'.join(unbounded)
+
+
+class MultiPatternMatcher:
+    """Compiled trie over literal string patterns.
+
+    Each pattern carries a value (e.g. a category) that is reported with
+    its matches. With `word_boundaries`, a hit may not extend a word: a
+    pattern starting (ending) with a word character may not be preceded
+    (followed) by one, like `\\b` in a regex. Patterns that start or end
+    with punctuation (e.g. "!") match next to anything on that side.
+    """
+
+    def __init__(self, patterns: Optional[Iterable[Union[str, Tuple[str, Any]]]] = None,
+                 word_boundaries: bool = True, ignore_case: bool = False):
+        self.word_boundaries = word_boundaries
+        self.ignore_case = ignore_case
+
+        self._trie: Dict[str, Any] = {}
+        self._patterns: Dict[str, Any] = {}
+        self._regex: Optional['re.Pattern'] = None
+        # Longest hit text -> (length, value) of it and each pattern that is
+        # a prefix of it, longest first
+        self._prefixes: Dict[str, List[Tuple[int, Any]]] = {}
+        self._built = True
+
+        for pattern in patterns or []:
+            if isinstance(pattern, tuple):
+                self.add(*pattern)
+            else:
+                self.add(pattern)
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def __contains__(self, pattern: str) -> bool:
+        if self.ignore_case:
+            pattern = pattern.lower()
+        return pattern in self._patterns
+
+    def add(self, pattern: str, value: Any = None):
+        """Add a pattern. The value defaults to the pattern itself."""
+        if not pattern:
+            return
+        if self.ignore_case:
+            pattern = pattern.lower()
+        if pattern in self._patterns:
+            return
+
+        value = pattern if value is None else value
+        self._patterns[pattern] = value
+
+        node = self._trie
+        for ch in pattern:
+            node = node.setdefault(ch, {})
+        node[_END] = True
+
+        self._built = False
+
+    def build(self):
+        """Compile the trie. Called automatically before scanning."""
+        patterns = self._patterns
+        self._regex = re.compile(_trie_regex(self._trie, self.word_boundaries)) if patterns else None
+        self._prefixes = {
+            pattern: [
+                (length, patterns[pattern[:length]])
+                for length in range(len(pattern), 0, -1)
+                if pattern[:length] in patterns
+            ]
+            for pattern in patterns
+        }
+        self._built = True
+
+    def iter_matches(self, text: str) -> Iterator[Match]:
+        """Yield (start, end, value) for every hit, including overlapping ones.
+
+        Hits come in order of start, longest first.
+        """
+        if not self._built:
+            self.build()
+        if not text or self._regex is None:
+            return
+
+        scan = _lower_same_length(text) if self.ignore_case else text
+        search = self._regex.search
+        prefixes = self._prefixes
+        check_bounds = self.word_boundaries
+        size = len(text)
+
+        pos = 0
+        while True:
+            match = search(scan, pos)
+            if match is None:
+                return
+            start, longest_end = match.span()
+
+            for length, value in prefixes[match.group()]:
+                end = start + length
+                # The regex checked the longest hit; shorter ones need their
+                # own end-of-word check
+                if (check_bounds and end < longest_end and end < size
+                        and _is_word_char(text[end]) and _is_word_char(text[end - 1])):
+                    continue
+                yield start, end, value
+
+            pos = start + 1
+
+    def find_all(self, text: str) -> List[Match]:
+        """Return non-overlapping hits, preferring the leftmost, then longest."""
+        matches = sorted(self.iter_matches(text), key=lambda m: (m[0], -m[1]))
+
+        selected = []
+        last_end = 0
+        for match in matches:
+            if match[0] >= last_end:
+                selected.append(match)
+                last_end = match[1]
+        return selected
+
+    def replace(self, text: str, replacement: Union[str, Callable[[Match], str]]) -> str:
+        """Replace non-overlapping hits with a string or callable(match)."""
+        matches = self.find_all(text)
+        if not matches:
+            return text
+
+        parts = []
+        last_end = 0
+        for match in matches:
+            parts.append(text[last_end:match[0]])
+            parts.append(replacement if isinstance(replacement, str) else replacement(match))
+            last_end = match[1]
+        parts.append(text[last_end:])
+
+        return ''.join(parts)
@@ -0,0 +1,199 @@
+"""
+Near-Duplicate Collapsing (MinHash + LSH)
+
+Much of the sent mail is templated: the same follow-up or confirmation
+with a different amount, which after anonymization is nearly the same
+text. Collapsing such emails before the style analysis means each
+template is analyzed once, with a weight, instead of thousands of times:
+
+- Each cleaned body is lowercased and split into words (as in
+  phrase_mining.py) and cut into overlapping SHINGLE_WORDS-word shingles
+- Its MinHash signature has SIGNATURE_SIZE values. Every shingle is
+  hashed once and the hash picks one of the bins, which keeps the
+  smallest hash it sees (one-permutation hashing). Empty bins borrow the
+  next filled bin's value (rotation densification). The fraction of
+  equal values in two signatures estimates the Jaccard similarity of
+  their shingle sets
+- The signature is split into BANDS bands. Emails sharing all the values
+  of any one band land in the same bucket (locality-sensitive hashing),
+  so only emails in a shared bucket are compared, never all pairs. A band
+  takes every BANDS-th bin rather than a run of neighbours, which after
+  densification may all hold the same borrowed value (often that of a
+  common greeting or sign-off shingle)
+- Emails are taken in order. The representatives an email shares a
+  bucket with are only candidates: the estimate is too coarse to decide
+  on (at 0.8 it lets through pairs below 0.6), so each candidate's exact
+  Jaccard similarity is computed from the shingle hashes. If the best one
+  reaches the threshold, the email joins that representative's cluster;
+  otherwise it becomes a representative itself
+
+Words are hashed with BLAKE2 rather than Python's hash(), so the same
+corpus collapses the same way in every run. Only the representatives'
+shingle hashes and band keys are kept, so memory grows with the distinct
+content.
+"""
+
+import hashlib
+from operator import eq
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from phrase_mining import tokenize
+
+# Jaccard similarity of shingle sets at which emails are merged
+DEFAULT_THRESHOLD = 0.8
+
+SHINGLE_WORDS = 3
+SIGNATURE_SIZE = 128
+# 16 bands of 8 values: emails at 0.8 similarity share a band ~95% of
+# the time, at 0.5 only ~6%
+BANDS = 16
+
+# Field holding how many emails a representative stands for
+WEIGHT_FIELD = 'clusterSize'
+
+_BIN_BITS = 7  # log2(SIGNATURE_SIZE)
+_VALUE_BITS = 64 - _BIN_BITS
+_VALUE_MASK = (1 << _VALUE_BITS) - 1
+_MASK64 = (1 << 64) - 1
+# Above every real value: marks an empty bin, and is the offset added per
+# bin a densified value was borrowed across
+_EMPTY = 1 << _VALUE_BITS
+
+
+def email_weight(email: Dict[str, Any]) -> int:
+    """How many emails a record stands for (1 unless it is a collapsed representative)."""
+    return email.get(WEIGHT_FIELD, 1)
+
+
+def word_hash(word: str) -> int:
+    """A stable 64-bit hash of a word (Python's hash() changes between runs)."""
+    return int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def shingle_hashes(text: str, word_hashes: Optional[Dict[str, int]] = None) -> List[int]:
+    """64-bit hashes of a text's word shingles, in order.
+
+    `word_hashes` caches word_hash() across calls.
+    """
+    if word_hashes is None:
+        word_hashes = {}
+    hashes = []
+    for word in tokenize(text.lower()):
+        h = word_hashes.get(word)
+        if h is None:
+            h = word_hashes[word] = word_hash(word)
+        hashes.append(h)
+
+    if len(hashes) >= SHINGLE_WORDS:
+        # A shingle's hash combines its words' hashes, rotated by position
+        return [
+            ((a << 2 | a >> 62) ^ (b << 1 | b >> 63) ^ c) & _MASK64
+            for a, b, c in zip(hashes, hashes[1:], hashes[2:])
+        ]
+    return [sum(hashes) & _MASK64]
+
+
+def signature(text: str, word_hashes: Optional[Dict[str, int]] = None,
+              shingles: Optional[Sequence[int]] = None) -> Tuple[int, ...]:
+    """MinHash signature of a text's word shingles.
+
+    `word_hashes` caches word_hash() across calls; `shingles` are the
+    text's shingle_hashes(), if already computed.
+    """
+    if shingles is None:
+        shingles = shingle_hashes(text, word_hashes)
+
+    mins = [_EMPTY] * SIGNATURE_SIZE
+    for h in shingles:
+        b = h >> _VALUE_BITS
+        value = h & _VALUE_MASK
+        if value < mins[b]:
+            mins[b] = value
+
+    if _EMPTY in mins:
+        filled = [b for b, value in enumerate(mins) if value != _EMPTY]
+        if not filled:
+            return (0,) * SIGNATURE_SIZE
+        # Borrow from the next filled bin to the right, wrapping around
+        densified = list(mins)
+        following = filled[0] + SIGNATURE_SIZE
+        for b in range(SIGNATURE_SIZE - 1, -1, -1):
+            if mins[b] != _EMPTY:
+                following = b
+            else:
+                densified[b] = mins[following % SIGNATURE_SIZE] + (following - b) * _EMPTY
+        mins = densified
+
+    return tuple(mins)
+
+
+def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(map(eq, a, b)) / SIGNATURE_SIZE
+
+
+def jaccard(a: FrozenSet[int], b: FrozenSet[int]) -> float:
+    """Exact Jaccard similarity of two sets of shingle hashes."""
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared) if shared else 0.0
+
+
+class NearDuplicateCollapser:
+    """Collapse emails into representatives of near-duplicate clusters, in input order."""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        self.threshold = threshold
+        self.representatives: List[Dict[str, Any]] = []
+        self._shingles: List[FrozenSet[int]] = []
+        # Per band: band values -> representatives with them
+        self._buckets: List[Dict[Tuple[int, ...], List[int]]] = [{} for _ in range(BANDS)]
+        self.emails = 0
+        self._word_hashes: Dict[str, int] = {}
+
+    def add(self, email: Dict[str, Any]) -> int:
+        """Add an email; returns the index of the representative it now belongs to."""
+        self.emails += email_weight(email)
+        hashes = shingle_hashes(email['body'], self._word_hashes)
+        shingles = frozenset(hashes)
+        sig = signature(email['body'], shingles=hashes)
+        bands = [sig[band::BANDS] for band in range(BANDS)]
+
+        best, best_similarity = -1, self.threshold
+        seen = set()
+        for buckets, key in zip(self._buckets, bands):
+            for candidate in buckets.get(key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                exact = jaccard(shingles, self._shingles[candidate])
+                # Earliest representative wins ties
+                if exact > best_similarity or (exact == best_similarity and
+                                               (best < 0 or candidate < best)):
+                    best, best_similarity = candidate, exact
+
+        if best >= 0:
+            representative = self.representatives[best]
+            representative[WEIGHT_FIELD] = email_weight(representative) + email_weight(email)
+            return best
+
+        index = len(self.representatives)
+        # A plain copy: records from an email_store.EmailStore hold views into its file
+        self.representatives.append(dict(email, **{WEIGHT_FIELD: email_weight(email)}))
+        self._shingles.append(shingles)
+        for buckets, key in zip(self._buckets, bands):
+            buckets.setdefault(key, []).append(index)
+        return index
+
+    def add_all(self, emails: Iterable[Dict[str, Any]]) -> 'NearDuplicateCollapser':
+        for email in emails:
+            self.add(email)
+        return self
+
+
+def collapse_near_duplicates(emails: Iterable[Dict[str, Any]],
+                             threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """One representative per near-duplicate cluster, in first-seen order, each
+    with WEIGHT_FIELD set to the number of emails it stands for."""
+    return NearDuplicateCollapser(threshold).add_all(emails).representatives
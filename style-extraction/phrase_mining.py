@@ -0,0 +1,182 @@
+"""
+Bounded-Memory Phrase Mining
+
+Finds the most frequent 3- to 8-word phrases in a corpus without a table
+entry per distinct n-gram:
+
+- Words are interned to integer ids
+- Each n-gram is keyed by one integer: its word ids packed side by side,
+  built by extending the key of the (n-1)-gram at the same position, so
+  no phrase strings are built while counting and keys never collide
+- Frequencies are tracked by a Space-Saving summary with a fixed number of
+  counters (sketches.SpaceSaving)
+
+With fewer distinct n-grams than counters the result is exact and matches
+a full Counter, including tie order. Beyond that, memory stays fixed and
+every phrase occurring more than about 2 * total / max_counters times is
+still found.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sketches import SpaceSaving
+
+# Roughly 150 bytes per counter, so the default is ~30 MB
+DEFAULT_MAX_COUNTERS = 200_000
+
+# Bits per word id in a phrase key (up to ~16.7M distinct words)
+_ID_BITS = 24
+_ID_MASK = (1 << _ID_BITS) - 1
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+
+
+def tokenize(text: str) -> List[str]:
+    """Split an (already lowercased) text into the words phrases are made of."""
+    return _PUNCTUATION.sub(' ', text).split()
+
+
+class PhraseMiner:
+    """Count phrases of min_length..max_length words across many texts."""
+
+    def __init__(self, min_length: int = 3, max_length: int = 8,
+                 max_counters: int = DEFAULT_MAX_COUNTERS):
+        if not 1 <= min_length <= max_length:
+            raise ValueError("phrase lengths must satisfy 1 <= min_length <= max_length")
+        self.min_length = min_length
+        self.max_length = max_length
+        # Id 0 is reserved so a key's length can be read off its top word
+        self.vocabulary: Dict[str, int] = {}
+        self.words: List[str] = ['']
+        self.counts = SpaceSaving(max_counters)
+        # Last external vocabulary seen by add_word_ids, and its id map (None if identical)
+        self._external: Optional[Tuple[List[str], Optional[List[int]]]] = None
+
+    def __getstate__(self):
+        # The external vocabulary is the caller's; don't ship it with the miner
+        state = self.__dict__.copy()
+        state['_external'] = None
+        return state
+
+    def intern(self, words: List[str]) -> List[int]:
+        """Map words to integer ids, assigning new ids as needed."""
+        vocabulary = self.vocabulary
+        ids = []
+        for word in words:
+            word_id = vocabulary.get(word)
+            if word_id is None:
+                word_id = len(self.words)
+                if word_id > _ID_MASK:
+                    raise ValueError("vocabulary too large for phrase keys")
+                vocabulary[word] = word_id
+                self.words.append(word)
+            ids.append(word_id)
+        return ids
+
+    def add_text(self, text: str):
+        """Count the phrases in one (already lowercased) text."""
+        self.add_ids(self.intern(tokenize(text)))
+
+    def add_words(self, words: List[str]):
+        self.add_ids(self.intern(words))
+
+    def add_word_ids(self, ids: Sequence[int], vocabulary: List[str]):
+        """Count the phrases in a text given as ids into another vocabulary.
+
+        `vocabulary` lists words by id, with id 0 unused (as in an
+        email_store.EmailStore written with tokens), so texts are not
+        re-tokenized. When this miner has not seen other words first, its
+        ids come out the same and are used as they are.
+        """
+        if self._external is None or self._external[0] is not vocabulary:
+            id_map = [0] + self.intern(vocabulary[1:])
+            identity = all(word_id == i for i, word_id in enumerate(id_map))
+            self._external = (vocabulary, None if identity else id_map)
+
+        id_map = self._external[1]
+        if id_map is None:
+            self.add_ids(list(ids))
+        else:
+            self.add_ids([id_map[word_id] for word_id in ids])
+
+    def add_ids(self, ids: Sequence[int]):
+        if len(ids) < self.min_length:
+            return
+
+        # Keys for n-word windows extend the (n-1)-word keys by one word.
+        # All n-grams of one length are counted before the next, as in the
+        # exact method, so first-seen order (and so tie-breaking) matches it
+        keys = ids
+        for n in range(1, min(self.max_length, len(ids)) + 1):
+            if n > 1:
+                keys = [(key << _ID_BITS) | word_id for key, word_id in zip(keys, ids[n - 1:])]
+            if n >= self.min_length:
+                self.counts.add_all(keys)
+
+    def phrase(self, key: int) -> str:
+        """Decode a phrase key back to its text."""
+        words = []
+        while key:
+            words.append(self.words[key & _ID_MASK])
+            key >>= _ID_BITS
+        return ' '.join(reversed(words))
+
+    def key(self, words: List[str]) -> int:
+        key = 0
+        for word_id in self.intern(words):
+            key = (key << _ID_BITS) | word_id
+        return key
+
+    def top_phrases(self, top_n: int = 15, min_count: int = 3) -> List[str]:
+        """The top_n phrases seen at least min_count times, most frequent first."""
+        return [
+            self.phrase(key) for key, count in self.counts.most_common(top_n * 3)
+            if count >= min_count
+        ][:top_n]
+
+    def merge(self, other: 'PhraseMiner'):
+        """Fold in counts from another miner (e.g. a different shard)."""
+        # Word ids differ between miners: map the other miner's ids to ours
+        id_map = [0] + self.intern(other.words[1:])
+        other_counts = other.counts
+
+        rekeyed = SpaceSaving(max(len(other_counts), 2))
+        for key, count in other_counts.counts.items():
+            new_key = 0
+            shift = 0
+            rest = key
+            while rest:
+                new_key |= id_map[rest & _ID_MASK] << shift
+                rest >>= _ID_BITS
+                shift += _ID_BITS
+            rekeyed.add(new_key, count, other_counts.error(key))
+        rekeyed.total = other_counts.total
+        rekeyed.floor = other_counts.floor
+        self.counts.merge(rekeyed)
+
+    def state(self) -> Dict[str, Any]:
+        """Tracked phrases and their counts, as JSON-serializable data."""
+        counts = self.counts
+        return {
+            'total': counts.total,
+            'floor': counts.floor,
+            # In first-seen order, which breaks ties between equal counts
+            'phrases': [[self.phrase(key), count, counts.error(key)] for key, count in counts.counts.items()],
+        }
+
+    def load_state(self, state: Dict[str, Any]):
+        """Replace the counts with a saved state(), keeping this miner's capacity."""
+        self.vocabulary = {}
+        self.words = ['']
+        self._external = None
+        self.counts = SpaceSaving(self.counts.capacity)
+        self._merge_phrases(state['phrases'], state['total'], state['floor'])
+
+    def _merge_phrases(self, phrases: List[Tuple[str, int, int]], total: int, floor: int):
+        rekeyed = SpaceSaving(max(len(phrases), 2))
+        for phrase, count, error in phrases:
+            rekeyed.add(self.key(phrase.split(' ')), count, error)
+        rekeyed.total = total
+        rekeyed.floor = floor
+        self.counts.merge(rekeyed)
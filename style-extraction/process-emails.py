@@ -9,15 +9,38 @@ Processes raw emails extracted from Microsoft Graph API:
 3. Anonymizes customer information
 4. Removes sensitive data
 5. Extracts only Joe's original writing
-
-Usage: python3 process-emails.py
+6. Keeps an anonymized key and the domain of the first recipient
+   (recipients.py), so the style can be profiled per recipient
+
+Usage:
+  python3 process-emails.py
+  python3 process-emails.py --stream
+  python3 process-emails.py --stream --input raw.jsonl --output cleaned.jsonl --format jsonl
+  python3 process-emails.py --workers 8
+  python3 process-emails.py --store --store-tokens
+  python3 process-emails.py --profile
 """
 
+import argparse
+import hashlib
 import json
 import re
 import os
+import time
+from collections import Counter, deque
 from datetime import datetime
-from typing import Dict, List, Any
+from itertools import islice
+from typing import Dict, List, Any, Optional, Iterable, Iterator, Tuple, Set
+
+from email_cache import EmailCache
+from email_store import DEFAULT_STORE_FILE, EmailStoreWriter
+from email_stream import EmailStreamReader, EmailStreamWriter
+from html_text import html_to_text
+from multipattern import MultiPatternMatcher
+from profiling import DEFAULT_SLOWEST, NO_STAGE, Profiler, trace_path
+from recipients import recipient_fields
+from redaction import Redactor
+from reply_quotes import TimeBudgetExceeded, strip_quoted, time_patterns
 
 # Regular expressions for anonymization
 PATTERNS = {
@@ -41,16 +64,128 @@ REPLACEMENTS = {
     'address': '[address removed]',
 }
 
+# When two patterns match at the same position, the first one listed here
+# wins (see redaction.py). More specific formats go before looser ones, so
+# a card number is never reported as a phone number.
+PATTERN_PRIORITY = [
+    'email',
+    'credit_card',
+    'ssn',
+    'phone',
+    'account_number',
+    'currency',
+    'address',
+]
+
+# All patterns compiled once into a single scanner
+REDACTOR = Redactor(PATTERNS, REPLACEMENTS, PATTERN_PRIORITY)
+
+# Joe's own name is never redacted
+OWN_NAMES = {'joe', 'newman', 'joe newman'}
+
+# Words that follow a greeting but are not names ("Hi there,", "Hello all,")
+NON_NAME_WORDS = {
+    'all', 'again', 'customer', 'everyone', 'everybody', 'folks', 'friend',
+    'guys', 'madam', 'sir', 'sirs', 'team', 'there', 'y', 'you',
+}
+
+# Display-name words of shared mailboxes, roles and companies, not people
+# ("Accounts Payable", "Sales Team", "Home Depot")
+ROLE_NAME_WORDS = {
+    'accounting', 'accounts', 'admin', 'billing', 'builders', 'company', 'construction',
+    'contractors', 'customer', 'depot', 'department', 'desk', 'dispatch', 'finance', 'group',
+    'help', 'inc', 'info', 'llc', 'ltd', 'office', 'operations', 'orders', 'payable',
+    'purchasing', 'receivable', 'receiving', 'sales', 'service', 'services', 'shipping',
+    'supply', 'support', 'team',
+}
+
+# A full name must be seen in this many emails to be redacted corpus-wide
+MIN_NAME_EMAILS = 2
+
+# Greeting names for the corpus-wide dictionary. Unlike the per-email
+# pattern, first and last name must be on the same line.
+DICTIONARY_GREETING_PATTERN = re.compile(r'\b(?:Hi|Hello|Hey|Dear)[ \t]+([A-Z][a-z]+(?:[ \t]+[A-Z][a-z]+)?)')
+NAME_TOKEN_PATTERN = re.compile(r"^[A-Z][a-z]+(?:['-][A-Z]?[a-z]+)?$")
+
+# Bump when the cleaning code changes so cached results are not reused.
+# Edits to PATTERNS/REPLACEMENTS/PATTERN_PRIORITY are picked up automatically.
+RULES_VERSION = '5:' + hashlib.sha256(
+    json.dumps([PATTERNS, REPLACEMENTS, PATTERN_PRIORITY], sort_keys=True).encode('utf-8')
+).hexdigest()[:16]
+
+DEFAULT_CACHE_FILE = 'output/.process-cache.sqlite'
+DEFAULT_QUARANTINE_FILE = 'output/quarantined-emails.jsonl'
+DEFAULT_PROFILE_FILE = 'output/process-profile.json'
+
+
+def _names_version(customer_names: List[str]) -> str:
+    """Cache rules version for bodies cleaned with this (sorted) name dictionary."""
+    digest = hashlib.sha256(json.dumps(customer_names).encode('utf-8')).hexdigest()[:16]
+    return f'{RULES_VERSION}:names:{digest}'
+
+
+def _new_stats() -> Dict[str, Any]:
+    return {
+        'total_processed': 0,
+        'anonymization_counts': {key: 0 for key in PATTERNS.keys()},
+        'quoted_text_removed': 0,
+        'empty_after_cleaning': 0,
+        'quarantined': 0,
+    }
+
+
+def _check_deadline(deadline: Optional[float], stage: str):
+    if deadline is not None and time.perf_counter() > deadline:
+        raise TimeBudgetExceeded(f"time budget exceeded after {stage}")
+
+
+def _compact_stats(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop zero counters (keeps cache entries small)."""
+    compact = {}
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            value = {k: v for k, v in value.items() if v}
+        if value:
+            compact[key] = value
+    return compact
+
+
 class EmailProcessor:
-    def __init__(self, input_file='output/raw-emails.json', output_file='output/cleaned-emails.json'):
+    def __init__(self, input_file='output/raw-emails.json', output_file='output/cleaned-emails.json',
+                 cache_file: Optional[str] = None, time_budget: Optional[float] = None,
+                 quarantine_file: str = DEFAULT_QUARANTINE_FILE, store_file: Optional[str] = None,
+                 store_tokens: bool = False, profile_file: Optional[str] = None,
+                 profile_slowest: int = DEFAULT_SLOWEST):
         self.input_file = input_file
         self.output_file = output_file
-        self.stats = {
-            'total_processed': 0,
-            'anonymization_counts': {key: 0 for key in PATTERNS.keys()},
-            'quoted_text_removed': 0,
-            'empty_after_cleaning': 0,
-        }
+        self.stats = _new_stats()
+        self.cache = EmailCache(cache_file, RULES_VERSION) if cache_file else None
+        # Seconds allowed per email; slower emails go to quarantine_file
+        self.time_budget = time_budget
+        self.quarantine_file = quarantine_file
+        self._quarantine = None
+        # Optional columnar copy of the output for analyze-style.py (email_store.py)
+        self.store_file = store_file
+        self.store_tokens = store_tokens
+        self._store: Optional[EmailStoreWriter] = None
+        # Opt-in stage/pattern/per-email timings (profiling.py), saved to profile_file
+        self.profile_file = profile_file
+        self.profiler: Optional[Profiler] = Profiler(profile_slowest) if profile_file else None
+        self.customer_names: Optional[List[str]] = None
+        self.name_matcher: Optional[MultiPatternMatcher] = None
+
+    def _stage(self, name: str):
+        """Time a stage if profiling, otherwise do nothing."""
+        return self.profiler.stage(name) if self.profiler is not None else NO_STAGE
+
+    def merge_stats(self, other: Dict[str, Any]):
+        """Add counters collected by another processor (e.g. a pool worker)."""
+        for key, value in other.items():
+            if isinstance(value, dict):
+                for sub_key, count in value.items():
+                    self.stats[key][sub_key] = self.stats[key].get(sub_key, 0) + count
+            else:
+                self.stats[key] += value
 
     def load_emails(self) -> Dict[str, Any]:
         """Load emails from JSON file."""
@@ -61,72 +196,45 @@ class EmailProcessor:
             return json.load(f)
 
     def remove_html_tags(self, text: str) -> str:
-        """Remove HTML tags and decode entities."""
+        """Convert HTML to text, keeping line and paragraph breaks."""
         if not text:
             return ""
 
-        # Remove HTML tags
-        text = re.sub(r'<style[^>]*>.*?</style>', '', text, flags=re.DOTALL | re.IGNORECASE)
-        text = re.sub(r'<script[^>]*>.*?</script>', '', text, flags=re.DOTALL | re.IGNORECASE)
-        text = re.sub(r'<[^>]+>', ' ', text)
-
-        # Decode common HTML entities
-        text = text.replace('&nbsp;', ' ')
-        text = text.replace('&amp;', '&')
-        text = text.replace('&lt;', '<')
-        text = text.replace('&gt;', '>')
-        text = text.replace('&quot;', '"')
-        text = text.replace('&#39;', "'")
-
-        # Normalize whitespace
-        text = re.sub(r'\s+', ' ', text)
-
-        return text.strip()
-
-    def remove_quoted_text(self, text: str) -> str:
-        """Remove quoted replies from email body."""
-        # Common quote patterns
-        quote_patterns = [
-            r'On .+ wrote:.*$',  # "On Mon, Jan 1, 2024 at 10:00 AM, Name wrote:"
-            r'From:.*?Sent:.*?To:.*?Subject:.*$',  # Outlook quote header
-            r'>.*$',  # Lines starting with >
-            r'_{5,}',  # Separator lines
-            r'[-]{3,}.*?[-]{3,}',  # --- quote ---
-        ]
-
-        for pattern in quote_patterns:
-            text = re.sub(pattern, '', text, flags=re.MULTILINE | re.DOTALL)
-
-        # Remove everything after common quote indicators
-        quote_indicators = [
-            'wrote:',
-            'From:',
-            'Sent:',
-            '-----Original Message-----',
-            '________________________________',
-        ]
-
-        for indicator in quote_indicators:
-            if indicator in text:
-                self.stats['quoted_text_removed'] += 1
-                text = text.split(indicator)[0]
-
-        return text.strip()
+        # Single pass: drops style/script/head, decodes all entities and
+        # turns block elements into newlines
+        return html_to_text(text)
+
+    def remove_quoted_text(self, text: str, deadline: Optional[float] = None) -> str:
+        """Remove quoted replies from email body.
+
+        Cuts at the earliest reply header ("On ... wrote:", Outlook
+        From:/Sent: block), Original Message separator or ">" quoted line,
+        found in a single line-by-line scan (see reply_quotes.py).
+        """
+        if self.profiler is not None:
+            self.profiler.add_patterns('quote', time_patterns(text))
+
+        original = strip_quoted(text, deadline)
+
+        if original is None:
+            return text.strip()
+
+        self.stats['quoted_text_removed'] += 1
+        return original.strip()
 
     def anonymize_text(self, text: str) -> str:
         """Anonymize sensitive information in text."""
         if not text:
             return ""
 
-        anonymized = text
+        if self.profiler is not None:
+            self.profiler.add_patterns('pii', REDACTOR.time_patterns(text))
+
+        # Replace all patterns in one pass over the text
+        anonymized, counts = REDACTOR.redact(text)
 
-        # Apply each pattern
-        for pattern_name, pattern in PATTERNS.items():
-            matches = re.findall(pattern, anonymized, re.IGNORECASE)
-            if matches:
-                self.stats['anonymization_counts'][pattern_name] += len(matches)
-                replacement = REPLACEMENTS.get(pattern_name, '[removed]')
-                anonymized = re.sub(pattern, replacement, anonymized, flags=re.IGNORECASE)
+        for pattern_name, count in counts.items():
+            self.stats['anonymization_counts'][pattern_name] += count
 
         return anonymized
 
@@ -142,71 +250,309 @@ class EmailProcessor:
 
         return list(set(names))  # Remove duplicates
 
+    def recipient_names(self, email: Dict[str, Any]) -> List[str]:
+        """People's names among an email's recipient display names, as "First Last"."""
+        names = []
+        for display_name in email.get('toRecipientNames') or []:
+            if not display_name or '@' in display_name:
+                continue
+            # "Smith, Alice (ABC Builders)" -> "Alice Smith"
+            display_name = re.sub(r'\(.*?\)', '', display_name).strip()
+            if display_name.count(',') == 1:
+                last, first = display_name.split(',')
+                display_name = f"{first.strip()} {last.strip()}"
+            tokens = display_name.split()
+            if any(token.lower() in ROLE_NAME_WORDS for token in tokens):
+                continue
+            if self._is_name(tokens):
+                names.append(' '.join(tokens))
+        return names
+
+    def collect_names(self, email: Dict[str, Any]) -> Set[str]:
+        """Full names ("First Last") in an email's greetings and recipient display names."""
+        names = set()
+        candidates = DICTIONARY_GREETING_PATTERN.findall(email.get('body') or '') + self.recipient_names(email)
+        for name in candidates:
+            tokens = name.split()
+            if len(tokens) > 1 and self._is_name(tokens):
+                names.add(' '.join(tokens))
+        return names
+
+    @staticmethod
+    def _is_name(tokens: List[str]) -> bool:
+        return (1 <= len(tokens) <= 3 and all(NAME_TOKEN_PATTERN.match(t) for t in tokens)
+                and ' '.join(tokens).lower() not in OWN_NAMES)
+
+    @staticmethod
+    def _name_parts(full_name: str) -> Set[str]:
+        """A full name and its words, skipping Joe's and words that are not names."""
+        parts = {full_name}
+        for token in full_name.split():
+            if token.lower() not in OWN_NAMES and token.lower() not in NON_NAME_WORDS:
+                parts.add(token)
+        return parts
+
+    def build_name_dictionary(self, emails: Iterable[Dict[str, Any]]) -> Set[str]:
+        """First pass: collect customer names across the whole corpus.
+
+        Only full names (first and last) seen in at least MIN_NAME_EMAILS
+        emails, and their words, are redacted in every email. A lone first
+        name ("Hi Will,") is only redacted in its own email (see
+        clean_email_body), so words like "will" or "mark" survive elsewhere.
+        """
+        seen = Counter()
+        for email in emails:
+            seen.update(self.collect_names(email))
+
+        names = set()
+        for full_name, count in seen.items():
+            if count >= MIN_NAME_EMAILS:
+                names |= self._name_parts(full_name)
+
+        self.set_customer_names(names)
+        return names
+
+    def set_customer_names(self, names: Iterable[str]):
+        """Redact these names in every body with one multi-pattern scan."""
+        self.customer_names = sorted(names)
+        self.name_matcher = MultiPatternMatcher(self.customer_names, word_boundaries=True)
+        self.name_matcher.build()
+        if self.cache is not None:
+            # Cleaned bodies depend on the dictionary, so it is part of the
+            # cache key: when it changes, every email is cleaned again
+            self.cache.rules_version = _names_version(self.customer_names)
+
     def anonymize_names(self, text: str, names: List[str]) -> str:
         """Replace customer names with [Customer]."""
         anonymized = text
 
-        for name in names:
+        # Corpus-wide dictionary first, in a single scan of the text
+        if self.name_matcher is not None:
+            anonymized = self.name_matcher.replace(anonymized, '[Customer]')
+            names = [name for name in names if name not in self.name_matcher]
+
+        # Longest first, so "Alice Smith" goes whole before "Alice"
+        for name in sorted(set(names), key=len, reverse=True):
             # Only replace if it's not "Joe" or "Newman"
-            if name.lower() not in ['joe', 'newman', 'joe newman']:
-                anonymized = anonymized.replace(name, '[Customer]')
+            if name.lower() not in OWN_NAMES:
+                anonymized = re.sub(rf'\b{re.escape(name)}\b', '[Customer]', anonymized)
 
         return anonymized
 
     def clean_email_body(self, email: Dict[str, Any]) -> str:
-        """Clean and process a single email body."""
+        """Clean and process a single email body.
+
+        Raises TimeBudgetExceeded if a time budget is set and the email
+        takes longer than that to clean.
+        """
         body = email.get('body', '')
 
         if not body:
             return ""
 
+        deadline = time.perf_counter() + self.time_budget if self.time_budget else None
+
         # Remove HTML if present
         if email.get('bodyType') == 'html':
-            body = self.remove_html_tags(body)
+            with self._stage('remove_html_tags'):
+                body = self.remove_html_tags(body)
+            _check_deadline(deadline, 'remove_html_tags')
 
         # Remove quoted text
-        body = self.remove_quoted_text(body)
+        with self._stage('remove_quoted_text'):
+            body = self.remove_quoted_text(body, deadline)
 
         # Extract and anonymize names
-        names = self.extract_sender_names(body)
-        body = self.anonymize_names(body, names)
+        with self._stage('anonymize_names'):
+            names = self.extract_sender_names(body)
+            for full_name in self.recipient_names(email):
+                names.extend(self._name_parts(full_name))
+            body = self.anonymize_names(body, names)
+        _check_deadline(deadline, 'anonymize_names')
 
         # Anonymize sensitive data
-        body = self.anonymize_text(body)
+        with self._stage('anonymize_text'):
+            body = self.anonymize_text(body)
+        _check_deadline(deadline, 'anonymize_text')
 
         # Final cleanup
-        body = re.sub(r'\n\s*\n\s*\n+', '\n\n', body)  # Remove excessive newlines
-        body = body.strip()
+        with self._stage('final_cleanup'):
+            body = re.sub(r'\n\s*\n\s*\n+', '\n\n', body)  # Remove excessive newlines
+            body = body.strip()
 
         return body
 
-    def process_emails(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Process all emails in the dataset."""
-        print(f"🔧 Processing {len(data['emails'])} emails...\n")
-
-        cleaned_emails = []
-
-        for i, email in enumerate(data['emails'], 1):
-            if i % 10 == 0 or i == 1:
-                print(f"   [{i}/{len(data['emails'])}] Processing...")
-
-            cleaned_body = self.clean_email_body(email)
+    def clean_email_tracked(self, email: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """Clean one body, also returning the stats counters it changed."""
+        saved_stats = self.stats
+        self.stats = _new_stats()
+        start_ns = time.perf_counter_ns()
+        try:
+            body = self.clean_email_body(email)
+        except TimeBudgetExceeded:
+            body = ''
+            self.stats = _new_stats()
+            self.stats['quarantined'] = 1
+        finally:
+            delta, self.stats = self.stats, saved_stats
+            if self.profiler is not None:
+                self.profiler.add_email(email.get('id'), (time.perf_counter_ns() - start_ns) / 1e9, start_ns)
+
+        self.merge_stats(delta)
+        return body, _compact_stats(delta)
+
+    def lookup_cached(self, email: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+        """Return (cache key, cleaned body) for an email; the body is None on a miss.
+
+        A hit also replays the stats the email produced when it was cleaned.
+        """
+        if self.cache is None:
+            return None, None
+
+        key = self.cache.key(email)
+        entry = self.cache.get(key)
+        if entry is None:
+            return key, None
+
+        body, delta = entry
+        self.merge_stats(delta)
+        return key, body
+
+    def process_email(self, email: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Clean a single raw email, returning None if nothing usable is left."""
+        key, cleaned_body = self.lookup_cached(email)
+
+        if cleaned_body is None:
+            cleaned_body, delta = self.clean_email_tracked(email)
+            if not self.accept_cleaned(email, key, cleaned_body, delta):
+                return None
+
+        return self.build_record(email, cleaned_body)
+
+    def accept_cleaned(self, email: Dict[str, Any], key: Optional[str],
+                       cleaned_body: str, delta: Dict[str, Any]) -> bool:
+        """Cache a freshly cleaned body, or quarantine an email that ran out of time."""
+        if delta.get('quarantined'):
+            self.quarantine(email)
+            return False
+
+        if key is not None:
+            self.cache.put(key, cleaned_body, delta)
+        return True
+
+    def quarantine(self, email: Dict[str, Any]):
+        """Set aside an email that exceeded the time budget for inspection."""
+        if self._quarantine is None:
+            directory = os.path.dirname(self.quarantine_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._quarantine = open(self.quarantine_file, 'a', encoding='utf-8')
+
+        record = {'quarantineReason': f"exceeded {self.time_budget}s time budget", **email}
+        self._quarantine.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._quarantine.flush()
+
+    def build_record(self, email: Dict[str, Any], cleaned_body: str) -> Optional[Dict[str, Any]]:
+        """Build the output record for a cleaned body, or None if it is too short."""
+        if not cleaned_body or len(cleaned_body) < 20:
+            self.stats['empty_after_cleaning'] += 1
+            return None  # Skip empty or very short emails
+
+        self.stats['total_processed'] += 1
 
-            if not cleaned_body or len(cleaned_body) < 20:
-                self.stats['empty_after_cleaning'] += 1
-                continue  # Skip empty or very short emails
+        return {
+            'id': email['id'],
+            'subject': email.get('subject', ''),
+            'sentDate': email.get('sentDate', ''),
+            'body': cleaned_body,
+            'wordCount': len(cleaned_body.split()),
+            'originalWordCount': email.get('wordCount', 0),
+            **recipient_fields(email.get('toRecipients')),
+            'importance': email.get('importance') or 'normal',
+        }
 
-            cleaned_email = {
-                'id': email['id'],
-                'subject': email.get('subject', ''),
-                'sentDate': email.get('sentDate', ''),
-                'body': cleaned_body,
-                'wordCount': len(cleaned_body.split()),
-                'originalWordCount': email.get('wordCount', 0),
-            }
+    def iter_processed(self, emails: Iterable[Dict[str, Any]], workers: int = 1,
+                       chunk_size: int = 200, total: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Yield cleaned emails in input order, optionally using a process pool.
+
+        With workers > 1, emails are sent to the pool in chunks and each
+        worker's stats are merged back into self.stats. Only a few chunks per
+        worker are in flight at once, so streamed input stays bounded. Cache
+        lookups and writes stay in this process; only misses go to the pool.
+        """
+        progress_total = f"/{total}" if total is not None else ""
+
+        if workers <= 1:
+            for i, email in enumerate(emails, 1):
+                if i % 10 == 0 or i == 1:
+                    print(f"   [{i}{progress_total}] Processing...")
+
+                cleaned_email = self.process_email(email)
+                if cleaned_email is not None:
+                    yield cleaned_email
+            return
+
+        # Imported here: the pool machinery adds to every startup otherwise
+        from concurrent.futures import ProcessPoolExecutor
+
+        emails = iter(emails)
+        done = 0
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.customer_names, self.time_budget,
+                                           self.profiler.slowest if self.profiler else None)) as pool:
+            pending = deque()
+
+            def submit_next() -> bool:
+                chunk = list(islice(emails, chunk_size))
+                if not chunk:
+                    return False
+
+                lookups = [self.lookup_cached(email) for email in chunk]
+                misses = [email for email, (_, body) in zip(chunk, lookups) if body is None]
+                future = pool.submit(_clean_chunk, misses) if misses else None
+                pending.append((chunk, lookups, future))
+                return True
+
+            while len(pending) < workers * 2 and submit_next():
+                pass
+
+            while pending:
+                chunk, lookups, future = pending.popleft()
+                results, profile = future.result() if future is not None else ([], None)
+                cleaned = iter(results)
+                if profile is not None:
+                    self.profiler.merge(profile)
+                submit_next()
+
+                for email, (key, cleaned_body) in zip(chunk, lookups):
+                    if cleaned_body is None:
+                        cleaned_body, delta = next(cleaned)
+                        self.merge_stats(delta)
+                        if not self.accept_cleaned(email, key, cleaned_body, delta):
+                            continue
+
+                    cleaned_email = self.build_record(email, cleaned_body)
+                    if cleaned_email is not None:
+                        yield cleaned_email
+
+                done += len(chunk)
+                print(f"   [{done}{progress_total}] Processing...")
+
+    def stored(self, cleaned_emails: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Pass cleaned emails through, also writing them to the columnar store if enabled."""
+        for cleaned_email in cleaned_emails:
+            if self._store is not None:
+                self._store.write(cleaned_email)
+            yield cleaned_email
+
+    def process_emails(self, data: Dict[str, Any], workers: int = 1) -> Dict[str, Any]:
+        """Process all emails in the dataset."""
+        print(f"🔧 Processing {len(data['emails'])} emails...\n")
 
-            cleaned_emails.append(cleaned_email)
-            self.stats['total_processed'] += 1
+        cleaned_emails = list(self.stored(
+            self.iter_processed(data['emails'], workers, total=len(data['emails']))
+        ))
 
         return {
             'processedAt': datetime.now().isoformat(),
@@ -216,9 +562,35 @@ class EmailProcessor:
             'emails': cleaned_emails,
         }
 
+    def process_stream(self, output_format: str = 'json', workers: int = 1,
+                       emails: Optional[Iterable[Dict[str, Any]]] = None,
+                       date_range: Optional[Dict[str, Any]] = None):
+        """Process emails one at a time from input file to output file.
+
+        Only the email currently being cleaned is held in memory, so this
+        works on corpora far larger than RAM. The input may be JSONL or the
+        usual `{"emails": [...]}` document, or `emails` as they arrive (e.g.
+        from extract-emails.py) instead of the input file.
+        """
+        reader = EmailStreamReader(self.input_file) if emails is None else None
+        source = reader.format if reader is not None else 'extraction'
+        print(f"🔧 Streaming emails ({source} → {output_format})...\n")
+
+        with EmailStreamWriter(self.output_file, output_format) as writer:
+            for cleaned_email in self.stored(self.iter_processed(reader if reader is not None else emails, workers)):
+                writer.write(cleaned_email)
+
+            if reader is not None:
+                date_range = reader.metadata.get('dateRange', {})
+            writer.close(self.stats, {'dateRange': date_range or {}})
+
+        print(f"\n💾 Saved to {self.output_file}")
+
     def save_output(self, data: Dict[str, Any]):
         """Save processed emails to file."""
-        os.makedirs(os.path.dirname(self.output_file), exist_ok=True)
+        directory = os.path.dirname(self.output_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
 
         with open(self.output_file, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
@@ -236,25 +608,58 @@ class EmailProcessor:
                 print(f"   {key.replace('_', ' ').title()}: {count} replaced")
         print(f"   Quoted text removed: {self.stats['quoted_text_removed']} emails")
 
-    def run(self):
-        """Run the complete processing pipeline."""
-        print("🔧 Email Processing and Anonymization")
-        print("=" * 50 + "\n")
+        if self.stats['quarantined']:
+            print(f"\n⏱️  Quarantined (over time budget): {self.stats['quarantined']} emails")
+            print(f"   See {self.quarantine_file}")
 
-        try:
-            # Load emails
-            print(f"📂 Reading {self.input_file}...")
-            data = self.load_emails()
-            print(f"✅ Loaded {len(data.get('emails', []))} emails\n")
+        if self.cache is not None:
+            print(f"\n♻️  Cache: {self.cache.hits} reused, {self.cache.misses} cleaned")
 
-            # Process
-            processed_data = self.process_emails(data)
+    def run(self, stream: bool = False, output_format: str = 'json', workers: int = 1,
+            corpus_names: bool = True, emails: Optional[Iterable[Dict[str, Any]]] = None,
+            date_range: Optional[Dict[str, Any]] = None):
+        """Run the complete processing pipeline.
 
-            # Save
-            self.save_output(processed_data)
+        With `emails` (streaming only), those are processed as they arrive
+        instead of the input file. The corpus-wide name dictionary needs a
+        pass over every email first, so then only names found in each
+        email itself are redacted.
+        """
+        print("🔧 Email Processing and Anonymization")
+        print("=" * 50 + "\n")
 
-            # Print stats
-            self.print_stats()
+        try:
+            self.open_store()
+
+            if stream:
+                if emails is None:
+                    self.prepare_stream(corpus_names)
+
+                print(f"📂 Streaming {self.input_file if emails is None else 'emails as they are extracted'}...")
+                with self._stage('process_stream'):
+                    self.process_stream(output_format, workers, emails, date_range)
+            else:
+                # Load emails
+                print(f"📂 Reading {self.input_file}...")
+                with self._stage('load_emails'):
+                    data = self.load_emails()
+                print(f"✅ Loaded {len(data.get('emails', []))} emails\n")
+
+                # Build the corpus-wide name dictionary
+                if corpus_names:
+                    with self._stage('build_name_dictionary'):
+                        names = self.build_name_dictionary(data['emails'])
+                    print(f"👥 {len(names)} customer names in dictionary\n")
+
+                # Process
+                with self._stage('process_emails'):
+                    processed_data = self.process_emails(data, workers)
+
+                # Save
+                with self._stage('save_output'):
+                    self.save_output(processed_data)
+
+            self.finish()
 
             print("\n✅ Processing complete!")
             print("\n📝 Next step:")
@@ -264,7 +669,125 @@ class EmailProcessor:
             print(f"\n❌ Error: {str(e)}")
             raise
 
+        finally:
+            self.close()
+
+    def open_store(self):
+        """Start writing the columnar store, if one was asked for."""
+        if self.store_file:
+            self._store = EmailStoreWriter(self.store_file, tokens=self.store_tokens).open()
+
+    def prepare_stream(self, corpus_names: bool = True):
+        """Check the input file before streaming it, first collecting corpus names from it if asked."""
+        if not os.path.exists(self.input_file):
+            raise FileNotFoundError(f"Input file not found: {self.input_file}")
+
+        if corpus_names:
+            print(f"👥 Collecting customer names from {self.input_file}...")
+            with self._stage('build_name_dictionary'):
+                names = self.build_name_dictionary(EmailStreamReader(self.input_file))
+            print(f"✅ {len(names)} names in dictionary\n")
+
+    def finish(self):
+        """After processing: complete the columnar store, evict stale cache entries, print stats."""
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+            print(f"💾 Columnar store saved to {self.store_file}")
+
+        if self.cache is not None:
+            evicted = self.cache.evict_stale()
+            if evicted:
+                print(f"🧹 Evicted {evicted} stale cache entries")
+
+        # Print stats
+        self.print_stats()
+
+        if self.profiler is not None:
+            self.profiler.finish()
+            self.profiler.print_summary()
+            self.profiler.save(self.profile_file)
+            print(f"   Saved to {self.profile_file} and {trace_path(self.profile_file)}")
+
+    def close(self):
+        """Release the cache and quarantine file; discard an unfinished store."""
+        if self.cache is not None:
+            self.cache.close()
+        if self._quarantine is not None:
+            self._quarantine.close()
+        if self._store is not None:
+            self._store.abort()
+
+
+_worker_name_matcher: Optional[MultiPatternMatcher] = None
+_worker_time_budget: Optional[float] = None
+# Profile each chunk, keeping this many slowest emails (None: not profiling)
+_worker_profile_slowest: Optional[int] = None
+
+
+def _init_worker(customer_names: Optional[List[str]], time_budget: Optional[float] = None,
+                 profile_slowest: Optional[int] = None):
+    """Pool initializer: build the name matcher once per worker process."""
+    global _worker_name_matcher, _worker_time_budget, _worker_profile_slowest
+    _worker_time_budget = time_budget
+    _worker_profile_slowest = profile_slowest
+    if customer_names is not None:
+        _worker_name_matcher = MultiPatternMatcher(customer_names, word_boundaries=True)
+        _worker_name_matcher.build()
+
+
+def _clean_chunk(emails: List[Dict[str, Any]]) -> Tuple[List[Tuple[str, Dict[str, Any]]], Optional[Profiler]]:
+    """Pool worker: clean a chunk of emails, returning each body and its stats
+    (and the chunk's profile, if profiling)."""
+    processor = EmailProcessor(time_budget=_worker_time_budget)
+    processor.name_matcher = _worker_name_matcher
+    if _worker_profile_slowest is not None:
+        processor.profiler = Profiler(_worker_profile_slowest)
+    return [processor.clean_email_tracked(email) for email in emails], processor.profiler
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Clean and anonymize extracted emails")
+    parser.add_argument('--input', '-i', default='output/raw-emails.json',
+                        help="Raw emails (JSON document or JSONL)")
+    parser.add_argument('--output', '-o', default='output/cleaned-emails.json',
+                        help="Cleaned emails output file")
+    parser.add_argument('--stream', action='store_true',
+                        help="Process one email at a time instead of loading the whole file")
+    parser.add_argument('--format', choices=['json', 'jsonl'], default=None,
+                        help="Output format for --stream (default: from output extension)")
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                        help="Number of worker processes (default: 1, 0 = all cores)")
+    parser.add_argument('--no-corpus-names', action='store_true',
+                        help="Only redact names found in each email's own greeting")
+    parser.add_argument('--cache', nargs='?', const=DEFAULT_CACHE_FILE, default=None, metavar='PATH',
+                        help=f"Reuse results for unchanged emails (default path: {DEFAULT_CACHE_FILE})")
+    parser.add_argument('--time-budget', type=float, default=None, metavar='SECONDS',
+                        help="Quarantine emails that take longer than this to clean")
+    parser.add_argument('--quarantine', default=DEFAULT_QUARANTINE_FILE, metavar='PATH',
+                        help=f"Where quarantined emails are written (default: {DEFAULT_QUARANTINE_FILE})")
+    parser.add_argument('--store', nargs='?', const=DEFAULT_STORE_FILE, default=None, metavar='PATH',
+                        help=f"Also write a memory-mapped columnar store for analyze-style.py "
+                             f"(default path: {DEFAULT_STORE_FILE})")
+    parser.add_argument('--store-tokens', action='store_true',
+                        help="Pre-tokenize bodies in the store so phrase mining can skip it")
+    parser.add_argument('--profile', nargs='?', const=DEFAULT_PROFILE_FILE, default=None, metavar='PATH',
+                        help=f"Record per-stage, per-pattern and per-email timings "
+                             f"(default path: {DEFAULT_PROFILE_FILE}, plus a Chrome trace)")
+    parser.add_argument('--profile-slowest', type=int, default=DEFAULT_SLOWEST, metavar='N',
+                        help=f"How many of the slowest emails to report (default: {DEFAULT_SLOWEST})")
+    return parser.parse_args()
+
 
 if __name__ == "__main__":
-    processor = EmailProcessor()
-    processor.run()
+    args = parse_args()
+    output_format = args.format or ('jsonl' if args.output.endswith('.jsonl') else 'json')
+
+    workers = args.workers or os.cpu_count() or 1
+
+    processor = EmailProcessor(args.input, args.output, cache_file=args.cache,
+                               time_budget=args.time_budget, quarantine_file=args.quarantine,
+                               store_file=args.store, store_tokens=args.store_tokens,
+                               profile_file=args.profile, profile_slowest=args.profile_slowest)
+    processor.run(stream=args.stream, output_format=output_format, workers=workers,
+                  corpus_names=not args.no_corpus_names)
@@ -0,0 +1,221 @@
+"""
+Pipeline Profiling
+
+Opt-in instrumentation for process-emails.py and analyze-style.py
+(--profile). A Profiler records:
+
+- Wall and CPU time per stage (remove_html_tags, remove_quoted_text,
+  anonymize_text, each style analysis, ...)
+- Time per regex pattern: each PII pattern and reply/quote pattern is also
+  run on its own over the same text, since in the pipeline they share one
+  scan and cannot be timed apart
+- Emails per second, and the slowest emails by id
+
+and exports them as a JSON report and as a Chrome trace-event file (open
+it in chrome://tracing or https://ui.perfetto.dev). Profilers filled in
+pool workers are merged into the parent's, and their events keep the
+worker's pid, so each worker gets its own row in the trace.
+
+Profiling costs time of its own (the standalone pattern scans roughly
+double anonymization), so compare profiled runs with each other, not with
+unprofiled ones.
+"""
+
+import heapq
+import json
+import os
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_SLOWEST = 10
+
+# Trace events beyond this are counted but not kept (~100 bytes each)
+DEFAULT_MAX_TRACE_EVENTS = 200_000
+
+# What EmailProcessor/StyleAnalyzer use in place of a stage when not profiling
+NO_STAGE = nullcontext()
+
+
+def trace_path(report_path: str) -> str:
+    """Where the trace goes for a given report path (x.json -> x.trace.json)."""
+    root, ext = os.path.splitext(report_path)
+    return f"{root}.trace{ext or '.json'}"
+
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 'args', 'start_ns', 'cpu_start')
+
+    def __init__(self, profiler: 'Profiler', name: str, args: Optional[Dict[str, Any]]):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.cpu_start = time.thread_time()
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall_ns = time.perf_counter_ns() - self.start_ns
+        cpu = time.thread_time() - self.cpu_start
+        self.profiler.add_stage(self.name, wall_ns / 1e9, cpu, self.start_ns, self.args)
+
+
+class Profiler:
+    """Collects stage, pattern and per-email timings for one run."""
+
+    def __init__(self, slowest: int = DEFAULT_SLOWEST, max_trace_events: int = DEFAULT_MAX_TRACE_EVENTS):
+        self.slowest = slowest
+        self.max_trace_events = max_trace_events
+        self.started_at = time.perf_counter()
+        self.elapsed: Optional[float] = None
+        # name -> [calls, wall seconds, cpu seconds]
+        self.stages: Dict[str, List[float]] = {}
+        # group -> {pattern: [calls, seconds]}
+        self.patterns: Dict[str, Dict[str, List[float]]] = {}
+        self.emails = 0
+        self.email_seconds = 0.0
+        # Min-heap of (seconds, tiebreak, email id): the slowest emails seen
+        self._slowest: List[Tuple[float, int, Any]] = []
+        self._tiebreak = 0
+        self.events: List[Dict[str, Any]] = []
+        self.dropped_events = 0
+
+    def stage(self, name: str, **args):
+        """Context manager timing one run of a stage."""
+        return _Stage(self, name, args or None)
+
+    def add_stage(self, name: str, wall: float, cpu: float, start_ns: Optional[int] = None,
+                  args: Optional[Dict[str, Any]] = None):
+        totals = self.stages.get(name)
+        if totals is None:
+            totals = self.stages[name] = [0, 0.0, 0.0]
+        totals[0] += 1
+        totals[1] += wall
+        totals[2] += cpu
+
+        if start_ns is not None:
+            self._event(name, start_ns, wall, args)
+
+    def add_patterns(self, group: str, timings: Dict[str, float]):
+        """Record one timing per pattern of a group (e.g. 'pii', 'quote')."""
+        totals = self.patterns.setdefault(group, {})
+        for name, seconds in timings.items():
+            entry = totals.get(name)
+            if entry is None:
+                entry = totals[name] = [0, 0.0]
+            entry[0] += 1
+            entry[1] += seconds
+
+    def add_email(self, email_id: Any, seconds: float, start_ns: Optional[int] = None):
+        """Record how long one email took, end to end."""
+        self.emails += 1
+        self.email_seconds += seconds
+        self._track_slowest(email_id, seconds)
+
+        if start_ns is not None:
+            self._event('email', start_ns, seconds, {'id': email_id})
+
+    def _track_slowest(self, email_id: Any, seconds: float):
+        self._tiebreak += 1
+        entry = (seconds, self._tiebreak, email_id)
+        if len(self._slowest) < self.slowest:
+            heapq.heappush(self._slowest, entry)
+        elif self._slowest and seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def _event(self, name: str, start_ns: int, seconds: float, args: Optional[Dict[str, Any]]):
+        if len(self.events) >= self.max_trace_events:
+            self.dropped_events += 1
+            return
+        event = {
+            'name': name, 'ph': 'X', 'ts': start_ns / 1000, 'dur': seconds * 1e6,
+            'pid': os.getpid(), 'tid': 0,
+        }
+        if args:
+            event['args'] = args
+        self.events.append(event)
+
+    def finish(self):
+        """Mark the end of the run (for emails per second)."""
+        self.elapsed = time.perf_counter() - self.started_at
+
+    def merge(self, other: 'Profiler'):
+        """Fold in a profiler filled by another process (e.g. a pool worker)."""
+        for name, (calls, wall, cpu) in other.stages.items():
+            totals = self.stages.setdefault(name, [0, 0.0, 0.0])
+            totals[0] += calls
+            totals[1] += wall
+            totals[2] += cpu
+        for group, timings in other.patterns.items():
+            totals = self.patterns.setdefault(group, {})
+            for name, (calls, seconds) in timings.items():
+                entry = totals.setdefault(name, [0, 0.0])
+                entry[0] += calls
+                entry[1] += seconds
+
+        self.emails += other.emails
+        self.email_seconds += other.email_seconds
+        for seconds, _, email_id in sorted(other._slowest, key=lambda entry: entry[1]):
+            self._track_slowest(email_id, seconds)
+
+        room = self.max_trace_events - len(self.events)
+        self.events.extend(other.events[:max(room, 0)])
+        self.dropped_events += other.dropped_events + max(len(other.events) - max(room, 0), 0)
+
+    def report(self) -> Dict[str, Any]:
+        """The collected timings as JSON-serializable data, slowest first."""
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self.started_at
+        return {
+            'elapsedSeconds': round(elapsed, 6),
+            'emails': self.emails,
+            'emailsPerSecond': round(self.emails / elapsed, 1) if elapsed else None,
+            'stages': {
+                name: {
+                    'calls': calls,
+                    'wallSeconds': round(wall, 6),
+                    'cpuSeconds': round(cpu, 6),
+                    'meanMs': round(wall / calls * 1000, 4) if calls else 0.0,
+                }
+                for name, (calls, wall, cpu) in sorted(self.stages.items(), key=lambda item: -item[1][1])
+            },
+            'patterns': {
+                group: {
+                    name: {'calls': calls, 'seconds': round(seconds, 6)}
+                    for name, (calls, seconds) in sorted(timings.items(), key=lambda item: -item[1][1])
+                }
+                for group, timings in self.patterns.items()
+            },
+            'slowestEmails': [
+                {'id': email_id, 'seconds': round(seconds, 6)}
+                for seconds, _, email_id in sorted(self._slowest, key=lambda entry: (-entry[0], entry[1]))
+            ],
+            'droppedTraceEvents': self.dropped_events,
+        }
+
+    def save(self, path: str):
+        """Write the JSON report to `path` and the Chrome trace next to it."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2, default=str)
+        with open(trace_path(path), 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f, default=str)
+
+    def print_summary(self, top: int = 5):
+        report = self.report()
+        print(f"\n⏱️  Profile: {report['emails']} emails in {report['elapsedSeconds']:.2f}s "
+              f"({report['emailsPerSecond'] or 0:,.0f} emails/s)")
+        for name, stage in list(report['stages'].items())[:top]:
+            print(f"   {name}: {stage['wallSeconds']:.3f}s wall, {stage['cpuSeconds']:.3f}s CPU "
+                  f"({stage['calls']} calls)")
+        for group, timings in report['patterns'].items():
+            worst = next(iter(timings.items()), None)
+            if worst:
+                print(f"   Slowest {group} pattern: {worst[0]} ({worst[1]['seconds']:.3f}s)")
+        if report['slowestEmails']:
+            slowest = report['slowestEmails'][0]
+            print(f"   Slowest email: {slowest['id']} ({slowest['seconds'] * 1000:.1f} ms)")
@@ -0,0 +1,171 @@
+"""
+Per-Recipient Style Profiles
+
+Joe writes differently to a long-time contractor than to a new lead.
+RecipientAccumulator partitions the style statistics by the recipient
+fields process-emails.py keeps (recipients.py):
+
+- by recipient domain
+- by individual recipient, for the most frequent ones
+
+Each partition is a style_drift.StyleCounts (greeting and sign-off
+counts, tone totals, length sums), so partitions merge across workers
+and saved states. Which keys get a partition is decided by a
+heavy-hitters sketch (sketches.SpaceSaving) with a fixed number of
+counters: when it evicts a key, that key's counts are folded into one
+"other" partition. Memory therefore depends on the number of counters,
+not on how long the tail of one-off recipients is.
+
+While there are fewer distinct keys than counters, every partition is
+exact. Past that, any recipient with more than about 2 * emails /
+counters emails keeps its partition, but it only holds the emails sent
+since it was last admitted to the sketch; such profiles are marked
+"complete": false.
+
+The result is keyed by recipient key and by domain, so a profile is
+found with one dict lookup (recipients.find_profile).
+"""
+
+from typing import Any, Dict
+
+from sketches import SpaceSaving
+from style_drift import StyleCounts, email_stats
+from style_features import Accumulator, EmailFeatures
+
+# Heavy-hitter counters (and so at most this many partitions) per level
+RECIPIENT_COUNTERS = 2000
+DOMAIN_COUNTERS = 2000
+
+DEFAULT_TOP_RECIPIENTS = 25
+TOP_DOMAINS = 50
+
+# Partitions with fewer emails are too noisy to report
+MIN_PROFILE_EMAILS = 5
+
+
+class PartitionedCounts:
+    """StyleCounts for the keys a SpaceSaving sketch tracks, plus one for the rest."""
+
+    def __init__(self, capacity: int):
+        self.sketch = SpaceSaving(capacity)
+        self.partitions: Dict[str, StyleCounts] = {}
+        self.other = StyleCounts()
+
+    def add(self, key: str, weight: int, *stats):
+        """Count one email under `key`; `stats` are StyleCounts.add_email's arguments."""
+        self.sketch.add(key, weight)
+        counts = self.partitions.get(key)
+        if counts is None:
+            # The sketch evicts keys in batches when full; it just did if
+            # it now tracks fewer keys than there are partitions
+            if len(self.partitions) >= len(self.sketch):
+                self._drop_untracked()
+            counts = self.partitions[key] = StyleCounts()
+        counts.add_email(weight, *stats)
+
+    def _drop_untracked(self):
+        """Fold the partitions of keys the sketch has evicted into `other`."""
+        for key in [key for key in self.partitions if key not in self.sketch]:
+            self.other.add(self.partitions.pop(key))
+
+    def top(self, n: int) -> Dict[str, Dict[str, Any]]:
+        """Summaries of the n most frequent keys with enough emails, most frequent first."""
+        result = {}
+        for key, _ in self.sketch.most_common():
+            if len(result) == n:
+                break
+            counts = self.partitions[key]
+            if counts.emails < MIN_PROFILE_EMAILS:
+                continue
+            summary = counts.summary()
+            if self.sketch.error(key):
+                summary['complete'] = False
+            result[key] = summary
+        return result
+
+    def merge(self, other: 'PartitionedCounts'):
+        self.sketch.merge(other.sketch)
+        for key, counts in other.partitions.items():
+            mine = self.partitions.get(key)
+            if mine is None:
+                self.partitions[key] = counts
+            else:
+                mine.add(counts)
+        self.other.add(other.other)
+        self._drop_untracked()
+
+    def state(self) -> Dict[str, Any]:
+        sketch = self.sketch
+        return {
+            'total': sketch.total,
+            'floor': sketch.floor,
+            # In first-seen order, which breaks ties between equal counts
+            'keys': [[key, count, sketch.error(key), self.partitions[key].state()]
+                     for key, count in sketch.counts.items()],
+            'other': self.other.state(),
+        }
+
+    def load_state(self, state: Dict[str, Any]):
+        sketch = SpaceSaving(self.sketch.capacity)
+        partitions = {}
+        for key, count, error, counts in state['keys']:
+            sketch.add(key, count, error)
+            partitions[key] = StyleCounts.from_state(counts)
+        sketch.total = state['total']
+        sketch.floor = state['floor']
+        self.sketch = sketch
+        self.partitions = partitions
+        self.other = StyleCounts.from_state(state['other'])
+        self._drop_untracked()
+
+
+class RecipientAccumulator(Accumulator):
+    """Style profiles per recipient domain and for the top recipients."""
+
+    name = 'recipients'
+
+    def __init__(self, top_recipients: int = DEFAULT_TOP_RECIPIENTS):
+        self.top_recipients = top_recipients
+        self.recipients = PartitionedCounts(RECIPIENT_COUNTERS)
+        self.domains = PartitionedCounts(DOMAIN_COUNTERS)
+        self.without_recipient = 0
+
+    def add(self, features: EmailFeatures):
+        email = features.email
+        key = email.get('recipient')
+        if not key:
+            self.without_recipient += features.weight
+            return
+
+        tone, lengths = email_stats(features)
+        stats = (features.greeting, features.signoff, tone, lengths)
+        self.recipients.add(key, features.weight, *stats)
+        domain = email.get('recipientDomain')
+        if domain:
+            self.domains.add(domain, features.weight, *stats)
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            'recipients_tracked': len(self.recipients.sketch),
+            'domains_tracked': len(self.domains.sketch),
+            'emails_without_recipient': self.without_recipient,
+            'domains': self.domains.top(TOP_DOMAINS),
+            'recipients': self.recipients.top(self.top_recipients),
+        }
+
+    def merge(self, other: 'RecipientAccumulator'):
+        self.recipients.merge(other.recipients)
+        self.domains.merge(other.domains)
+        self.without_recipient += other.without_recipient
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            'recipients': self.recipients.state(),
+            'domains': self.domains.state(),
+            'without_recipient': self.without_recipient,
+        }
+
+    def load_state(self, state: Dict[str, Any]):
+        self.recipients.load_state(state['recipients'])
+        self.domains.load_state(state['domains'])
+        self.without_recipient = state['without_recipient']
@@ -0,0 +1,110 @@
+"""
+Recipient Keys
+
+process-emails.py replaces each email's To addresses with:
+
+- recipient: a keyed hash of the first address (lowercased), e.g.
+  "r3f9c0a1b2d4e5f60". The address itself is not kept, and the key
+  means hashes cannot be checked against guessed addresses. It is
+  RECIPIENT_KEY_SECRET from the environment if set; otherwise a random
+  key is generated on first use and kept in DEFAULT_KEY_FILE, next to
+  the profile state (or RECIPIENT_KEY_FILE), for later runs and for
+  style-service.py lookups
+- recipientDomain: the domain of that address, e.g. "example.com"
+- recipientCount: how many To addresses there were
+
+analyze-style.py builds style profiles per domain and for the most
+frequent recipients (recipient_profiles.py); find_profile() picks the
+most specific one for an address with two dict lookups.
+"""
+
+import hashlib
+import os
+import secrets
+from typing import Any, Dict, List, Optional, Tuple
+
+# Next to style_state.DEFAULT_STATE_FILE
+DEFAULT_KEY_FILE = 'output/recipient-key.secret'
+
+_PERSON = b'jn-recipient'
+
+_key: Optional[bytes] = None
+
+
+def _generated_secret(path: str) -> bytes:
+    """The secret kept in `path`, created with a random one if missing."""
+    if not os.path.exists(path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Written in full under a temporary name, then linked into place:
+        # if another process got there first, its secret is used
+        temp_file = f'{path}.{os.getpid()}.tmp'
+        fd = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(secrets.token_hex(32) + '\n')
+        try:
+            os.link(temp_file, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(temp_file)
+
+    with open(path, 'r', encoding='utf-8') as f:
+        secret = f.read().strip()
+    if not secret:
+        raise ValueError(f"{path} is empty; delete it to generate a new recipient key")
+    return secret.encode('utf-8')
+
+
+def _secret() -> bytes:
+    secret = os.environ.get('RECIPIENT_KEY_SECRET', '').encode('utf-8')
+    if not secret:
+        secret = _generated_secret(os.environ.get('RECIPIENT_KEY_FILE') or DEFAULT_KEY_FILE)
+    # blake2b keys are at most 64 bytes
+    return hashlib.sha256(secret).digest() if len(secret) > 64 else secret
+
+
+def recipient_key(address: str) -> str:
+    """The anonymized key of an email address."""
+    global _key
+    if _key is None:
+        _key = _secret()
+    digest = hashlib.blake2b(address.strip().lower().encode('utf-8'), digest_size=8,
+                             key=_key, person=_PERSON)
+    return 'r' + digest.hexdigest()
+
+
+def recipient_domain(address: str) -> str:
+    return address.strip().lower().rpartition('@')[2]
+
+
+def recipient_fields(addresses: Optional[List[str]]) -> Dict[str, Any]:
+    """The recipient fields of a cleaned record, from a raw email's toRecipients."""
+    addresses = [address for address in addresses or [] if address and address.strip()]
+    if not addresses:
+        return {'recipient': '', 'recipientDomain': '', 'recipientCount': 0}
+    return {
+        'recipient': recipient_key(addresses[0]),
+        'recipientDomain': recipient_domain(addresses[0]),
+        'recipientCount': len(addresses),
+    }
+
+
+def find_profile(profiles: Dict[str, Any], address: str = '', key: str = '',
+                 domain: str = '') -> Tuple[str, Optional[Dict[str, Any]]]:
+    """The most specific profile in a style profile's recipient_profiles section.
+
+    Looks up the recipient (by address, or by its key), then its domain.
+    Returns ('recipient' | 'domain', profile), or ('none', None).
+    """
+    if address:
+        key = key or recipient_key(address)
+        domain = domain or recipient_domain(address)
+    profile = profiles.get('recipients', {}).get(key) if key else None
+    if profile is not None:
+        return 'recipient', profile
+    profile = profiles.get('domains', {}).get(domain.strip().lower()) if domain else None
+    if profile is not None:
+        return 'domain', profile
+    return 'none', None
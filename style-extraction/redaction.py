@@ -0,0 +1,76 @@
+"""
+Single-Pass PII Redaction
+
+Compiles a set of named regex patterns into one alternation and replaces
+every match in a single scan of the text, counting hits per category.
+
+Overlapping matches are resolved the way a single regex scan resolves them:
+1. The match that starts earliest in the text wins.
+2. If several categories match at the same position, the one listed first
+   in the priority order wins.
+The text consumed by a winning match is never re-examined by other
+categories, so e.g. a card number is not also counted as a phone number.
+"""
+
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class Redactor:
+    """Replace PII matches for many categories in one pass."""
+
+    def __init__(self, patterns: Dict[str, str], replacements: Dict[str, str],
+                 priority: Optional[List[str]] = None, flags: int = re.IGNORECASE,
+                 default_replacement: str = '[removed]'):
+        order = list(priority or [])
+        order += [name for name in patterns if name not in order]
+
+        unknown = [name for name in order if name not in patterns]
+        if unknown:
+            raise ValueError(f"Priority lists unknown patterns: {', '.join(unknown)}")
+
+        self.order = order
+        self.replacements = {
+            name: replacements.get(name, default_replacement) for name in order
+        }
+        # Named groups map a match back to its category. Patterns must not
+        # use group names of their own (plain/non-capturing groups are fine).
+        self.scanner = re.compile(
+            '|'.join(f'(?P<{name}>{patterns[name]})' for name in order),
+            flags,
+        )
+        self._patterns = patterns
+        self._flags = flags
+        self._standalone: Optional[Dict[str, 're.Pattern']] = None
+
+    def redact(self, text: str) -> Tuple[str, Dict[str, int]]:
+        """Return the redacted text and the number of hits per category."""
+        counts = {name: 0 for name in self.order}
+        replacements = self.replacements
+
+        def replace(match):
+            name = match.lastgroup
+            counts[name] += 1
+            return replacements[name]
+
+        return self.scanner.sub(replace, text), counts
+
+    def time_patterns(self, text: str) -> Dict[str, float]:
+        """Seconds each category's pattern takes to scan the text on its own.
+
+        For profiling: the combined scanner cannot say which category is
+        slow, so each pattern is run separately (the text is not changed).
+        """
+        if self._standalone is None:
+            self._standalone = {
+                name: re.compile(self._patterns[name], self._flags) for name in self.order
+            }
+
+        timings = {}
+        for name, pattern in self._standalone.items():
+            start = time.perf_counter()
+            for _ in pattern.finditer(text):
+                pass
+            timings[name] = time.perf_counter() - start
+        return timings
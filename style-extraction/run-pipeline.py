@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+"""
+Process and Analyze in One Run
+
+Runs process-emails.py and analyze-style.py as one pipeline: raw emails
+are streamed from the input file, cleaned, and fed to the style
+analysis one by one, so cleaned-emails.json is not written and parsed
+back in between, and the cleaned emails are not all held in memory
+(except with --dedup or --index, which need them all). The intermediate
+files are written only when asked for (--cleaned, --store).
+
+Usage:
+  python3 run-pipeline.py
+  python3 run-pipeline.py --input output/raw-emails.jsonl --workers 0
+  python3 run-pipeline.py --cleaned --store --index
+  python3 run-pipeline.py --dedup
+  python3 run-pipeline.py --categorizer output/categorizer.npz
+  python3 run-pipeline.py --drift
+  python3 run-pipeline.py --input output/new-raw-emails.jsonl --update
+"""
+
+import argparse
+import os
+from typing import Any, Dict, Iterator
+
+DEFAULT_INPUT_FILE = 'output/raw-emails.json'
+DEFAULT_CLEANED_FILE = 'output/cleaned-emails.json'
+DEFAULT_OUTPUT_FILE = 'output/style-profile.json'
+
+# Also defined in the scripts; repeated so --help does not import them
+DEFAULT_CACHE_FILE = 'output/.process-cache.sqlite'
+DEFAULT_STORE_FILE = 'output/cleaned-emails.store'
+DEFAULT_STATE_FILE = 'output/style-state.json'
+DEFAULT_INDEX_FILE = 'output/email-index.sqlite'
+DEFAULT_DEDUP_THRESHOLD = 0.8
+DEFAULT_DRIFT_FILE = 'output/style-drift.json'
+DEFAULT_TOP_RECIPIENTS = 25
+DEFAULT_WINDOW_DAYS = 90
+DEFAULT_HALF_LIFE_DAYS = 90
+
+
+def clean(process_emails, args, workers: int) -> Iterator[Dict[str, Any]]:
+    """Cleaned emails from args.input, yielded as they are cleaned (also written to --cleaned if given)."""
+    processor = process_emails.EmailProcessor(
+        args.input, args.cleaned or DEFAULT_CLEANED_FILE, cache_file=args.cache,
+        time_budget=args.time_budget, store_file=args.store, store_tokens=args.store_tokens,
+    )
+    print("🔧 Email Processing and Anonymization")
+    print("=" * 50 + "\n")
+
+    try:
+        processor.open_store()
+        processor.prepare_stream(corpus_names=not args.no_corpus_names)
+
+        reader = process_emails.EmailStreamReader(args.input)
+        print(f"📂 Streaming {args.input}...")
+        cleaned = processor.stored(processor.iter_processed(reader, workers))
+
+        if args.cleaned:
+            output_format = 'jsonl' if args.cleaned.endswith('.jsonl') else 'json'
+            with process_emails.EmailStreamWriter(args.cleaned, output_format) as writer:
+                for email in cleaned:
+                    writer.write(email)
+                    yield email
+                writer.close(processor.stats, {'dateRange': reader.metadata.get('dateRange', {})})
+            print(f"\n💾 Saved to {args.cleaned}")
+        else:
+            yield from cleaned
+
+        processor.finish()
+        print()
+    finally:
+        processor.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Clean raw emails and analyze the style in one run")
+    parser.add_argument('--input', '-i', default=DEFAULT_INPUT_FILE,
+                        help=f"Raw emails, JSON document or JSONL (default: {DEFAULT_INPUT_FILE})")
+    parser.add_argument('--output', '-o', default=DEFAULT_OUTPUT_FILE,
+                        help=f"Style profile output file (default: {DEFAULT_OUTPUT_FILE})")
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                        help="Worker processes for cleaning and analysis (default: 1, 0 = all cores)")
+    parser.add_argument('--cleaned', nargs='?', const=DEFAULT_CLEANED_FILE, default=None, metavar='PATH',
+                        help=f"Also write the cleaned emails (default path: {DEFAULT_CLEANED_FILE})")
+    parser.add_argument('--store', nargs='?', const=DEFAULT_STORE_FILE, default=None, metavar='PATH',
+                        help=f"Also write the columnar store (default path: {DEFAULT_STORE_FILE})")
+    parser.add_argument('--store-tokens', action='store_true',
+                        help="Pre-tokenize bodies in the store so phrase mining can skip it")
+    parser.add_argument('--no-corpus-names', action='store_true',
+                        help="Only redact names found in each email's own greeting")
+    parser.add_argument('--cache', nargs='?', const=DEFAULT_CACHE_FILE, default=None, metavar='PATH',
+                        help=f"Reuse cleaned bodies of unchanged emails (default path: {DEFAULT_CACHE_FILE})")
+    parser.add_argument('--time-budget', type=float, default=None, metavar='SECONDS',
+                        help="Quarantine emails that take longer than this to clean")
+    parser.add_argument('--phrase-counters', type=int, default=None,
+                        help="Memory cap for phrase mining, in counters")
+    parser.add_argument('--whole-words', action='store_true',
+                        help="Match tone indicators as whole words")
+    parser.add_argument('--state', default=DEFAULT_STATE_FILE,
+                        help=f"Profile state file, written on every run (default: {DEFAULT_STATE_FILE})")
+    parser.add_argument('--update', action='store_true',
+                        help="Add the input emails to the saved state instead of starting over")
+    parser.add_argument('--index', nargs='?', const=DEFAULT_INDEX_FILE, default=None, metavar='PATH',
+                        help=f"Add the emails to the similar-email index (default path: {DEFAULT_INDEX_FILE})")
+    parser.add_argument('--dedup', nargs='?', type=float, const=DEFAULT_DEDUP_THRESHOLD, default=None,
+                        metavar='SIMILARITY',
+                        help=f"Analyze near-duplicate emails once, weighted by how many there are "
+                             f"(default similarity: {DEFAULT_DEDUP_THRESHOLD})")
+    parser.add_argument('--categorizer', default=None, metavar='PATH',
+                        help="Categorizer trained by train-categorizer.py (default: keyword-seeded)")
+    parser.add_argument('--top-recipients', type=int, default=DEFAULT_TOP_RECIPIENTS, metavar='N',
+                        help=f"Individual style profiles for the N most frequent recipients "
+                             f"(default: {DEFAULT_TOP_RECIPIENTS})")
+    parser.add_argument('--drift', nargs='?', const=DEFAULT_DRIFT_FILE, default=None, metavar='PATH',
+                        help=f"Also write style time series and a recency-weighted profile "
+                             f"(default path: {DEFAULT_DRIFT_FILE})")
+    parser.add_argument('--drift-window', type=int, default=DEFAULT_WINDOW_DAYS, metavar='DAYS',
+                        help=f"Rolling window for --drift (default: {DEFAULT_WINDOW_DAYS} days)")
+    parser.add_argument('--half-life', type=float, default=DEFAULT_HALF_LIFE_DAYS, metavar='DAYS',
+                        help=f"Half-life of the current profile (default: {DEFAULT_HALF_LIFE_DAYS} days)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    # The scripts and their dependencies load only once there is work to do
+    from importlib import import_module
+    process_emails = import_module('process-emails')
+    analyze_style = import_module('analyze-style')
+
+    workers = args.workers or os.cpu_count() or 1
+
+    options = {'phrase_counters': args.phrase_counters} if args.phrase_counters else {}
+    analyzer = analyze_style.StyleAnalyzer(args.cleaned or DEFAULT_CLEANED_FILE, args.output,
+                                           whole_words=args.whole_words, state_file=args.state,
+                                           update=args.update, workers=workers, index_file=args.index,
+                                           dedup=args.dedup, categorizer_file=args.categorizer,
+                                           drift_file=args.drift, drift_window_days=args.drift_window,
+                                           half_life_days=args.half_life, top_recipients=args.top_recipients,
+                                           **options)
+    # Cleaning runs as the analysis pulls emails, after any saved state has loaded
+    emails = clean(process_emails, args, workers)
+    try:
+        analyzer.run(emails)
+    finally:
+        emails.close()
+
+
+if __name__ == "__main__":
+    main()
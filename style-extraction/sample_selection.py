@@ -0,0 +1,124 @@
+"""
+Representative Sample Selection
+
+Picks the training samples of each category: a few emails that together
+look like the category as a whole, instead of the first few in the file.
+
+- While counting, CategoryAccumulator keeps a weighted random sample of
+  up to SAMPLE_POOL_SIZE emails per category (sketches.WeightedSample,
+  keyed by a hash of the email id). The pool does not depend on file
+  order, worker shards or state merges
+- The pooled bodies are embedded as hashed TF-IDF vectors: words hashed
+  (near_duplicates.word_hash) to 2**HASH_BITS columns, sublinear term
+  frequency 1 + ln(tf), inverse document frequency over all pools, each
+  row scaled to unit length. The pools form one SciPy sparse matrix
+- Samples are chosen by greedy facility location. Each step adds the
+  email that most increases the sum, over the pool, of every email's
+  similarity to its closest chosen sample. This objective is submodular,
+  so the greedy choice is within 1 - 1/e of the best set. The first pick
+  is the most central email; later picks cover the kinds of email the
+  earlier ones do not, so the samples are diverse too
+- Similarities are only computed within a category's pool, so the cost
+  is bounded by SAMPLE_POOL_SIZE, whatever the size of the corpus
+
+Each chosen sample records its centrality (mean cosine similarity to the
+pool) and its coverage gain (what it added to the objective, per pooled
+email).
+"""
+
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from near_duplicates import word_hash
+from phrase_mining import tokenize
+
+# Emails pooled per category to choose the samples from
+SAMPLE_POOL_SIZE = 500
+
+HASH_BITS = 18
+_FEATURE_MASK = (1 << HASH_BITS) - 1
+
+
+def sample_hash(email: Dict[str, Any]) -> int:
+    """The hash deciding whether an email is pooled (by id, else by body)."""
+    email_id = email.get('id')
+    return word_hash(email['body'] if email_id is None or email_id == '' else str(email_id))
+
+
+def embed(texts: Sequence[str]) -> sparse.csr_matrix:
+    """Unit-length hashed TF-IDF rows, one per text."""
+    columns: Dict[str, int] = {}
+    rows, features, counts = [], [], []
+    for row, text in enumerate(texts):
+        tf: Dict[int, int] = {}
+        for word in tokenize(text.lower()):
+            column = columns.get(word)
+            if column is None:
+                column = columns[word] = word_hash(word) & _FEATURE_MASK
+            tf[column] = tf.get(column, 0) + 1
+        rows.extend([row] * len(tf))
+        features.extend(tf)
+        counts.extend(tf.values())
+
+    matrix = sparse.csr_matrix(
+        (1 + np.log(np.array(counts, dtype=np.float64)), (rows, features)),
+        shape=(len(texts), _FEATURE_MASK + 1),
+    )
+    matrix.sum_duplicates()
+
+    document_frequency = np.bincount(matrix.indices, minlength=matrix.shape[1])
+    idf = np.log((1 + len(texts)) / (1 + document_frequency)) + 1
+    matrix = matrix @ sparse.diags(idf)
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return (sparse.diags(1 / norms) @ matrix).tocsr()
+
+
+def facility_location(similarities: np.ndarray, k: int) -> List[Tuple[int, float]]:
+    """Greedy facility location over a (pool x pool) similarity array.
+
+    Returns (index, gain) of up to k picks, in pick order; gain is the
+    increase in the mean similarity of each pooled item to its closest pick.
+    """
+    covered = np.zeros(similarities.shape[0])
+    picks: List[Tuple[int, float]] = []
+    for _ in range(min(k, similarities.shape[1])):
+        gains = np.maximum(similarities - covered[:, None], 0).sum(axis=0)
+        for index, _ in picks:
+            gains[index] = -1
+        best = int(gains.argmax())
+        picks.append((best, float(gains[best]) / len(covered)))
+        covered = np.maximum(covered, similarities[:, best])
+    return picks
+
+
+def select_representatives(pools: Dict[str, List[Dict[str, Any]]], k: int
+                           ) -> Dict[str, List[Dict[str, Any]]]:
+    """Up to k representative samples per category, chosen from its pool.
+
+    Each returned sample is a copy of the pooled one with a 'selection'
+    entry: {'centrality', 'coverage_gain'}.
+    """
+    names = [name for name, pool in pools.items() if pool]
+    if not names:
+        return {name: [] for name in pools}
+
+    vectors = embed([sample['body'] for name in names for sample in pools[name]])
+    selected: Dict[str, List[Dict[str, Any]]] = {name: [] for name in pools}
+    start = 0
+    for name in names:
+        pool = pools[name]
+        block = vectors[start:start + len(pool)]
+        start += len(pool)
+
+        similarities = (block @ block.T).toarray()
+        centrality = similarities.mean(axis=0)
+        for index, gain in facility_location(similarities, k):
+            selected[name].append(dict(pool[index], selection={
+                'centrality': round(float(centrality[index]), 3),
+                'coverage_gain': round(gain, 3),
+            }))
+    return selected
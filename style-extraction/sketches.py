@@ -0,0 +1,550 @@
+"""
+Streaming Summaries
+
+Fixed-memory data structures for counting over corpora too large to hold
+exact tables for:
+
+- SpaceSaving: the most frequent items in a stream, using a fixed number
+  of counters
+- RunningStats: count, mean, variance, min and max (Welford's method)
+- QuantileSketch: percentiles, exact while there are few distinct values,
+  then approximate (a KLL sketch)
+- Histogram: counts per fixed bucket
+- Distribution: all three for one series of values
+- WeightedSample: a fixed-size random sample, weighted, reproducible
+
+Each can be merged with another of its kind that saw a different part of
+the stream, and saved with state() / load_state().
+"""
+
+import heapq
+import math
+from bisect import bisect_right
+from collections import Counter
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+# Items per level of a QuantileSketch; once it is sketching, percentiles
+# are within roughly 1-2% of the true rank
+DEFAULT_QUANTILE_K = 200
+# Distinct values a QuantileSketch counts exactly before it starts sketching
+DEFAULT_EXACT_VALUES = 4096
+
+
+class SpaceSaving:
+    """Approximate heavy hitters with at most `capacity` counters.
+
+    While fewer than `capacity` distinct items have been seen, counts are
+    exact. When the table is full, the lower half of the counters (by
+    count) is evicted in one batch and `floor` is raised to the largest
+    evicted count. Items tracked after that start at `floor`, which is
+    recorded as their possible overestimate (`error`). This is the
+    Space-Saving algorithm (Metwally et al.) with evictions batched so that
+    no min-heap is needed; any item seen more than about
+    2 * total / capacity times stays tracked.
+
+    Dict order is first-tracked order, so ties in most_common() come out
+    in the same order as with collections.Counter.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity < 2:
+            raise ValueError("capacity must be at least 2")
+        self.capacity = capacity
+        self.total = 0
+        self.floor = 0
+        self.counts: Counter = Counter()
+        # Overestimates, only for items tracked after an eviction
+        self.errors: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.counts
+
+    def add(self, key: Hashable, count: int = 1, error: int = 0):
+        """Count `key`. `error` is an overestimate already included in `count`."""
+        self.total += count
+        counts = self.counts
+
+        current = counts.get(key)
+        if current is not None:
+            counts[key] = current + count
+            if error:
+                self.errors[key] = self.errors.get(key, 0) + error
+            return
+
+        if len(counts) >= self.capacity:
+            self._evict()
+        counts[key] = self.floor + count
+        if self.floor or error:
+            self.errors[key] = self.floor + error
+
+    def add_all(self, keys: Sequence[Hashable]):
+        """Count one occurrence of each key (fast path for bulk updates)."""
+        counts = self.counts
+        capacity = self.capacity
+
+        # Exact so far, with room for every key: let Counter count in bulk
+        if not self.floor and len(counts) + len(keys) <= capacity:
+            counts.update(keys)
+            self.total += len(keys)
+            return
+
+        added = 0
+
+        for key in keys:
+            added += 1
+            current = counts.get(key)
+            if current is not None:
+                counts[key] = current + 1
+                continue
+            if len(counts) >= capacity:
+                self._evict()
+            counts[key] = self.floor + 1
+            if self.floor:
+                self.errors[key] = self.floor
+
+        self.total += added
+
+    def _evict(self):
+        """Drop every counter at or below the median count, in place."""
+        counts = self.counts
+        threshold = sorted(counts.values())[len(counts) // 2]
+
+        for key in [key for key, count in counts.items() if count <= threshold]:
+            del counts[key]
+            self.errors.pop(key, None)
+
+        self.floor = max(self.floor, threshold)
+
+    def error(self, key: Hashable) -> int:
+        return self.errors.get(key, 0)
+
+    def most_common(self, n: Optional[int] = None) -> List[Tuple[Hashable, int]]:
+        """Tracked items by estimated count, highest first (ties in first-seen order)."""
+        ranked = sorted(self.counts.items(), key=lambda item: -item[1])
+        return ranked if n is None else ranked[:n]
+
+    def merge(self, other: 'SpaceSaving'):
+        """Fold another summary into this one.
+
+        Counts are summed; if more than `capacity` items result, only the
+        largest are kept. Items keep first-seen order: this summary's items,
+        then the other's new ones, so merging shards in order matches a
+        single pass over the concatenated stream whenever both are exact.
+        """
+        counts = Counter(self.counts)
+        errors = dict(self.errors)
+        for key, count in other.counts.items():
+            counts[key] = counts.get(key, 0) + count
+            if key in other.errors:
+                errors[key] = errors.get(key, 0) + other.errors[key]
+
+        if len(counts) > self.capacity:
+            keep = set(sorted(counts, key=lambda key: -counts[key])[:self.capacity])
+            counts = Counter({key: count for key, count in counts.items() if key in keep})
+            errors = {key: error for key, error in errors.items() if key in keep}
+
+        self.counts = counts
+        self.errors = errors
+        self.total += other.total
+        self.floor += other.floor
+
+
+class RunningStats:
+    """Count, mean, variance, min and max of a stream, in constant memory.
+
+    Uses Welford's update, so the variance stays accurate for long
+    streams; merge() combines two summaries with Chan et al.'s formula.
+    """
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        # Sum of squared differences from the mean
+        self.m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float, weight: int = 1):
+        """Add a value, or `weight` copies of it."""
+        self.count += weight
+        delta = value - self.mean
+        self.mean += delta * weight / self.count
+        self.m2 += weight * delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def add_all(self, values: Sequence[float], weight: int = 1):
+        """Add a batch of values, each `weight` times (summarized first, then merged in)."""
+        if not values:
+            return
+        batch = RunningStats()
+        batch.count = len(values) * weight
+        batch.mean = sum(values) / len(values)
+        batch.m2 = sum((value - batch.mean) ** 2 for value in values) * weight
+        batch.min = min(values)
+        batch.max = max(values)
+        self.merge(batch)
+
+    @property
+    def variance(self) -> float:
+        """Population variance (0 for fewer than two values)."""
+        return self.m2 / self.count if self.count > 1 else 0.0
+
+    @property
+    def std_dev(self) -> float:
+        return math.sqrt(self.variance)
+
+    def merge(self, other: 'RunningStats'):
+        if not other.count:
+            return
+        if not self.count:
+            self.load_state(other.state())
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def state(self) -> Dict[str, Any]:
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2, 'min': self.min, 'max': self.max}
+
+    def load_state(self, state: Dict[str, Any]):
+        for field in self.__slots__:
+            setattr(self, field, state[field])
+
+
+class QuantileSketch:
+    """Quantiles of a stream in O(k) memory (KLL sketch).
+
+    While there are at most `exact_values` distinct values, each one's
+    count is kept instead, so quantiles are exact and merging gives the
+    same counts in any order (word and sentence lengths rarely take more
+    than a few hundred values). Past that the counts are turned into a
+    sketch. Values are kept in levels; an item at level h stands for 2 ** h
+    values. When a level outgrows its capacity it is sorted and every other
+    item moves up a level, the offset alternating between compactions. The
+    top level holds up to k items and each level below two thirds as many
+    as the one above (Karnin, Lang and Liberty). Until the first compaction
+    the sketch holds every value and quantiles are exact.
+
+    Compacting alternately rather than randomly keeps results reproducible
+    from run to run.
+    """
+
+    def __init__(self, k: int = DEFAULT_QUANTILE_K, exact_values: int = DEFAULT_EXACT_VALUES):
+        if k < 8:
+            raise ValueError("k must be at least 8")
+        self.k = k
+        self.exact_values = exact_values
+        self.count = 0
+        # Value -> count while counting exactly, then None
+        self.exact: Optional[Counter] = Counter()
+        self.levels: List[List[float]] = [[]]
+        self.compactions = 0
+        self._update_capacities()
+
+    def _start_sketching(self):
+        """Move the exact counts into the levels, smallest value first."""
+        exact, self.exact = self.exact, None
+        for value, count in sorted(exact.items()):
+            self._add_weighted([value], count)
+            if self._size >= self._size_limit:
+                self._compress()
+
+    def _update_capacities(self):
+        top = len(self.levels) - 1
+        self._capacities = [max(2, int(self.k * (2 / 3) ** (top - level))) for level in range(top + 1)]
+        self._size_limit = sum(self._capacities)
+        self._size = sum(len(items) for items in self.levels)
+
+    def add(self, value: float, weight: int = 1):
+        """Add a value, or `weight` copies of it (one item per set bit of `weight`)."""
+        if self.exact is not None:
+            self.exact[value] += weight
+            self.count += weight
+            if len(self.exact) > self.exact_values:
+                self._start_sketching()
+            return
+        if weight == 1:
+            self.levels[0].append(value)
+            self._size += 1
+        else:
+            self._add_weighted([value], weight)
+        self.count += weight
+        if self._size >= self._size_limit:
+            self._compress()
+
+    def add_all(self, values: Sequence[float], weight: int = 1):
+        if self.exact is not None:
+            if weight == 1:
+                self.exact.update(values)
+            else:
+                for value in values:
+                    self.exact[value] += weight
+            self.count += len(values) * weight
+            if len(self.exact) > self.exact_values:
+                self._start_sketching()
+            return
+        if weight == 1:
+            self.levels[0].extend(values)
+            self._size += len(values)
+        else:
+            self._add_weighted(values, weight)
+        self.count += len(values) * weight
+        if self._size >= self._size_limit:
+            self._compress()
+
+    def _add_weighted(self, values: Sequence[float], weight: int):
+        # An item at level h stands for 2 ** h values
+        if weight.bit_length() > len(self.levels):
+            self.levels.extend([] for _ in range(weight.bit_length() - len(self.levels)))
+            self._update_capacities()
+        for level in range(weight.bit_length()):
+            if weight >> level & 1:
+                self.levels[level].extend(values)
+                self._size += len(values)
+
+    def _compress(self):
+        """Compact the lowest full level(s) until the sketch is under its size limit."""
+        level = 0
+        while self._size >= self._size_limit:
+            items = self.levels[level]
+            if len(items) >= self._capacities[level]:
+                items.sort()
+                # An odd item out stays; half of the rest moves up with twice the weight
+                keep = len(items) % 2
+                offset = self.compactions % 2
+                self.compactions += 1
+                promoted = items[keep + offset::2]
+                self.levels[level] = items[:keep]
+                if level + 1 == len(self.levels):
+                    self.levels.append(promoted)
+                    self._update_capacities()
+                else:
+                    self.levels[level + 1].extend(promoted)
+                    self._size -= len(items) - keep - len(promoted)
+                level = 0
+            else:
+                level += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The value at rank ceil(q * count) (the nearest-rank definition)."""
+        return self.quantiles([q])[0]
+
+    def quantiles(self, qs: Sequence[float]) -> List[Optional[float]]:
+        if not self.count:
+            return [None] * len(qs)
+        if self.exact is not None:
+            weighted = sorted(self.exact.items())
+        else:
+            weighted = sorted((value, 1 << level) for level, items in enumerate(self.levels) for value in items)
+
+        results = []
+        for q in qs:
+            target = max(1, math.ceil(q * self.count))
+            seen = 0
+            value = weighted[-1][0]
+            for candidate, weight in weighted:
+                seen += weight
+                if seen >= target:
+                    value = candidate
+                    break
+            results.append(value)
+        return results
+
+    def merge(self, other: 'QuantileSketch'):
+        if other.exact is not None:
+            if self.exact is not None:
+                self.exact.update(other.exact)
+                self.count += other.count
+                if len(self.exact) > self.exact_values:
+                    self._start_sketching()
+            else:
+                for value, count in sorted(other.exact.items()):
+                    self._add_weighted([value], count)
+                self.count += other.count
+                self._compress()
+            return
+        if self.exact is not None:
+            self._start_sketching()
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self._update_capacities()
+        self.count += other.count
+        self.compactions += other.compactions
+        self._compress()
+
+    def state(self) -> Dict[str, Any]:
+        exact = sorted(self.exact.items()) if self.exact is not None else None
+        return {'k': self.k, 'count': self.count, 'exact': exact, 'compactions': self.compactions,
+                'levels': self.levels}
+
+    def load_state(self, state: Dict[str, Any]):
+        self.k = state['k']
+        self.count = state['count']
+        self.exact = Counter(dict(state['exact'])) if state['exact'] is not None else None
+        self.compactions = state['compactions']
+        self.levels = [list(items) for items in state['levels']]
+        self._update_capacities()
+
+
+class Histogram:
+    """Counts of values per bucket. `edges` are the ascending bucket starts;
+    values below the first edge count in the first bucket."""
+
+    def __init__(self, edges: Sequence[float]):
+        self.edges = list(edges)
+        self.counts = [0] * len(self.edges)
+
+    def add(self, value: float, weight: int = 1):
+        self.counts[max(bisect_right(self.edges, value) - 1, 0)] += weight
+
+    def add_all(self, values: Sequence[float], weight: int = 1):
+        edges, counts = self.edges, self.counts
+        for value in values:
+            counts[max(bisect_right(edges, value) - 1, 0)] += weight
+
+    def labels(self) -> List[str]:
+        """'0-24', '25-49', ..., '800+' for integer edges ('2' for a one-value bucket)."""
+        bounds = zip(self.edges, self.edges[1:])
+        return [f"{low}-{high - 1}" if high - 1 > low else f"{low}" for low, high in bounds] + [f"{self.edges[-1]}+"]
+
+    def result(self) -> Dict[str, int]:
+        return dict(zip(self.labels(), self.counts))
+
+    def merge(self, other: 'Histogram'):
+        if other.edges != self.edges:
+            raise ValueError("cannot merge histograms with different buckets")
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+
+    def state(self) -> Dict[str, Any]:
+        return {'edges': self.edges, 'counts': self.counts}
+
+    def load_state(self, state: Dict[str, Any]):
+        if state['edges'] != self.edges:
+            raise ValueError("saved histogram has different buckets")
+        self.counts = list(state['counts'])
+
+
+class Distribution:
+    """Summary statistics, percentiles and a histogram of one series of values."""
+
+    PERCENTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self, edges: Sequence[float], k: int = DEFAULT_QUANTILE_K):
+        self.stats = RunningStats()
+        self.quantiles = QuantileSketch(k)
+        self.histogram = Histogram(edges)
+
+    def add(self, value: float, weight: int = 1):
+        self.stats.add(value, weight)
+        self.quantiles.add(value, weight)
+        self.histogram.add(value, weight)
+
+    def add_all(self, values: Sequence[float], weight: int = 1):
+        self.stats.add_all(values, weight)
+        self.quantiles.add_all(values, weight)
+        self.histogram.add_all(values, weight)
+
+    @property
+    def mean(self) -> float:
+        return self.stats.mean
+
+    def result(self, digits: int = 1) -> Dict[str, Any]:
+        """{'mean', 'std_dev', 'min', 'p50', 'p90', 'p99', 'max', 'histogram'}."""
+        stats = self.stats
+        result: Dict[str, Any] = {
+            'mean': round(stats.mean, digits),
+            'std_dev': round(stats.std_dev, digits),
+            'min': stats.min,
+        }
+        for q, value in zip(self.PERCENTILES, self.quantiles.quantiles(self.PERCENTILES)):
+            result[f"p{round(q * 100)}"] = value
+        result['max'] = stats.max
+        result['histogram'] = self.histogram.result()
+        return result
+
+    def merge(self, other: 'Distribution'):
+        self.stats.merge(other.stats)
+        self.quantiles.merge(other.quantiles)
+        self.histogram.merge(other.histogram)
+
+    def state(self) -> Dict[str, Any]:
+        return {'stats': self.stats.state(), 'quantiles': self.quantiles.state(),
+                'histogram': self.histogram.state()}
+
+    def load_state(self, state: Dict[str, Any]):
+        self.stats.load_state(state['stats'])
+        self.quantiles.load_state(state['quantiles'])
+        self.histogram.load_state(state['histogram'])
+
+
+class WeightedSample:
+    """A random sample of at most `size` items, each kept with probability
+    growing with its weight.
+
+    Every item comes with a 64-bit hash of its identity, which decides its
+    key -ln(u) / weight, u = (hash + 1) / 2**64, and the `size` items with
+    the smallest keys are kept (bottom-k sampling; the keys of
+    Efraimidis-Spirakis weighted sampling, exponentiated). Since the keys
+    come from the hashes, the sample depends only on which items were
+    added, not on their order, and merging two samples gives exactly the
+    sample of both streams. An item whose hash is already in the sample is
+    not added again.
+
+    Items must be JSON-serializable for state().
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        # Max-heap of (-key, hash, item): the root is the first to go
+        self._heap: List[Tuple[float, int, Any]] = []
+        self._hashes = set()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def add(self, item: Any, item_hash: int, weight: int = 1):
+        key = -math.log((item_hash + 1) / 2.0 ** 64) / weight
+        self._push(key, item_hash, item)
+
+    def _push(self, key: float, item_hash: int, item: Any):
+        if item_hash in self._hashes:
+            return
+        entry = (-key, item_hash, item)
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            self._hashes.discard(heapq.heapreplace(self._heap, entry)[1])
+        else:
+            return
+        self._hashes.add(item_hash)
+
+    def items(self) -> List[Any]:
+        """The sampled items, smallest key first."""
+        return [item for _, _, item in sorted(self._heap, key=lambda entry: (-entry[0], entry[1]))]
+
+    def merge(self, other: 'WeightedSample'):
+        for negative_key, item_hash, item in other._heap:
+            self._push(-negative_key, item_hash, item)
+
+    def state(self) -> Dict[str, Any]:
+        return {'size': self.size, 'entries': [[-key, item_hash, item] for key, item_hash, item in self._heap]}
+
+    def load_state(self, state: Dict[str, Any]):
+        self.size = state['size']
+        self._heap = [(-key, item_hash, item) for key, item_hash, item in state['entries']]
+        heapq.heapify(self._heap)
+        self._hashes = {item_hash for _, item_hash, _ in self._heap}
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+
+"""
+Local Style Service
+
+A small HTTP/JSON service that keeps the style profile and the
+similar-email index (analyze-style.py --index) in memory, so the
+generate-response endpoint, or a local stand-in for it, can fetch style
+context in a few milliseconds instead of reading style-profile.json and
+training-data.txt on every request.
+
+- GET  /health                       Status, what is loaded and cache counts
+- GET  /profile                      The whole style profile
+- GET  /profile/<section>            One section, e.g. /profile/sign_offs
+- GET  /categories                   Email count and average length per category
+- GET  /recipient?address=..         Style profile for a recipient, else its domain
+                                     (or ?key=.. / ?domain=.., see recipients.py)
+- GET  /similar?subject=..&body=..&k=5
+- POST /similar                      {"subject": ..., "body": ..., "k": 5, "exclude_ids": [...]}
+- POST /reload                       Reload now instead of waiting for the next check
+
+The profile and index files are checked every --poll seconds. When
+analyze-style.py writes new ones, they are loaded in a background thread
+and swapped in at once, and a profile that fails to load leaves the old
+one in place. analyze-style.py writes the profile before it updates the
+index, and then a marker (style-profile.json.generation) after both;
+once the marker exists, only a change to it triggers a reload, so a
+request sees either the old profile and index or the new ones, never a
+mix. Without a marker (profiles from older versions), a change to
+either file triggers a reload. Responses are cached (least recently used evicted
+first); the cache is emptied on every reload.
+
+The service listens on localhost only by default and has no
+authentication; do not expose it.
+
+Usage:
+  python3 style-service.py
+  python3 style-service.py --port 8765 --cache-size 2048
+  curl 'http://127.0.0.1:8765/similar?subject=Delivery&body=When+can+you+drop+off+the+lumber&k=3'
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Hashable, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from email_index import DEFAULT_INDEX_FILE, DEFAULT_TOP_K, EmailIndex
+from recipients import find_profile
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_PROFILE_FILE = 'output/style-profile.json'
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_POLL_SECONDS = 1.0
+
+# Also defined in analyze-style.py; repeated so the service does not import it
+GENERATION_SUFFIX = '.generation'
+
+MAX_K = 50
+MAX_REQUEST_BYTES = 1 << 20
+
+REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    413: 'Payload Too Large', 503: 'Service Unavailable',
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class LRUCache:
+    """Mapping of at most `size` entries that evicts the least recently used."""
+
+    def __init__(self, size: int = DEFAULT_CACHE_SIZE):
+        self.size = size
+        self.entries: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        if self.size <= 0:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class Snapshot:
+    """A profile and index loaded together; replaced whole on reload."""
+
+    def __init__(self, profile: Dict[str, Any], index: Optional[EmailIndex], version: int):
+        self.profile = profile
+        self.index = index
+        self.version = version
+        self.loaded_at = datetime.now().isoformat()
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class StyleService:
+    def __init__(self, profile_file: str = DEFAULT_PROFILE_FILE, index_file: str = DEFAULT_INDEX_FILE,
+                 cache_size: int = DEFAULT_CACHE_SIZE, poll_seconds: float = DEFAULT_POLL_SECONDS):
+        self.profile_file = profile_file
+        self.index_file = index_file
+        self.generation_file = profile_file + GENERATION_SUFFIX
+        self.poll_seconds = poll_seconds
+        self.cache = LRUCache(cache_size)
+        self.snapshot: Optional[Snapshot] = None
+        self._signature = None
+        # Created in the event loop (see reload)
+        self._reload_lock: Optional[asyncio.Lock] = None
+
+    def _signatures(self):
+        """What to watch: the generation marker once there is one, else both files."""
+        marker = _file_signature(self.generation_file)
+        if marker is not None:
+            return marker, GENERATION_SUFFIX
+        return _file_signature(self.profile_file), _file_signature(self.index_file)
+
+    def _load(self, version: int) -> Snapshot:
+        """Read the profile and open the index (runs in a worker thread)."""
+        with open(self.profile_file, 'r', encoding='utf-8') as f:
+            profile = json.load(f)
+        index = EmailIndex(self.index_file) if os.path.exists(self.index_file) else None
+        return Snapshot(profile, index, version)
+
+    async def reload(self, force: bool = False) -> bool:
+        """Load the profile and index if they changed on disk. Returns whether it reloaded."""
+        if self._reload_lock is None:
+            self._reload_lock = asyncio.Lock()
+        async with self._reload_lock:
+            signature = self._signatures()
+            if not force and signature == self._signature:
+                return False
+            if signature[0] is None:
+                print(f"⚠️  No profile at {self.profile_file} yet; run analyze-style.py")
+                self._signature = signature
+                return False
+
+            version = self.snapshot.version + 1 if self.snapshot is not None else 1
+            loop = asyncio.get_running_loop()
+            try:
+                snapshot = await loop.run_in_executor(None, self._load, version)
+            except (OSError, ValueError, sqlite3.Error) as e:
+                # Keep serving the old profile; a later write will retry
+                print(f"⚠️  Could not load {self.profile_file}: {e}")
+                self._signature = signature
+                return False
+
+            old, self.snapshot = self.snapshot, snapshot
+            self._signature = signature
+            self.cache.clear()
+            if old is not None and old.index is not None:
+                old.index.close()
+
+            emails = len(snapshot.index) if snapshot.index is not None else 0
+            print(f"📂 Loaded profile v{version} ({snapshot.profile.get('total_emails_analyzed', 0)} emails) "
+                  f"and {emails} indexed emails")
+            return True
+
+    async def watch(self):
+        """Reload whenever the profile or index file changes."""
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            await self.reload()
+
+    def _current(self) -> Snapshot:
+        if self.snapshot is None:
+            raise HTTPError(503, f"No style profile loaded; run analyze-style.py to create {self.profile_file}")
+        return self.snapshot
+
+    def _similar(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        snapshot = self._current()
+        if snapshot.index is None:
+            raise HTTPError(503, "No similar-email index; run analyze-style.py --index")
+        try:
+            k = min(int(params.get('k', DEFAULT_TOP_K)), MAX_K)
+        except (TypeError, ValueError):
+            raise HTTPError(400, "k must be an integer")
+        exclude_ids = params.get('exclude_ids') or []
+        if not isinstance(exclude_ids, list):
+            exclude_ids = [exclude_ids]
+        results = snapshot.index.search(str(params.get('subject', '')), str(params.get('body', '')),
+                                        k, exclude_ids)
+        return {'results': results}
+
+    def handle(self, method: str, target: str, body: bytes) -> Tuple[int, bytes, bool]:
+        """Answer one request. Returns (status, JSON body, whether it came from the cache)."""
+        url = urlsplit(target)
+        path = url.path.rstrip('/') or '/'
+
+        if path == '/reload':
+            # POST /reload is answered by serve_connection
+            raise HTTPError(405, "Use POST /reload")
+        if path == '/health':
+            snapshot = self.snapshot
+            return 200, _json({
+                'status': 'ok' if snapshot is not None else 'no profile',
+                'profileVersion': snapshot.version if snapshot is not None else None,
+                'loadedAt': snapshot.loaded_at if snapshot is not None else None,
+                'indexedEmails': len(snapshot.index) if snapshot is not None and snapshot.index else 0,
+                'cache': {'entries': len(self.cache), 'hits': self.cache.hits, 'misses': self.cache.misses},
+            }), False
+
+        if path == '/similar':
+            if method == 'POST':
+                try:
+                    params = json.loads(body or b'{}')
+                except ValueError:
+                    raise HTTPError(400, "Request body is not valid JSON")
+                if not isinstance(params, dict):
+                    raise HTTPError(400, "Request body must be a JSON object")
+            elif method == 'GET':
+                params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+                if 'exclude_ids' in params:
+                    params['exclude_ids'] = [_query_id(value) for value in params['exclude_ids'].split(',')]
+            else:
+                raise HTTPError(405, "Use GET or POST /similar")
+            key = ('similar', json.dumps(params, sort_keys=True, default=str))
+        elif method != 'GET':
+            raise HTTPError(405, f"Use GET {path}")
+        elif path == '/profile':
+            key = ('profile',)
+        elif path.startswith('/profile/'):
+            key = ('profile', unquote(path[len('/profile/'):]))
+        elif path == '/categories':
+            key = ('categories',)
+        elif path == '/recipient':
+            params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            if not any(params.get(name) for name in ('address', 'key', 'domain')):
+                raise HTTPError(400, "Give address, key or domain")
+            key = ('recipient', params.get('address', ''), params.get('key', ''), params.get('domain', ''))
+        else:
+            raise HTTPError(404, f"No such endpoint: {path}")
+
+        snapshot = self._current()
+        cached = self.cache.get((snapshot.version,) + key)
+        if cached is not None:
+            return 200, cached, True
+
+        if key[0] == 'similar':
+            response = _json(self._similar(params))
+        elif key[0] == 'categories':
+            response = _json({
+                category: {name: value for name, value in pattern.items() if name != 'sample'}
+                for category, pattern in snapshot.profile.get('response_patterns', {}).items()
+            })
+        elif key[0] == 'recipient':
+            match, profile = find_profile(snapshot.profile.get('recipient_profiles', {}), *key[1:])
+            response = _json({'match': match, 'profile': profile})
+        elif len(key) == 2:
+            if key[1] not in snapshot.profile:
+                raise HTTPError(404, f"No profile section {key[1]!r}; sections: {', '.join(snapshot.profile)}")
+            response = _json(snapshot.profile[key[1]])
+        else:
+            response = _json(snapshot.profile)
+
+        # A reload while answering would have emptied the cache; only
+        # cache answers from the snapshot that is still current
+        if self.snapshot is snapshot:
+            self.cache.put((snapshot.version,) + key, response)
+        return 200, response, False
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Answer requests on one connection until the client closes it (HTTP/1.1 keep-alive)."""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except asyncio.IncompleteReadError:
+                    return
+                except asyncio.LimitOverrunError:
+                    await _respond(writer, 413, _error("Request headers too large"), False, False)
+                    return
+
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ', 2)
+                except ValueError:
+                    await _respond(writer, 400, _error("Malformed request line"), False, False)
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await _respond(writer, 400, _error("Invalid Content-Length"), False, False)
+                    return
+                if length > MAX_REQUEST_BYTES:
+                    await _respond(writer, 413, _error("Request body too large"), False, False)
+                    return
+                body = await reader.readexactly(length) if length else b''
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' and (version == 'HTTP/1.1' or connection == 'keep-alive')
+
+                try:
+                    if target.split('?', 1)[0].rstrip('/') == '/reload' and method == 'POST':
+                        reloaded = await self.reload(force=True)
+                        status, response, hit = 200, _json({'reloaded': reloaded}), False
+                    else:
+                        status, response, hit = self.handle(method, target, body)
+                except HTTPError as e:
+                    status, response, hit = e.status, _error(str(e)), False
+
+                await _respond(writer, status, response, hit, keep_alive)
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        await self.reload()
+        server = await asyncio.start_server(self.serve_connection, host, port)
+        watcher = asyncio.ensure_future(self.watch())
+        print(f"🚀 Style service on http://{host}:{port} (profile: {self.profile_file}, index: {self.index_file})")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+            if self.snapshot is not None and self.snapshot.index is not None:
+                self.snapshot.index.close()
+
+
+def _query_id(value: str) -> Any:
+    # Email ids in a query string are numbers or strings
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def _json(data: Any) -> bytes:
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+def _error(message: str) -> bytes:
+    return _json({'error': message})
+
+
+async def _respond(writer: asyncio.StreamWriter, status: int, body: bytes, cache_hit: bool, keep_alive: bool):
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"X-Cache: {'hit' if cache_hit else 'miss'}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode('latin-1') + body)
+    await writer.drain()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve the style profile and similar emails from memory")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"Address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument('--port', '-p', type=int, default=DEFAULT_PORT,
+                        help=f"Port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument('--profile-file', default=DEFAULT_PROFILE_FILE,
+                        help=f"Style profile from analyze-style.py (default: {DEFAULT_PROFILE_FILE})")
+    parser.add_argument('--index', default=DEFAULT_INDEX_FILE,
+                        help=f"Similar-email index from analyze-style.py --index (default: {DEFAULT_INDEX_FILE})")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE,
+                        help=f"Responses to keep cached (default: {DEFAULT_CACHE_SIZE}, 0 = no cache)")
+    parser.add_argument('--poll', type=float, default=DEFAULT_POLL_SECONDS, metavar='SECONDS',
+                        help=f"How often to check the files for changes (default: {DEFAULT_POLL_SECONDS})")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    service = StyleService(args.profile_file, args.index, cache_size=args.cache_size, poll_seconds=args.poll)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n👋 Style service stopped")
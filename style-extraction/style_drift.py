@@ -0,0 +1,259 @@
+"""
+Style Drift Over Time
+
+The style profile sums up all mail ever sent, so it is slow to show a
+change of habit (a new sign-off, shorter emails). DriftAccumulator keeps
+the same statistics per calendar week and month, by sentDate:
+
+- Each bucket is a StyleCounts: greeting and sign-off counts, tone
+  indicator totals, and count / sum / sum of squares of email, sentence
+  and paragraph lengths. These are plain sums, so buckets can be added
+  and also taken away again
+- A sliding window (e.g. the last 90 days) moves one week at a time: the
+  new week is added and the weeks that fell out are subtracted, so each
+  step costs the number of distinct labels, however much mail a week has
+- The current profile weighs each week by 0.5 ** (age / half-life), with
+  the age counted back from the latest week with mail
+
+The result is a time series (monthly, weekly and the rolling window) of
+a compact profile, plus the current profile. Memory grows with the
+number of weeks covered, not with the number of emails. Emails without a
+usable sentDate are only counted as undated. With --dedup, a collapsed
+cluster counts at the date of its first email.
+"""
+
+from collections import Counter, deque
+from datetime import date, timedelta
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from style_features import Accumulator, EmailFeatures, tone_summary
+
+DEFAULT_DRIFT_FILE = 'output/style-drift.json'
+DEFAULT_WINDOW_DAYS = 90
+DEFAULT_HALF_LIFE_DAYS = 90
+
+# Length series kept as [count, sum, sum of squares]
+LENGTHS = ('email_length', 'sentence_length', 'paragraph_count')
+
+
+def _percentages(counts: Counter, total: float) -> Dict[str, float]:
+    return {
+        label: round(count / total * 100, 1)
+        for label, count in sorted(counts.items(), key=lambda item: -item[1]) if count > 0
+    } if total > 0 else {}
+
+
+class StyleCounts:
+    """Greeting, sign-off, tone and length sums of a set of emails.
+
+    add() and subtract() cost the number of distinct labels; factor
+    scales the added counts (for the decayed current profile).
+    """
+
+    __slots__ = ('emails', 'greetings', 'signoffs', 'tone', 'lengths')
+
+    def __init__(self):
+        self.emails = 0
+        self.greetings = Counter()
+        self.signoffs = Counter()
+        self.tone = Counter()
+        self.lengths = {name: [0, 0, 0] for name in LENGTHS}
+
+    def add_email(self, weight: int, greeting: Optional[str], signoff: Optional[str],
+                  tone: Dict[str, int], lengths: Dict[str, List[int]]):
+        """Count one email (weight: emails it stands for); `lengths` has the values of each series."""
+        self.emails += weight
+        if greeting is not None:
+            self.greetings[greeting] += weight
+        if signoff is not None:
+            self.signoffs[signoff] += weight
+        for name, hits in tone.items():
+            self.tone[name] += hits * weight
+        for name, values in lengths.items():
+            moments = self.lengths[name]
+            moments[0] += len(values) * weight
+            moments[1] += sum(values) * weight
+            moments[2] += sum(value * value for value in values) * weight
+
+    def add(self, other: 'StyleCounts', factor: float = 1):
+        self.emails += other.emails * factor
+        for mine, theirs in ((self.greetings, other.greetings), (self.signoffs, other.signoffs),
+                             (self.tone, other.tone)):
+            for label, count in theirs.items():
+                mine[label] += count * factor
+        for name, moments in other.lengths.items():
+            mine = self.lengths[name]
+            for i in range(3):
+                mine[i] += moments[i] * factor
+
+    def subtract(self, other: 'StyleCounts'):
+        self.add(other, -1)
+
+    def _mean_std(self, name: str) -> Tuple[float, float]:
+        count, total, squares = self.lengths[name]
+        if count <= 0:
+            return 0, 0
+        mean = total / count
+        return mean, max(squares / count - mean * mean, 0) ** 0.5
+
+    def summary(self) -> Dict[str, Any]:
+        """Compact profile: shares of greetings and sign-offs, tone scores, lengths."""
+        result: Dict[str, Any] = {
+            'emails': round(self.emails, 1),
+            'greetings': _percentages(self.greetings, self.emails),
+            'sign_offs': _percentages(self.signoffs, self.emails),
+            'tone': tone_summary(self.tone, self.emails),
+        }
+        for name in LENGTHS:
+            mean, std = self._mean_std(name)
+            result[name] = {'mean': round(mean, 1), 'std_dev': round(std, 1)}
+        return result
+
+    def state(self) -> Dict[str, Any]:
+        return {'emails': self.emails, 'greetings': dict(self.greetings), 'signoffs': dict(self.signoffs),
+                'tone': dict(self.tone), 'lengths': self.lengths}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'StyleCounts':
+        counts = cls()
+        counts.emails = state['emails']
+        counts.greetings = Counter(state['greetings'])
+        counts.signoffs = Counter(state['signoffs'])
+        counts.tone = Counter(state['tone'])
+        counts.lengths = {name: list(moments) for name, moments in state['lengths'].items()}
+        return counts
+
+
+class SlidingWindow:
+    """StyleCounts of the last `weeks` weeks, moved forward one week at a time."""
+
+    def __init__(self, weeks: int):
+        self.weeks = weeks
+        self.counts = StyleCounts()
+        self._buckets: Deque[StyleCounts] = deque()
+
+    def push(self, bucket: StyleCounts):
+        """Add the next week (empty weeks too) and drop the one that fell out."""
+        self.counts.add(bucket)
+        self._buckets.append(bucket)
+        if len(self._buckets) > self.weeks:
+            self.counts.subtract(self._buckets.popleft())
+
+    @property
+    def full(self) -> bool:
+        return len(self._buckets) == self.weeks
+
+
+def email_stats(features: EmailFeatures) -> Tuple[Dict[str, int], Dict[str, List[int]]]:
+    """Tone indicator hits and length values of one email, for StyleCounts.add_email."""
+    tone = {name: len(terms) for name, terms in features.indicators.items()}
+    lengths = {
+        'email_length': [len(features.words)],
+        'sentence_length': features.sentence_lengths,
+        'paragraph_count': [features.paragraph_count],
+    }
+    return tone, lengths
+
+
+def week_start(day: date) -> date:
+    """Monday of the week a day falls in."""
+    return day - timedelta(days=day.weekday())
+
+
+def _sent_day(email: Dict[str, Any]) -> Optional[date]:
+    sent = email.get('sentDate') or ''
+    try:
+        return date.fromisoformat(sent[:10])
+    except ValueError:
+        return None
+
+
+class DriftAccumulator(Accumulator):
+    """Weekly and monthly StyleCounts, turned into drift time series by result()."""
+
+    name = 'drift'
+
+    def __init__(self, window_days: int = DEFAULT_WINDOW_DAYS,
+                 half_life_days: float = DEFAULT_HALF_LIFE_DAYS):
+        self.window_days = window_days
+        self.half_life_days = half_life_days
+        # Week start (ISO date) or month (YYYY-MM) -> counts
+        self.weeks: Dict[str, StyleCounts] = {}
+        self.months: Dict[str, StyleCounts] = {}
+        self.undated = 0
+
+    def add(self, features: EmailFeatures):
+        day = _sent_day(features.email)
+        if day is None:
+            self.undated += features.weight
+            return
+
+        tone, lengths = email_stats(features)
+        greeting, signoff = features.greeting, features.signoff
+
+        for buckets, key in ((self.weeks, week_start(day).isoformat()), (self.months, day.isoformat()[:7])):
+            counts = buckets.get(key)
+            if counts is None:
+                counts = buckets[key] = StyleCounts()
+            counts.add_email(features.weight, greeting, signoff, tone, lengths)
+
+    def rolling(self) -> List[Dict[str, Any]]:
+        """Profile of the window ending with each week, from the first full window on."""
+        if not self.weeks:
+            return []
+        window_weeks = max(1, -(-self.window_days // 7))
+        window = SlidingWindow(window_weeks)
+        empty = StyleCounts()
+
+        first, last = (date.fromisoformat(key) for key in (min(self.weeks), max(self.weeks)))
+        series = []
+        week = first
+        while week <= last:
+            window.push(self.weeks.get(week.isoformat(), empty))
+            if window.full or week == last:
+                series.append({'end': (week + timedelta(days=6)).isoformat(), **window.counts.summary()})
+            week += timedelta(days=7)
+        return series
+
+    def current(self) -> StyleCounts:
+        """All weeks, each weighted by 0.5 ** (weeks before the latest / half-life)."""
+        current = StyleCounts()
+        if self.weeks:
+            latest = date.fromisoformat(max(self.weeks))
+            for key, counts in self.weeks.items():
+                age = (latest - date.fromisoformat(key)).days
+                current.add(counts, 0.5 ** (age / self.half_life_days))
+        return current
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            'window_days': self.window_days,
+            'half_life_days': self.half_life_days,
+            'latest_week': max(self.weeks) if self.weeks else None,
+            'undated_emails': self.undated,
+            'current': self.current().summary(),
+            'monthly': [{'period': key, **self.months[key].summary()} for key in sorted(self.months)],
+            'weekly': [{'period': key, **self.weeks[key].summary()} for key in sorted(self.weeks)],
+            'rolling': self.rolling(),
+        }
+
+    def merge(self, other: 'DriftAccumulator'):
+        for mine, theirs in ((self.weeks, other.weeks), (self.months, other.months)):
+            for key, counts in theirs.items():
+                if key in mine:
+                    mine[key].add(counts)
+                else:
+                    mine[key] = counts
+        self.undated += other.undated
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            'weeks': {key: counts.state() for key, counts in self.weeks.items()},
+            'months': {key: counts.state() for key, counts in self.months.items()},
+            'undated': self.undated,
+        }
+
+    def load_state(self, state: Dict[str, Any]):
+        self.weeks = {key: StyleCounts.from_state(counts) for key, counts in state['weeks'].items()}
+        self.months = {key: StyleCounts.from_state(counts) for key, counts in state['months'].items()}
+        self.undated = state['undated']
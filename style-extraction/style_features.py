@@ -0,0 +1,640 @@
+"""
+Fused Style Feature Extraction
+
+Computes every style-profile section in one pass over the emails. Each
+email is visited once: its body is lowercased and split once into an
+EmailFeatures view, which is handed to a set of pluggable accumulators.
+Each accumulator collects what its analysis needs and turns it into a
+profile section with result().
+
+To add an analysis, subclass Accumulator and pass an instance to
+extract_features() (or add it in StyleAnalyzer.build_accumulators()); no
+extra pass over the corpus is needed.
+
+Accumulators keep raw sufficient statistics (counts, sums and sketches,
+never rounded values), so two of the same type can be merged and saved
+with state() / load_state(). Results derived from merged accumulators
+equal those of a single pass over both sets of emails (see
+style_state.py), except for the length percentiles once a length takes
+more distinct values than a sketch counts exactly (see sketches.py).
+"""
+
+import re
+import time
+from collections import Counter, deque
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Sized, Tuple
+
+import numpy as np
+
+from categorizer import BATCH_SIZE, CATEGORY_BODY_CHARS, GENERAL, EmailText, HashedCategorizer
+from indicators import TONE_INDICATORS, IndicatorScanner, ScanResult, style_indicator_scanner
+from near_duplicates import email_weight
+from phrase_mining import DEFAULT_MAX_COUNTERS, PhraseMiner
+from profiling import Profiler
+from sample_selection import SAMPLE_POOL_SIZE, sample_hash, select_representatives
+from sketches import Distribution, WeightedSample
+
+GREETING_PATTERNS = [
+    (r'^Hi\s+\[Customer\],?', "Hi [Name],"),
+    (r'^Hello\s+\[Customer\],?', "Hello [Name],"),
+    (r'^Hey\s+\[Customer\],?', "Hey [Name],"),
+    (r'^Dear\s+\[Customer\],?', "Dear [Name],"),
+    (r'^\[Customer\],?', "[Name],"),
+    (r'^Good\s+(?:morning|afternoon|evening)\s+\[Customer\],?', "Good [time] [Name],"),
+]
+
+SIGNOFF_PATTERNS = [
+    (r'Thanks,?\s*(?:Joe|Joe Newman)', "Thanks,\nJoe"),
+    (r'Best,?\s*(?:Joe|Joe Newman)', "Best,\nJoe"),
+    (r'Best regards,?\s*(?:Joe|Joe Newman)', "Best regards,\nJoe"),
+    (r'Regards,?\s*(?:Joe|Joe Newman)', "Regards,\nJoe"),
+    (r'Sincerely,?\s*(?:Joe|Joe Newman)', "Sincerely,\nJoe"),
+    (r'Cheers,?\s*(?:Joe|Joe Newman)', "Cheers,\nJoe"),
+    (r'(?:^|\n)Joe(?:\s+Newman)?$', "Joe"),
+]
+
+# Emails per worker shard when extracting features from a stream
+STREAM_SHARD_EMAILS = 5000
+
+# Samples chosen per category for the response patterns and training data
+SAMPLES_PER_CATEGORY = 5
+
+# Histogram bucket starts for the writing characteristics
+EMAIL_LENGTH_BUCKETS = [0, 25, 50, 100, 200, 400, 800]
+SENTENCE_LENGTH_BUCKETS = [0, 5, 10, 15, 20, 30, 50]
+PARAGRAPH_COUNT_BUCKETS = [0, 1, 2, 3, 5, 8, 13]
+
+_SENTENCE_SPLIT = re.compile(r'[.!?]+')
+
+_GREETINGS = [(re.compile(p, re.IGNORECASE), label) for p, label in GREETING_PATTERNS]
+_SIGNOFFS = [(re.compile(p, re.IGNORECASE | re.MULTILINE), label) for p, label in SIGNOFF_PATTERNS]
+
+# Marks a lazy EmailFeatures value that has not been computed yet
+_UNSET = object()
+
+
+def greeting_label(body: str) -> Optional[str]:
+    """Greeting used in the first 100 characters, if any."""
+    first_line = body[:100].strip()
+    for pattern, label in _GREETINGS:
+        if pattern.search(first_line):
+            return label
+    return None
+
+
+def signoff_label(body: str) -> Optional[str]:
+    """Sign-off used in the last 150 characters, if any."""
+    last_part = body[-150:].strip()
+    for pattern, label in _SIGNOFFS:
+        if pattern.search(last_part):
+            return label
+    return None
+
+
+def sentence_lengths(body: str) -> List[int]:
+    """Words per sentence (rough approximation); blank fragments have no words."""
+    lengths = [len(sentence.split()) for sentence in _SENTENCE_SPLIT.split(body)]
+    return [length for length in lengths if length]
+
+
+def paragraph_count(body: str) -> int:
+    return sum(1 for p in body.split('\n\n') if p.strip())
+
+
+class EmailFeatures:
+    """Per-email values shared by all accumulators, computed once.
+
+    The tone indicator scan, greeting and sign-off matching and sentence
+    splitting run on first use, so accumulators that need the same value
+    (the profile, recipient profiles, drift buckets) share one result.
+    `weight` is how many emails this one stands for: more than 1 for the
+    representative of near-duplicates collapsed by near_duplicates.py.
+    """
+
+    __slots__ = ('email', 'weight', 'body', 'lower', 'words', 'subject_lower',
+                 '_scanner', '_indicators', '_greeting', '_signoff',
+                 '_sentence_lengths', '_paragraph_count')
+
+    def __init__(self, email: Dict[str, Any], scanner: IndicatorScanner):
+        self.email = email
+        self.weight = email_weight(email)
+        self.body = email['body']
+        self.lower = self.body.lower()
+        self.words = self.body.split()
+        self.subject_lower = email['subject'].lower()
+        self._scanner = scanner
+        self._indicators = None
+        self._greeting = _UNSET
+        self._signoff = _UNSET
+        self._sentence_lengths = None
+        self._paragraph_count = None
+
+    @property
+    def indicators(self) -> ScanResult:
+        """Indicator terms found in the body (see indicators.py)."""
+        if self._indicators is None:
+            self._indicators = self._scanner.scan(self.lower)
+        return self._indicators
+
+    @property
+    def greeting(self) -> Optional[str]:
+        if self._greeting is _UNSET:
+            self._greeting = greeting_label(self.body)
+        return self._greeting
+
+    @property
+    def signoff(self) -> Optional[str]:
+        if self._signoff is _UNSET:
+            self._signoff = signoff_label(self.body)
+        return self._signoff
+
+    @property
+    def sentence_lengths(self) -> List[int]:
+        if self._sentence_lengths is None:
+            self._sentence_lengths = sentence_lengths(self.body)
+        return self._sentence_lengths
+
+    @property
+    def paragraph_count(self) -> int:
+        if self._paragraph_count is None:
+            self._paragraph_count = paragraph_count(self.body)
+        return self._paragraph_count
+
+
+class Accumulator:
+    """One analysis: fed every email once, then asked for its result."""
+
+    # Key of this accumulator's result in extract_features()
+    name = ''
+
+    def add(self, features: EmailFeatures):
+        raise NotImplementedError
+
+    def result(self) -> Any:
+        raise NotImplementedError
+
+    def merge(self, other: 'Accumulator'):
+        """Fold in an accumulator of the same type that saw later emails."""
+        raise NotImplementedError
+
+    def state(self) -> Dict[str, Any]:
+        """Raw statistics as JSON-serializable data."""
+        raise NotImplementedError
+
+    def load_state(self, state: Dict[str, Any]):
+        """Replace this accumulator's statistics with a saved state()."""
+        raise NotImplementedError
+
+
+def _usage_summary(counts: Counter, default: str) -> Dict[str, Any]:
+    """most_common / variations / usage_percentages for greetings and sign-offs."""
+    total = sum(counts.values())
+
+    if total == 0:
+        return {
+            "most_common": default,
+            "variations": [],
+            "usage_percentages": {}
+        }
+
+    return {
+        "most_common": counts.most_common(1)[0][0],
+        "variations": [label for label, _ in counts.most_common()],
+        "usage_percentages": {
+            label: round((count / total) * 100, 2)
+            for label, count in counts.items()
+        },
+    }
+
+
+def tone_summary(totals: Dict[str, float], emails: float) -> Dict[str, Any]:
+    """Tone scores (0-10) from indicator totals over a number of emails."""
+    total_emails = emails or 1
+
+    # Calculate scores (0-10 scale)
+    formality_score = min(10, (totals.get('formal', 0) / total_emails) * 2)
+    warmth_score = min(10, (totals.get('friendly', 0) / total_emails) * 1.5)
+    professionalism_score = min(10, (totals.get('professional', 0) / total_emails) * 1.5)
+
+    # Determine overall tone
+    if formality_score > 7:
+        overall_tone = "Formal"
+    elif warmth_score > 7:
+        overall_tone = "Friendly"
+    elif professionalism_score > 6:
+        overall_tone = "Professional-Friendly"
+    else:
+        overall_tone = "Casual-Professional"
+
+    return {
+        "overall_tone": overall_tone,
+        "formality_score": round(formality_score, 1),
+        "warmth_score": round(warmth_score, 1),
+        "professionalism_score": round(professionalism_score, 1),
+    }
+
+
+class _LabelCounts(Accumulator):
+    """Shared state handling for accumulators that count one label per email."""
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def merge(self, other: '_LabelCounts'):
+        self.counts.update(other.counts)
+
+    def state(self) -> Dict[str, Any]:
+        # Label order is kept: it breaks ties in most_common()
+        return {'counts': dict(self.counts)}
+
+    def load_state(self, state: Dict[str, Any]):
+        self.counts = Counter(state['counts'])
+
+
+class GreetingAccumulator(_LabelCounts):
+    """Greeting used in the first 100 characters."""
+
+    name = 'greetings'
+
+    def add(self, features: EmailFeatures):
+        label = features.greeting
+        if label is not None:
+            self.counts[label] += features.weight
+
+    def result(self) -> Dict[str, Any]:
+        return _usage_summary(self.counts, "Hi [Name],")
+
+
+class SignoffAccumulator(_LabelCounts):
+    """Sign-off used in the last 150 characters."""
+
+    name = 'signoffs'
+
+    def add(self, features: EmailFeatures):
+        label = features.signoff
+        if label is not None:
+            self.counts[label] += features.weight
+
+    def result(self) -> Dict[str, Any]:
+        return _usage_summary(self.counts, "Thanks,\nJoe")
+
+
+class ToneAccumulator(Accumulator):
+    """Formality, warmth and professionalism from indicator hits."""
+
+    name = 'tone'
+
+    def __init__(self):
+        self.totals = {tone: 0 for tone in TONE_INDICATORS}
+        self.emails = 0
+
+    def add(self, features: EmailFeatures):
+        # Each distinct indicator counts once per email
+        found = features.indicators
+        for tone in self.totals:
+            if tone in found:
+                self.totals[tone] += len(found[tone]) * features.weight
+        self.emails += features.weight
+
+    def result(self) -> Dict[str, Any]:
+        return tone_summary(self.totals, self.emails)
+
+    def merge(self, other: 'ToneAccumulator'):
+        for tone, total in other.totals.items():
+            self.totals[tone] = self.totals.get(tone, 0) + total
+        self.emails += other.emails
+
+    def state(self) -> Dict[str, Any]:
+        return {'totals': dict(self.totals), 'emails': self.emails}
+
+    def load_state(self, state: Dict[str, Any]):
+        self.totals = dict(state['totals'])
+        self.emails = state['emails']
+
+
+class CharacteristicsAccumulator(Accumulator):
+    """Email, sentence and paragraph length distributions, in constant memory.
+
+    Each is a sketches.Distribution: mean and standard deviation (Welford),
+    p50/p90/p99 from a QuantileSketch, and a histogram over fixed buckets.
+    Lengths take far fewer distinct values than the sketch counts exactly,
+    so the percentiles are exact and merged shards give the same ones as
+    a single pass.
+    """
+
+    name = 'characteristics'
+
+    def __init__(self):
+        self.email_lengths = Distribution(EMAIL_LENGTH_BUCKETS)
+        self.sentence_lengths = Distribution(SENTENCE_LENGTH_BUCKETS)
+        self.paragraph_counts = Distribution(PARAGRAPH_COUNT_BUCKETS)
+
+    def add(self, features: EmailFeatures):
+        weight = features.weight
+        self.email_lengths.add(len(features.words), weight)
+
+        self.sentence_lengths.add_all(features.sentence_lengths, weight)
+        self.paragraph_counts.add(features.paragraph_count, weight)
+
+    def result(self) -> Dict[str, Any]:
+        emails = self.email_lengths.stats.count
+        sentences = self.sentence_lengths.stats.count
+        return {
+            "avg_email_length": round(self.email_lengths.mean) if emails else 0,
+            "avg_sentence_length": round(self.sentence_lengths.mean) if sentences else 0,
+            "avg_paragraph_count": round(self.paragraph_counts.mean, 1) if emails else 0,
+            "email_length": self.email_lengths.result(),
+            "sentence_length": self.sentence_lengths.result(),
+            "paragraph_count": self.paragraph_counts.result(),
+        }
+
+    _FIELDS = ('email_lengths', 'sentence_lengths', 'paragraph_counts')
+
+    def merge(self, other: 'CharacteristicsAccumulator'):
+        for field in self._FIELDS:
+            getattr(self, field).merge(getattr(other, field))
+
+    def state(self) -> Dict[str, Any]:
+        return {field: getattr(self, field).state() for field in self._FIELDS}
+
+    def load_state(self, state: Dict[str, Any]):
+        for field in self._FIELDS:
+            getattr(self, field).load_state(state[field])
+
+
+class PhraseAccumulator(Accumulator):
+    """Most common 3- to 8-word phrases (see phrase_mining.py).
+
+    Unlike the other analyses, phrases count once per collapsed
+    near-duplicate cluster, so a template sent thousands of times does not
+    crowd out the rest.
+    """
+
+    name = 'common_phrases'
+
+    def __init__(self, min_length=3, max_length=8, top_n=15, max_counters=DEFAULT_MAX_COUNTERS):
+        self.miner = PhraseMiner(min_length, max_length, max_counters)
+        self.top_n = top_n
+
+    def add(self, features: EmailFeatures):
+        # Emails read from an email_store.EmailStore may come pre-tokenized
+        token_ids = getattr(features.email, 'token_ids', None)
+        if token_ids is not None:
+            self.miner.add_word_ids(token_ids, features.email.store.vocabulary)
+        else:
+            self.miner.add_text(features.lower)
+
+    def result(self) -> List[str]:
+        # Only phrases that appear at least 3 times
+        return self.miner.top_phrases(self.top_n, min_count=3)
+
+    def merge(self, other: 'PhraseAccumulator'):
+        self.miner.merge(other.miner)
+
+    def state(self) -> Dict[str, Any]:
+        return self.miner.state()
+
+    def load_state(self, state: Dict[str, Any]):
+        self.miner.load_state(state)
+
+
+class CategoryAccumulator(Accumulator):
+    """Emails per type, scored by categorizer.py on the subject and start of the body.
+
+    Emails are scored in batches of BATCH_SIZE. Each counts toward its
+    highest-scoring category, and as a mention toward every category that
+    outscores 'general' for it, so a quote about a delivery shows up under
+    both ('general' is mentioned only where nothing else is). Keeps, per
+    category, the email count, the mentions, the sum of word counts and a
+    weighted random pool of SAMPLE_POOL_SIZE emails, from which result()
+    picks SAMPLES_PER_CATEGORY representative samples (sample_selection.py).
+    """
+
+    name = 'categories'
+
+    def __init__(self, categorizer: Optional[HashedCategorizer] = None):
+        self.categorizer = categorizer or HashedCategorizer.from_keywords()
+        self.categories: Dict[str, Dict[str, Any]] = {}
+        # (text, weight, word count, email) of emails not scored yet
+        self._pending: List[Tuple[EmailText, int, int, Dict[str, Any]]] = []
+
+    def _summary(self, category: str) -> Dict[str, Any]:
+        summary = self.categories.get(category)
+        if summary is None:
+            summary = self.categories[category] = {
+                'count': 0, 'mentions': 0, 'word_total': 0, 'pool': WeightedSample(SAMPLE_POOL_SIZE),
+            }
+        return summary
+
+    def add(self, features: EmailFeatures):
+        email = features.email
+        text = (features.subject_lower, features.lower[:CATEGORY_BODY_CHARS])
+        self._pending.append((text, features.weight, email['wordCount'], email))
+        if len(self._pending) >= BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        """Score the pending emails and count them."""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+
+        categorizer = self.categorizer
+        scores = categorizer.scores([text for text, _, _, _ in pending])
+        for category, (_, weight, word_count, email) in zip(categorizer.best(scores), pending):
+            summary = self._summary(category)
+            summary['count'] += weight
+            summary['word_total'] += word_count * weight
+            summary['pool'].add({key: email[key] for key in ('subject', 'body', 'wordCount')},
+                                sample_hash(email), weight)
+
+        weights = np.array([weight for _, weight, _, _ in pending])
+        general = categorizer.categories.index(GENERAL)
+        mentioned = scores > scores[:, general:general + 1]
+        mentioned[:, general] = ~mentioned.any(axis=1)
+        mentions = weights @ mentioned
+        for category, count in zip(categorizer.categories, mentions.tolist()):
+            if count:
+                self._summary(category)['mentions'] += count
+
+    def result(self) -> Dict[str, Dict[str, Any]]:
+        """category -> {'count', 'mentions', 'word_total', 'samples'}, in first-seen order.
+
+        Samples carry their selection scores (sample_selection.py).
+        """
+        self._flush()
+        samples = select_representatives(
+            {category: summary['pool'].items() for category, summary in self.categories.items()},
+            SAMPLES_PER_CATEGORY,
+        )
+        return {
+            category: {'count': summary['count'], 'mentions': summary['mentions'],
+                       'word_total': summary['word_total'], 'samples': samples[category]}
+            for category, summary in self.categories.items()
+        }
+
+    def merge(self, other: 'CategoryAccumulator'):
+        self._flush()
+        other._flush()
+        for category, theirs in other.categories.items():
+            summary = self._summary(category)
+            summary['count'] += theirs['count']
+            summary['mentions'] += theirs['mentions']
+            summary['word_total'] += theirs['word_total']
+            summary['pool'].merge(theirs['pool'])
+
+    def state(self) -> Dict[str, Any]:
+        self._flush()
+        return {'categories': {
+            category: dict(summary, pool=summary['pool'].state())
+            for category, summary in self.categories.items()
+        }}
+
+    def load_state(self, state: Dict[str, Any]):
+        self._pending = []
+        self.categories = {}
+        for category, summary in state['categories'].items():
+            pool = WeightedSample(SAMPLE_POOL_SIZE)
+            pool.load_state(summary['pool'])
+            self.categories[category] = dict(summary, pool=pool)
+
+
+def default_accumulators(phrase_counters: int = DEFAULT_MAX_COUNTERS,
+                         categorizer: Optional[HashedCategorizer] = None) -> List[Accumulator]:
+    """The accumulators behind the standard style profile.
+
+    `categorizer` defaults to the keyword-seeded one (categorizer.py).
+    """
+    return [
+        GreetingAccumulator(),
+        SignoffAccumulator(),
+        ToneAccumulator(),
+        CharacteristicsAccumulator(),
+        PhraseAccumulator(max_counters=phrase_counters),
+        CategoryAccumulator(categorizer),
+    ]
+
+
+def extract_features(emails: Iterable[Dict[str, Any]], accumulators: List[Accumulator],
+                     scanner: Optional[IndicatorScanner] = None,
+                     profiler: Optional[Profiler] = None,
+                     merge_after: Sequence[List[Accumulator]] = ()) -> Dict[str, Any]:
+    """Feed each email once to every accumulator; return results by name.
+
+    `scanner` finds tone indicators (default: substring matching).
+    With a `profiler`, each accumulator is timed as a stage of its own.
+    `merge_after` are accumulator lists filled elsewhere (saved states),
+    merged in after the emails.
+    """
+    if scanner is None:
+        scanner = style_indicator_scanner()
+
+    if profiler is not None:
+        _extract_profiled(emails, accumulators, scanner, profiler)
+    else:
+        adders = [accumulator.add for accumulator in accumulators]
+        for email in emails:
+            features = EmailFeatures(email, scanner)
+            for add in adders:
+                add(features)
+
+    return _results(accumulators, merge_after)
+
+
+def _results(accumulators: List[Accumulator], merge_after: Sequence[List[Accumulator]]) -> Dict[str, Any]:
+    for others in merge_after:
+        for accumulator, other in zip(accumulators, others):
+            accumulator.merge(other)
+    return {accumulator.name: accumulator.result() for accumulator in accumulators}
+
+
+def _extract_profiled(emails: Iterable[Dict[str, Any]], accumulators: List[Accumulator],
+                      scanner: IndicatorScanner, profiler: Profiler):
+    """extract_features() loop with per-stage and per-email timings."""
+    for email in emails:
+        start_ns = time.perf_counter_ns()
+
+        # Run the lazy indicator scan here, so it is not charged to
+        # whichever accumulator happens to use it first
+        with profiler.stage('email_features'):
+            features = EmailFeatures(email, scanner)
+        with profiler.stage('indicator_scan'):
+            features.indicators
+
+        for accumulator in accumulators:
+            with profiler.stage(accumulator.name):
+                accumulator.add(features)
+
+        profiler.add_email(email.get('id'), (time.perf_counter_ns() - start_ns) / 1e9, start_ns)
+
+
+def extract_features_parallel(emails: Iterable[Dict[str, Any]], accumulators: List[Accumulator],
+                              make_accumulators: Callable[[], List[Accumulator]], workers: int,
+                              whole_words: bool = False,
+                              profiler: Optional[Profiler] = None,
+                              merge_after: Sequence[List[Accumulator]] = (),
+                              shard_size: Optional[int] = None) -> Dict[str, Any]:
+    """Map-reduce version of extract_features() over a process pool.
+
+    The emails are split into contiguous shards of `shard_size` (default:
+    one per worker for a list, STREAM_SHARD_EMAILS for an iterator, of
+    which only a few are in flight at once). Each shard is fed to fresh
+    accumulators from make_accumulators() in a worker, and the filled
+    accumulators are merged into `accumulators` in shard order (then
+    `merge_after`), so the results equal a serial pass (phrase counts
+    included, as long as the phrase counters are not exhausted).
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    if shard_size is None:
+        shard_size = -(-len(emails) // workers) if isinstance(emails, Sized) else STREAM_SHARD_EMAILS
+    shard_size = max(1, shard_size)
+    emails = iter(emails)
+
+    profile_slowest = profiler.slowest if profiler is not None else None
+    names = [accumulator.name for accumulator in accumulators]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(whole_words,)) as pool:
+        pending = deque()
+
+        def submit_next() -> bool:
+            shard = list(islice(emails, shard_size))
+            if not shard:
+                return False
+            fresh = make_accumulators()
+            if [accumulator.name for accumulator in fresh] != names:
+                raise ValueError("make_accumulators() must build the same accumulators, in the same order")
+            pending.append(pool.submit(_extract_shard, (shard, fresh, profile_slowest)))
+            return True
+
+        while len(pending) < workers * 2 and submit_next():
+            pass
+
+        while pending:
+            shard_accumulators, shard_profile = pending.popleft().result()
+            submit_next()
+            for accumulator, shard_accumulator in zip(accumulators, shard_accumulators):
+                accumulator.merge(shard_accumulator)
+            if shard_profile is not None:
+                profiler.merge(shard_profile)
+
+    return _results(accumulators, merge_after)
+
+
+_worker_scanner: Optional[IndicatorScanner] = None
+
+
+def _init_worker(whole_words: bool):
+    """Pool initializer: build the indicator scanner once per worker process."""
+    global _worker_scanner
+    _worker_scanner = style_indicator_scanner(whole_words)
+
+
+def _extract_shard(job) -> Tuple[List[Accumulator], Optional[Profiler]]:
+    """Pool worker: feed one shard of emails to its accumulators (profiling it if asked)."""
+    shard, accumulators, profile_slowest = job
+    profiler = Profiler(profile_slowest) if profile_slowest is not None else None
+    extract_features(shard, accumulators, _worker_scanner, profiler)
+    return accumulators, profiler
@@ -0,0 +1,133 @@
+"""
+Style Profile State
+
+Saves the raw statistics behind style-profile.json (greeting and sign-off
+counts, indicator totals, length distributions, phrase counters, category
+counts, sample pools and recipient partitions) to a sidecar file, so the
+profile can be brought up to date with new emails without re-reading the
+old ones:
+
+- load_state() seeds freshly built accumulators from a saved state
+- the new emails are fed to them as usual (style_features.extract_features)
+- save_state() writes the combined statistics back
+
+A state also lists a content key (email_key()) of every email it covers,
+so --update skips input emails that are already counted; email ids are
+positional and change between extractions, so they cannot be used.
+States saved by separate runs can be combined by loading each into its
+own accumulators and merging them (Accumulator.merge), as long as they
+cover different emails.
+
+A state records the analysis version, a fingerprint of the pattern,
+indicator and keyword lists, the categorizer's fingerprint, and the
+matching, near-duplicate and drift options. Loading a state made with different
+ones raises ValueError, since its counts would not mean the same thing;
+run a full analysis instead.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from indicators import CATEGORY_KEYWORDS, TONE_INDICATORS
+from recipient_profiles import DOMAIN_COUNTERS, RECIPIENT_COUNTERS
+from sample_selection import SAMPLE_POOL_SIZE
+from style_features import (
+    CATEGORY_BODY_CHARS,
+    EMAIL_LENGTH_BUCKETS,
+    GREETING_PATTERNS,
+    PARAGRAPH_COUNT_BUCKETS,
+    SAMPLES_PER_CATEGORY,
+    SENTENCE_LENGTH_BUCKETS,
+    SIGNOFF_PATTERNS,
+    Accumulator,
+)
+
+DEFAULT_STATE_FILE = 'output/style-state.json'
+
+# Bump the prefix when the way emails are counted changes
+ANALYSIS_VERSION = '7:' + hashlib.sha256(json.dumps(
+    [GREETING_PATTERNS, SIGNOFF_PATTERNS, TONE_INDICATORS, CATEGORY_KEYWORDS,
+     CATEGORY_BODY_CHARS, SAMPLES_PER_CATEGORY, SAMPLE_POOL_SIZE,
+     RECIPIENT_COUNTERS, DOMAIN_COUNTERS,
+     EMAIL_LENGTH_BUCKETS, SENTENCE_LENGTH_BUCKETS, PARAGRAPH_COUNT_BUCKETS],
+    sort_keys=True,
+).encode('utf-8')).hexdigest()[:16]
+
+_FORMAT = 2
+
+
+def email_key(email: Dict[str, Any]) -> str:
+    """Content hash identifying an email across extractions."""
+    digest = hashlib.blake2b(digest_size=8)
+    for field in ('sentDate', 'recipient', 'subject', 'body'):
+        digest.update(str(email.get(field) or '').encode('utf-8', 'surrogatepass'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def state_settings(whole_words: bool = False, dedup: Optional[float] = None,
+                   categorizer: Optional[str] = None, drift: bool = False) -> Dict[str, Any]:
+    """Settings a state must have been made with to be combined with this run.
+
+    `categorizer` is the fingerprint of the categorizer in use. `drift`
+    is whether the state has the drift buckets, so a state saved with
+    --drift is not silently stripped of them by a run without it.
+    """
+    return {'analysisVersion': ANALYSIS_VERSION, 'wholeWords': whole_words, 'dedup': dedup,
+            'categorizer': categorizer, 'drift': drift}
+
+
+def save_state(path: str, accumulators: List[Accumulator], total_emails: int,
+               settings: Dict[str, Any], seen: Iterable[str] = ()):
+    """Write the accumulators' statistics to `path` (replaced atomically).
+
+    `seen` are the email_key()s of the emails they cover.
+    """
+    data = {
+        'format': _FORMAT,
+        'savedAt': datetime.now().isoformat(),
+        'settings': settings,
+        'totalEmails': total_emails,
+        'seenEmails': sorted(seen),
+        'accumulators': {accumulator.name: accumulator.state() for accumulator in accumulators},
+    }
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(temp_path, path)
+
+
+def load_state(path: str, accumulators: List[Accumulator], settings: Dict[str, Any],
+               seen: Optional[Set[str]] = None) -> int:
+    """Load a saved state into the accumulators. Returns its email count.
+
+    The keys of the emails it covers are added to `seen`, if given.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    if data.get('format') != _FORMAT:
+        raise ValueError(f"{path}: unsupported state format {data.get('format')!r}")
+    if data.get('settings') != settings:
+        raise ValueError(
+            f"{path} was saved with different analysis settings "
+            f"({data.get('settings')} vs {settings}); run a full analysis instead"
+        )
+
+    states = data['accumulators']
+    for accumulator in accumulators:
+        if accumulator.name not in states:
+            raise ValueError(f"{path} has no state for '{accumulator.name}'; run a full analysis instead")
+        accumulator.load_state(states[accumulator.name])
+    if seen is not None:
+        seen.update(data['seenEmails'])
+
+    return data['totalEmails']
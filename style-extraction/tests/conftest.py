@@ -0,0 +1,27 @@
+"""Make the style-extraction modules and scripts importable from the tests."""
+
+import importlib.util
+import os
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+# Recipient keys would otherwise use (and create) output/recipient-key.secret
+os.environ['RECIPIENT_KEY_SECRET'] = 'tests'
+
+
+def load_script(name: str):
+    """Import a hyphenated script (e.g. analyze-style.py) as a module."""
+    module_name = name[:-3].replace('-', '_')
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    path = os.path.join(SCRIPTS_DIR, name)
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
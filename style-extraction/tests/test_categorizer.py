@@ -0,0 +1,77 @@
+"""Hashed-feature categorizer: keyword seeds, batching, training and saving."""
+
+import numpy as np
+import pytest
+
+from categorizer import CATEGORY_BODY_CHARS, GENERAL, HashedCategorizer, email_text, stem
+
+
+def email(subject, body):
+    return {'subject': subject, 'body': body}
+
+
+@pytest.fixture(scope='module')
+def categorizer():
+    return HashedCategorizer.from_keywords()
+
+
+@pytest.mark.parametrize('word, stemmed', [
+    ('prices', 'pric'), ('pricing', 'pric'), ('scheduled', 'schedul'), ('schedules', 'schedul'),
+    ('shipping', 'ship'), ('inquiries', 'inquiry'), ('calls', 'call'), ('bus', 'bus'),
+])
+def test_stem(word, stemmed):
+    assert stem(word) == stemmed
+
+
+def test_keywords_pick_the_category(categorizer):
+    emails = [email('Pricing for the deck', 'Here are the numbers.'),
+              email('Hello', 'When is the delivery?'),
+              email('Re: hello', 'I was wondering about your hours'),
+              email('Hi', 'See you soon.')]
+    assert categorizer.categorize(emails) == ['quote_requests', 'delivery_scheduling', 'questions', GENERAL]
+
+
+def test_subject_outweighs_body_and_ties_go_to_the_first(categorizer):
+    assert categorizer.categorize([email('Delivery', 'The quote is attached.')]) == ['delivery_scheduling']
+    # One keyword each in the body: quote_requests is listed first
+    both = categorizer.scores([email_text(email('Hi', 'The quote covers delivery.'))])[0]
+    column = {category: i for i, category in enumerate(categorizer.categories)}
+    assert both[column['quote_requests']] == both[column['delivery_scheduling']] > both[column[GENERAL]]
+    assert categorizer.best(both[None, :]) == ['quote_requests']
+
+
+def test_only_the_start_of_the_body_counts(categorizer):
+    late = email('Hi', 'x ' * CATEGORY_BODY_CHARS + 'quote')
+    assert categorizer.categorize([late]) == [GENERAL]
+
+
+def test_batches_score_like_single_emails(categorizer):
+    # Words at the end of one email never pair with the start of the next
+    emails = [email('Order', 'we need'), email('Pricing', 'quote'), email('', ''), email('x', 'ship it')]
+    batch = categorizer.scores(map(email_text, emails))
+    single = np.vstack([categorizer.scores([email_text(e)]) for e in emails])
+    assert np.array_equal(batch, single)
+
+
+def test_fit_learns_new_categories_and_saves(tmp_path):
+    categorizer = HashedCategorizer.from_keywords()
+    texts = [('invoice', 'please pay the attached invoice'), ('payment', 'the invoice is overdue'),
+             ('quote', 'price for lumber'), ('hi', 'see you friday')] * 5
+    labels = ['billing', 'billing', 'quote_requests', GENERAL] * 5
+    categorizer.fit(texts, labels)
+    assert categorizer.categories[-2:] == ['billing', GENERAL]
+    assert categorizer.categorize([email('Invoice 12', 'Attached.')]) == ['billing']
+    assert categorizer.categorize([email('Pricing', 'for the fence')]) == ['quote_requests']
+
+    path = str(tmp_path / 'categorizer.npz')
+    categorizer.save(path)
+    loaded = HashedCategorizer.load(path)
+    assert loaded.categories == categorizer.categories
+    assert loaded.fingerprint() == categorizer.fingerprint()
+    assert np.array_equal(loaded.scores(texts), categorizer.scores(texts))
+    assert loaded.fingerprint() != HashedCategorizer.from_keywords().fingerprint()
+
+
+def test_fit_needs_one_label_per_email():
+    with pytest.raises(ValueError):
+        HashedCategorizer.from_keywords().fit([('a', 'b')], ['orders', 'orders'])
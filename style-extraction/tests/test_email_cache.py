@@ -0,0 +1,59 @@
+"""Incremental processing cache: keys, eviction and the name dictionary."""
+
+from conftest import load_script
+from email_cache import EmailCache
+
+EMAIL = {'id': 1, 'bodyType': 'text', 'body': 'Hi Dana Smith,\n\nThe Birch lumber is ready for pickup today.\n\nJoe',
+         'toRecipientNames': ['Dana Smith']}
+
+
+def test_key_ignores_the_position_id():
+    cache = EmailCache(':memory:', 'v1')
+    key = cache.key(EMAIL)
+    assert cache.key({**EMAIL, 'id': 99}) == key
+    assert cache.key({**EMAIL, 'body': EMAIL['body'] + '!'}) != key
+    assert cache.key({**EMAIL, 'toRecipientNames': ['Dana Smyth']}) != key
+    assert EmailCache(':memory:', 'v2').key(EMAIL) != key
+
+
+def test_hits_misses_and_eviction(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = EmailCache(path, 'v1')
+    for i in range(3):
+        assert cache.get(f'key{i}') is None
+        cache.put(f'key{i}', f'body{i}', {'total': i})
+    cache.close()
+
+    # Second run sees only key0 and key2; key1 is evicted at the end
+    cache = EmailCache(path, 'v1')
+    assert cache.get('key0') == ('body0', {'total': 0})
+    assert cache.get('key2') == ('body2', {'total': 2})
+    assert (cache.hits, cache.misses) == (2, 0)
+    assert cache.evict_stale() == 1
+    cache.close()
+
+    cache = EmailCache(path, 'v1')
+    assert cache.get('key1') is None
+    assert cache.get('key0') == ('body0', {'total': 0})
+    cache.close()
+
+
+def clean(tmp_path, names):
+    process_emails = load_script('process-emails.py')
+    processor = process_emails.EmailProcessor(cache_file=str(tmp_path / 'cache.sqlite'))
+    processor.set_customer_names(names)
+    try:
+        return processor.process_email(dict(EMAIL))['body'], processor.cache.hits
+    finally:
+        processor.close()
+
+
+def test_changed_name_dictionary_matches_a_cold_run(tmp_path):
+    with_names, _ = clean(tmp_path / 'a', {'Dana', 'Smith', 'Birch'})
+    without_birch, _ = clean(tmp_path / 'b', {'Dana', 'Smith'})
+    assert with_names != without_birch
+
+    # Same cache, dictionary first with and then without "Birch"
+    assert clean(tmp_path, {'Dana', 'Smith', 'Birch'}) == (with_names, 0)
+    assert clean(tmp_path, {'Dana', 'Smith', 'Birch'}) == (with_names, 1)
+    assert clean(tmp_path, {'Dana', 'Smith'}) == (without_birch, 0)
@@ -0,0 +1,45 @@
+"""Similar-email index: documents keyed on content, ids as payload."""
+
+from email_index import EmailIndex
+
+LUMBER = {'subject': 'Lumber', 'body': 'The lumber for the deck is ready for pickup.',
+          'sentDate': '2025-01-06T10:00:00Z', 'recipient': 'r1'}
+DRYWALL = {'subject': 'Drywall', 'body': 'We can deliver the drywall on Friday.',
+           'sentDate': '2025-01-07T10:00:00Z', 'recipient': 'r2'}
+NEW = {'subject': 'Lumber delivery', 'body': 'Can we deliver the lumber for the fence on Monday?',
+       'sentDate': '2025-02-03T10:00:00Z', 'recipient': 'r3'}
+
+
+def extraction(*emails):
+    # Ids are positions, as extract-emails.py numbers them
+    return [dict(email, id=i) for i, email in enumerate(emails)]
+
+
+def test_reextracted_emails_with_reused_ids(tmp_path):
+    path = str(tmp_path / 'index.sqlite')
+    index = EmailIndex(path)
+    assert index.add(extraction(LUMBER, DRYWALL)) == 2
+    index.close()
+
+    # A new email takes id 0; the old ones move to 1 and 2
+    index = EmailIndex(path)
+    assert index.add(extraction(NEW, LUMBER, DRYWALL)) == 1
+    assert len(index) == 3
+    assert [r['id'] for r in index.search(body='lumber deck', k=3)] == [1, 0]
+    assert [r['subject'] for r in index.search(body='lumber', k=3, exclude_ids=[0])] == ['Lumber']
+    index.close()
+
+    # Ids survive reopening; an email missing from the latest extraction loses its id
+    index = EmailIndex(path)
+    assert index.add(extraction(DRYWALL, NEW)) == 0
+    assert {r['subject']: r['id'] for r in index.search(body='lumber drywall', k=3)} == \
+        {'Lumber delivery': 1, 'Drywall': 0, 'Lumber': None}
+    assert 2 not in index
+    index.close()
+
+
+def test_same_email_twice_is_indexed_once(tmp_path):
+    index = EmailIndex(str(tmp_path / 'index.sqlite'))
+    assert index.add(extraction(LUMBER, LUMBER, DRYWALL)) == 2
+    assert [r['id'] for r in index.search(body='lumber', k=5)] == [1]
+    index.close()
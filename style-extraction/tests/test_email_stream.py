@@ -0,0 +1,80 @@
+"""Streaming email reader and writer: round trips in both formats."""
+
+import json
+
+import pytest
+
+from email_stream import EmailStreamReader, EmailStreamWriter, detect_format
+
+EMAILS = [
+    {'id': 1, 'subject': 'Lumber', 'body': 'Hi,\n\nThe 2x4s are in. "Quoted" text \\ here.', 'wordCount': 8},
+    {'id': 2, 'subject': 'Café ☕', 'body': 'Naïve résumé \U0001F600', 'wordCount': 3},
+    {'id': 3, 'subject': '', 'body': '', 'wordCount': 0, 'score': 1.5e-7},
+]
+STATS = {'totalProcessed': 3, 'skipped': 0}
+
+
+def write(path, fmt, emails, metadata=None):
+    with EmailStreamWriter(str(path), fmt) as writer:
+        for email in emails:
+            writer.write(email)
+        writer.close(STATS, metadata)
+
+
+@pytest.mark.parametrize('fmt, name', [('json', 'out.json'), ('jsonl', 'out.jsonl')])
+def test_round_trip(tmp_path, fmt, name):
+    path = tmp_path / name
+    write(path, fmt, EMAILS, {'dateRange': {'from': '2025-01-01'}})
+
+    reader = EmailStreamReader(str(path))
+    assert reader.format == fmt
+    assert list(reader) == EMAILS
+    assert reader.metadata['totalEmails'] == 3
+    assert reader.metadata['processingStats'] == STATS
+    assert reader.metadata['dateRange'] == {'from': '2025-01-01'}
+
+
+def test_json_document_is_valid_json(tmp_path):
+    path = tmp_path / 'out.json'
+    write(path, 'json', EMAILS)
+    document = json.loads(path.read_text(encoding='utf-8'))
+    assert document['emails'] == EMAILS
+    assert document['totalEmails'] == 3
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64])
+def test_values_split_across_chunks(tmp_path, chunk_size):
+    path = tmp_path / 'raw.json'
+    document = {'extractedAt': '2025-06-01T00:00:00Z', 'totalEmails': 3, 'emails': EMAILS, 'trailer': [1, 2.25]}
+    path.write_text('\ufeff' + json.dumps(document, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    reader = EmailStreamReader(str(path), chunk_size=chunk_size)
+    assert list(reader) == EMAILS
+    assert reader.metadata == {'extractedAt': '2025-06-01T00:00:00Z', 'totalEmails': 3, 'trailer': [1, 2.25]}
+
+
+def test_empty_email_list(tmp_path):
+    for fmt in ('json', 'jsonl'):
+        path = tmp_path / f'empty.{fmt}'
+        write(path, fmt, [])
+        reader = EmailStreamReader(str(path))
+        assert list(reader) == []
+        assert reader.metadata['totalEmails'] == 0
+
+
+def test_detect_format(tmp_path):
+    one_line = tmp_path / 'one-line.txt'
+    one_line.write_text(json.dumps({'emails': EMAILS}) + '\n', encoding='utf-8')
+    assert detect_format(str(one_line)) == 'json'
+
+    records = tmp_path / 'records.txt'
+    records.write_text(''.join(json.dumps(email) + '\n' for email in EMAILS), encoding='utf-8')
+    assert detect_format(str(records)) == 'jsonl'
+    assert list(EmailStreamReader(str(records))) == EMAILS
+
+
+def test_invalid_jsonl_record_names_the_line(tmp_path):
+    path = tmp_path / 'bad.jsonl'
+    path.write_text(json.dumps(EMAILS[0]) + '\n{"id": 2, "body": \n', encoding='utf-8')
+    with pytest.raises(ValueError, match='bad.jsonl:2'):
+        list(EmailStreamReader(str(path)))
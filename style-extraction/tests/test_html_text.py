@@ -0,0 +1,60 @@
+"""HTML-to-text conversion: skipped elements, entities and block layout."""
+
+import pytest
+
+from html_text import html_to_text
+
+
+@pytest.mark.parametrize('markup', [
+    '<p>Hi</p><script>var a="<!--";</script><p>Bye <b>there</b></p>',
+    '<p>Hi</p><style>/* <p>not shown</p> */ p { color: red }</style><p>Bye <b>there</b></p>',
+    '<p>Hi</p><script>if (a < b && c > d) { x = "<![CDATA[" }</script><p>Bye <b>there</b></p>',
+    '<head><title>Re: <b>x</b></title><!-- </head> --></head><body><p>Hi</p><p>Bye there</p></body>',
+])
+def test_skipped_content_never_starts_a_token(markup):
+    text = html_to_text(markup)
+    assert text.endswith('Bye there')
+    assert '<' not in text and 'not shown' not in text
+
+
+def test_unclosed_script_drops_the_rest():
+    assert html_to_text('<p>Hi</p><script>var a = "<!--"; <p>never') == 'Hi'
+
+
+def test_head_without_closing_tag_ends_at_body():
+    assert html_to_text('<html><head><meta charset="utf-8"><title>T</title><body><p>Hello</p></body>') == 'Hello'
+
+
+def test_entities():
+    # &nbsp; is whitespace like any other and collapses to a space
+    assert html_to_text('<p>Tom &amp; Jerry&#8217;s &lt;shop&gt; &#x41;&nbsp;B &eacute;t&eacute; &bogus;</p>') == \
+        'Tom & Jerry’s <shop> A B été &bogus;'
+
+
+def test_paragraphs_and_line_breaks():
+    # Only paragraphs end with a blank line; spacer paragraphs add none
+    markup = '<div>Hi Pat,</div><p>First   line<br>second\nline</p><p>&nbsp;</p><p>Thanks,<br/>Joe</p>'
+    assert html_to_text(markup) == 'Hi Pat,\nFirst line\nsecond line\n\nThanks,\nJoe'
+
+
+def test_lists_tables_and_headings():
+    markup = ('<h1>Order</h1><ul><li>2x4s</li><li>Drywall</li></ul>'
+              '<table><tr><td>Item</td><td>Qty</td></tr><tr><th>PVC</th><td>3</td></tr></table>')
+    assert html_to_text(markup) == 'Order\n2x4s\nDrywall\nItem Qty\nPVC 3'
+
+
+def test_inline_elements_keep_words_together():
+    assert html_to_text('<p>Se<b>nd</b> it <a href="x">here</a>, <span>ok</span>?</p>') == 'Send it here, ok?'
+
+
+def test_pre_keeps_whitespace():
+    assert html_to_text('<p>Code:</p><pre>a  =  1\n  b = 2\n</pre><p>Done</p>') == 'Code:\n\na  =  1\n  b = 2\nDone'
+
+
+def test_comments_and_outlook_conditionals():
+    markup = '<!--[if mso]><p>mso only</p><![endif]--><![if !mso]><p>Hello</p><![endif]><!-- unterminated'
+    assert html_to_text(markup) == 'Hello'
+
+
+def test_text_after_the_last_tag():
+    assert html_to_text('<p>Hi</p>Bye &amp; a > b') == 'Hi\n\nBye & a > b'
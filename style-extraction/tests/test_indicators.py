@@ -0,0 +1,39 @@
+"""Tone indicator scanning: substring and whole-word matching."""
+
+from indicators import TONE_INDICATORS, IndicatorScanner, style_indicator_scanner
+
+GROUPS = [('a', ['ask', 'thanks', 'looking forward', '!']), ('b', ['ask', 'ship'])]
+
+
+def test_substrings_match_inside_words():
+    found = IndicatorScanner(GROUPS).scan('put it in the basket, thanks!')
+    assert found == {'a': {'ask': 18, 'thanks': 28, '!': 29}, 'b': {'ask': 18}}
+
+
+def test_whole_words_skip_words_inside_words():
+    scanner = IndicatorScanner(GROUPS, whole_words=True)
+    assert scanner.scan('put it in the basket. thanksgiving: friendship!') == {'a': {'!': 47}}
+    assert scanner.scan('can i ask? thanks, looking forward!') == {
+        'a': {'ask': 9, 'thanks': 17, 'looking forward': 34, '!': 35}, 'b': {'ask': 9}}
+
+
+def test_first_hit_is_reported():
+    found = IndicatorScanner(GROUPS, whole_words=True).scan('ship it. ship it again.')
+    assert found == {'b': {'ship': 4}}
+
+
+def test_term_by_term_and_compiled_scans_agree():
+    texts = ['hey, thanks! please find attached, kindly reply.', 'great work, glad to help',
+             'dearest: per our discussion, i am writing to ask', '']
+    term_by_term = IndicatorScanner(TONE_INDICATORS.items())
+    compiled = IndicatorScanner(TONE_INDICATORS.items(), substring_max_terms=0)
+    assert term_by_term.matcher is None and compiled.matcher is not None
+    for text in texts:
+        assert term_by_term.scan(text) == compiled.scan(text)
+
+
+def test_whole_words_on_tone_indicators():
+    scanner = style_indicator_scanner(whole_words=True)
+    # 'dear' is not in 'dearest', 'great' not in 'greatly'
+    assert scanner.scan('dearest pat, greatly appreciated') == {}
+    assert scanner.scan('dear pat, great') == {'formal': {'dear': 4}, 'friendly': {'great': 15}}
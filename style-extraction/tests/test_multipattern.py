@@ -0,0 +1,73 @@
+"""Trie-compiled multi-pattern matcher: whole words, overlaps and case."""
+
+import random
+import re
+
+from multipattern import MultiPatternMatcher
+
+
+def naive_matches(patterns, text, word_boundaries=True):
+    """Every hit of every pattern, found one pattern at a time."""
+    hits = []
+    for pattern in patterns:
+        source = re.escape(pattern)
+        if word_boundaries:
+            if re.match(r'\w', pattern[0]):
+                source = r'(?<!\w)' + source
+            if re.match(r'\w', pattern[-1]):
+                source += r'(?!\w)'
+        hits += [(m.start(), m.start() + len(pattern), pattern) for m in re.finditer(f'(?=({source}))', text)]
+    return sorted(hits, key=lambda hit: (hit[0], -hit[1]))
+
+
+def test_whole_words_only():
+    matcher = MultiPatternMatcher(['ann', 'new york', 'new'])
+    assert matcher.find_all('Annual plan for ann, new yorker and new york.') == [
+        (16, 19, 'ann'), (21, 24, 'new'), (36, 44, 'new york')]
+
+
+def test_punctuation_patterns_match_next_to_anything():
+    matcher = MultiPatternMatcher(['!', 'asap!', 'thanks'])
+    assert matcher.find_all('Thanks!! asap!') == [(6, 7, '!'), (7, 8, '!'), (9, 14, 'asap!')]
+
+
+def test_overlapping_hits_and_longest_first():
+    matcher = MultiPatternMatcher([('mary', 'first'), ('mary ann', 'full'), ('ann', 'first')])
+    text = 'mary ann smith'
+    assert list(matcher.iter_matches(text)) == [(0, 8, 'full'), (0, 4, 'first'), (5, 8, 'first')]
+    assert matcher.find_all(text) == [(0, 8, 'full')]
+    assert matcher.replace(text, lambda match: f'[{match[2]}]') == '[full] smith'
+
+
+def test_without_word_boundaries():
+    matcher = MultiPatternMatcher(['ann'], word_boundaries=False)
+    assert matcher.replace('annual ann', '#') == '#ual #'
+
+
+def test_ignore_case_keeps_offsets():
+    matcher = MultiPatternMatcher(['joe smith'], ignore_case=True)
+    # 'İ' lowercases to two characters; offsets must still point into the original
+    text = 'İİ JOE Smith'
+    assert matcher.find_all(text) == [(3, 12, 'joe smith')]
+    assert 'JOE SMITH' in matcher
+
+
+def test_patterns_added_after_a_scan():
+    matcher = MultiPatternMatcher(['pat'])
+    assert matcher.replace('pat and sam', '[name]') == '[name] and sam'
+    matcher.add('sam')
+    assert matcher.replace('pat and sam', '[name]') == '[name] and [name]'
+    assert len(matcher) == 2
+
+
+def test_agrees_with_one_regex_per_pattern():
+    rng = random.Random(5)
+    alphabet = 'ab _-'
+    for _ in range(300):
+        patterns = {''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(6)}
+        patterns = sorted(p for p in patterns if p.strip())
+        text = ''.join(rng.choice(alphabet) for _ in range(30))
+        for word_boundaries in (True, False):
+            matcher = MultiPatternMatcher(patterns, word_boundaries=word_boundaries)
+            assert sorted(matcher.iter_matches(text), key=lambda hit: (hit[0], -hit[1])) == \
+                naive_matches(patterns, text, word_boundaries), (patterns, text)
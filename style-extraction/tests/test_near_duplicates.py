@@ -0,0 +1,70 @@
+"""Near-duplicate collapsing: exact similarity check, weights and order."""
+
+import pytest
+
+from near_duplicates import (WEIGHT_FIELD, NearDuplicateCollapser, collapse_near_duplicates, jaccard,
+                             shingle_hashes, signature, similarity)
+
+TEMPLATE = ('Hi [Customer], thanks for your order of {} sheets of drywall. We will deliver it on '
+            'Friday morning between eight and ten, and the driver will call ahead before arriving. '
+            'Let me know if anything changes on your end. Thanks, Joe')
+OTHER = ('Hello [Customer], the quote for the deck lumber is attached. Pricing holds for thirty days '
+         'and includes delivery to the site. Give me a call with any questions. Best, Joe')
+
+
+def email(i, body):
+    return {'id': i, 'body': body}
+
+
+def test_template_variants_collapse_with_weights():
+    emails = [email(0, TEMPLATE.format(12)), email(1, OTHER), email(2, TEMPLATE.format(40)),
+              email(3, TEMPLATE.format(7))]
+    representatives = collapse_near_duplicates(emails)
+    assert [(r['id'], r[WEIGHT_FIELD]) for r in representatives] == [(0, 3), (1, 1)]
+    # Inputs are copied, not marked
+    assert WEIGHT_FIELD not in emails[0]
+
+
+def test_weights_of_collapsed_records_add_up():
+    collapser = NearDuplicateCollapser()
+    collapser.add_all([{'id': 0, 'body': TEMPLATE.format(1), WEIGHT_FIELD: 5},
+                       {'id': 1, 'body': TEMPLATE.format(2), WEIGHT_FIELD: 3}])
+    assert collapser.emails == 8
+    assert collapser.representatives[0][WEIGHT_FIELD] == 8
+
+
+def test_exact_similarity_decides():
+    first = TEMPLATE.format(12)
+    second = first.replace('the driver will call ahead', 'we will text you')
+    # The signatures estimate 0.8, but only 0.71 of the shingles are shared
+    assert similarity(signature(first), signature(second)) >= 0.8
+    exact = jaccard(frozenset(shingle_hashes(first)), frozenset(shingle_hashes(second)))
+    assert exact < 0.72
+    assert len(collapse_near_duplicates([email(0, first), email(1, second)])) == 2
+    assert len(collapse_near_duplicates([email(0, first), email(1, second)], threshold=0.7)) == 1
+
+
+def test_identical_emails_join_the_first():
+    emails = [email(0, TEMPLATE.format(1)), email(1, OTHER), email(2, OTHER), email(3, TEMPLATE.format(1))]
+    assert [r[WEIGHT_FIELD] for r in collapse_near_duplicates(emails, threshold=1.0)] == [2, 2]
+
+
+def test_signatures_are_stable_and_estimate_similarity():
+    a, b = TEMPLATE.format(12), TEMPLATE.format(40)
+    assert signature(a) == signature(a.upper())
+    assert similarity(signature(a), signature(a)) == 1.0
+    exact = jaccard(frozenset(shingle_hashes(a)), frozenset(shingle_hashes(b)))
+    assert abs(similarity(signature(a), signature(b)) - exact) < 0.15
+    assert similarity(signature(a), signature(OTHER)) < 0.2
+
+
+def test_short_and_empty_bodies():
+    emails = [email(0, 'Ok.'), email(1, 'ok'), email(2, ''), email(3, 'Thanks')]
+    assert [r['id'] for r in collapse_near_duplicates(emails)] == [0, 2, 3]
+
+
+def test_threshold_must_be_a_similarity():
+    with pytest.raises(ValueError):
+        NearDuplicateCollapser(0)
+    with pytest.raises(ValueError):
+        NearDuplicateCollapser(1.5)
@@ -0,0 +1,134 @@
+"""--workers must give the same profile as a serial run, percentiles included."""
+
+import json
+import math
+import random
+
+import pytest
+
+from conftest import load_script
+from sketches import QuantileSketch
+
+SENTENCES = [
+    "Thanks for reaching out about the lumber order.",
+    "We can deliver the drywall on Friday morning",
+    "Let me know if the quote works for you!",
+    "The 2x4s are back in stock and ready for pickup.",
+    "I checked with the yard and we have plenty of PVC in the back",
+    "Could you send over the measurements when you get a chance?",
+    "Sorry for the delay, the truck broke down on the way over.",
+    "Appreciate the business",
+    "Our crew will be there around eight to unload everything and walk the site with you before starting.",
+    "Ok.",
+]
+GREETINGS = ["Hi [Customer],", "Hello [Customer],", "Good morning [Customer],", ""]
+SIGNOFFS = ["Thanks,\nJoe", "Best,\nJoe", "Cheers,\nJoe", "Joe", ""]
+SUBJECTS = ["Quote for lumber", "Delivery schedule", "Your order", "Question about drywall"]
+
+
+def make_emails(count, seed=3):
+    rng = random.Random(seed)
+    emails = []
+    for i in range(count):
+        paragraphs = [
+            ' '.join(rng.choice(SENTENCES) for _ in range(rng.randint(1, 8)))
+            for _ in range(rng.randint(1, 6))
+        ]
+        body = '\n\n'.join([rng.choice(GREETINGS)] + paragraphs + [rng.choice(SIGNOFFS)]).strip()
+        emails.append({
+            'id': i,
+            'subject': rng.choice(SUBJECTS),
+            'body': body,
+            'wordCount': len(body.split()),
+            'recipient': f'r{rng.randrange(40):016x}',
+            'recipientDomain': f'example{rng.randrange(8)}.com',
+            'sentDate': f'2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T10:00:00Z',
+        })
+    return emails
+
+
+@pytest.fixture(scope='module')
+def emails():
+    # Several thousand sentence lengths, so a KLL sketch would have compacted
+    return make_emails(3000)
+
+
+def analyze(emails, workers):
+    analyze_style = load_script('analyze-style.py')
+    # A drift file turns on the drift buckets; extract_features() does not write it
+    analyzer = analyze_style.StyleAnalyzer(workers=workers, drift_file='style-drift.json')
+    analyzer.emails = emails
+    return analyzer.extract_features()
+
+
+@pytest.mark.parametrize('workers', [2, 3])
+def test_workers_match_serial(emails, workers):
+    assert analyze(emails, workers) == analyze(emails, 1)
+
+
+def test_streamed_shards_match_serial(emails):
+    # An iterator is cut into fixed-size shards rather than one per worker
+    analyze_style = load_script('analyze-style.py')
+    analyzer = analyze_style.StyleAnalyzer(workers=2)
+    streamed = analyzer.extract_features(emails=iter(emails), shard_size=700)
+    serial = analyze_style.StyleAnalyzer(workers=1)
+    serial.emails = emails
+    assert streamed == serial.extract_features()
+
+
+def run_analysis(directory, emails, workers, update=False):
+    """Run analyze-style.py end to end; the profile and training samples it writes."""
+    analyze_style = load_script('analyze-style.py')
+    input_file = directory / f'cleaned-{workers}-{update}.json'
+    input_file.write_text(json.dumps({'emails': emails}))
+    analyzer = analyze_style.StyleAnalyzer(str(input_file), str(directory / f'profile-{workers}.json'),
+                                           state_file=str(directory / f'state-{workers}.json'),
+                                           update=update, workers=workers)
+    analyzer.training_output = str(directory / f'training-{workers}.txt')
+    analyzer.run()
+    with open(analyzer.output_file, encoding='utf-8') as f:
+        profile = json.load(f)
+    del profile['generated_at']
+    with open(analyzer.training_output, encoding='utf-8') as f:
+        training = [line for line in f if not line.startswith('# Generated:')]
+    return profile, training
+
+
+@pytest.mark.parametrize('workers', [2, 4])
+def test_workers_write_the_serial_profile(tmp_path, emails, workers):
+    serial = run_analysis(tmp_path, emails[:1500], 1)
+    assert run_analysis(tmp_path, emails[:1500], workers) == serial
+
+    # Updating a saved state in parallel also matches the serial update
+    serial = run_analysis(tmp_path, emails[1500:], 1, update=True)
+    assert run_analysis(tmp_path, emails[1500:], workers, update=True) == serial
+
+
+def test_quantiles_are_exact_and_merge_in_any_split():
+    rng = random.Random(7)
+    values = [rng.randint(0, 300) for _ in range(20000)]
+    single = QuantileSketch()
+    single.add_all(values)
+
+    merged = QuantileSketch()
+    for start in range(0, len(values), 3000):
+        shard = QuantileSketch()
+        shard.add_all(values[start:start + 3000])
+        merged.merge(shard)
+
+    # Nearest rank: the value at rank ceil(q * n)
+    ordered = sorted(values)
+    expected = [ordered[math.ceil(q * len(values)) - 1] for q in (0.5, 0.9, 0.99)]
+    assert single.quantiles([0.5, 0.9, 0.99]) == expected
+    assert merged.quantiles([0.5, 0.9, 0.99]) == expected
+
+
+def test_quantiles_sketch_past_the_exact_limit():
+    sketch = QuantileSketch(exact_values=100)
+    sketch.add_all(list(range(10000)))
+    assert sketch.exact is None
+    assert abs(sketch.quantile(0.5) - 5000) < 200
+
+    restored = QuantileSketch()
+    restored.load_state(sketch.state())
+    assert restored.quantiles([0.1, 0.9]) == sketch.quantiles([0.1, 0.9])
@@ -0,0 +1,115 @@
+"""Recipient keys and per-recipient partitions: the key secret and eviction."""
+
+import os
+import stat
+
+import pytest
+
+import recipients
+from recipient_profiles import MIN_PROFILE_EMAILS, PartitionedCounts
+
+STATS = ('Hi', 'Thanks', {'friendly': 1}, {'email_length': [20]})
+
+
+@pytest.fixture
+def fresh_key(monkeypatch, tmp_path):
+    """No secret in the environment and a key file under tmp_path."""
+    path = tmp_path / 'output' / 'recipient-key.secret'
+    monkeypatch.delenv('RECIPIENT_KEY_SECRET')
+    monkeypatch.setenv('RECIPIENT_KEY_FILE', str(path))
+    monkeypatch.setattr(recipients, '_key', None)
+    return path
+
+
+def test_secret_is_generated_once_and_kept(fresh_key, monkeypatch):
+    key = recipients.recipient_key(' Pat@Example.com ')
+    assert fresh_key.exists() and len(fresh_key.read_text().strip()) == 64
+    if os.name == 'posix':
+        assert stat.S_IMODE(fresh_key.stat().st_mode) == 0o600
+    assert recipients.recipient_key('pat@example.com') == key
+
+    # A later run reads the same file
+    monkeypatch.setattr(recipients, '_key', None)
+    assert recipients.recipient_key('pat@example.com') == key
+
+    # Another secret gives other keys; an unkeyed hash is never used
+    fresh_key.unlink()
+    monkeypatch.setattr(recipients, '_key', None)
+    assert recipients.recipient_key('pat@example.com') != key
+
+
+def test_environment_secret_wins(fresh_key, monkeypatch):
+    monkeypatch.setenv('RECIPIENT_KEY_SECRET', 'shared')
+    key = recipients.recipient_key('pat@example.com')
+    assert not fresh_key.exists()
+    monkeypatch.setattr(recipients, '_key', None)
+    monkeypatch.setenv('RECIPIENT_KEY_SECRET', 'other')
+    assert recipients.recipient_key('pat@example.com') != key
+
+
+def test_empty_key_file_is_an_error(fresh_key):
+    fresh_key.parent.mkdir()
+    fresh_key.write_text('\n')
+    with pytest.raises(ValueError):
+        recipients.recipient_key('pat@example.com')
+
+
+def test_find_profile_prefers_the_recipient():
+    key = recipients.recipient_key('pat@example.com')
+    profiles = {'recipients': {key: 'pat'}, 'domains': {'example.com': 'example'}}
+    assert recipients.find_profile(profiles, address='Pat@Example.com') == ('recipient', 'pat')
+    assert recipients.find_profile(profiles, address='sam@example.com') == ('domain', 'example')
+    assert recipients.find_profile(profiles, domain='other.com') == ('none', None)
+
+
+def total_emails(partitioned):
+    return sum(counts.emails for counts in partitioned.partitions.values()) + partitioned.other.emails
+
+
+def test_partitions_are_exact_below_capacity():
+    partitioned = PartitionedCounts(8)
+    for key, count in (('a', 7), ('b', 2), ('c', MIN_PROFILE_EMAILS)):
+        for _ in range(count):
+            partitioned.add(key, 1, *STATS)
+    top = partitioned.top(5)
+    # 'b' has too few emails to report
+    assert list(top) == ['a', 'c']
+    assert top['a']['emails'] == 7 and 'complete' not in top['a']
+    assert partitioned.other.emails == 0
+
+
+def test_evicted_partitions_fold_into_other():
+    partitioned = PartitionedCounts(8)
+    for i in range(60):
+        partitioned.add('heavy', 2, *STATS)
+        partitioned.add(f'once{i}', 1, *STATS)
+        if i >= 30:
+            partitioned.add('late', 4, *STATS)
+
+    assert set(partitioned.partitions) == set(partitioned.sketch.counts)
+    assert total_emails(partitioned) == 60 * 2 + 60 + 30 * 4
+    assert partitioned.other.emails > 0
+    top = partitioned.top(2)
+    assert top['heavy']['emails'] == 120 and 'complete' not in top['heavy']
+    # Admitted after evictions: only counts mail since then
+    assert top['late']['complete'] is False
+
+
+def test_merge_and_state_keep_every_email():
+    shards = []
+    for shard in range(3):
+        partitioned = PartitionedCounts(4)
+        for i in range(20):
+            partitioned.add('heavy', 1, *STATS)
+            partitioned.add(f's{shard}-{i}', 1, *STATS)
+        restored = PartitionedCounts(4)
+        restored.load_state(partitioned.state())
+        assert restored.top(1) == partitioned.top(1)
+        shards.append(restored)
+
+    merged = shards[0]
+    for shard in shards[1:]:
+        merged.merge(shard)
+    assert set(merged.partitions) == set(merged.sketch.counts)
+    assert total_emails(merged) == 120
+    assert merged.top(1)['heavy']['emails'] == 60
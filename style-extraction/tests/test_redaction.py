@@ -0,0 +1,60 @@
+"""Single-pass redactor: priority, overlaps and the cleaning patterns."""
+
+import pytest
+
+from conftest import load_script
+from redaction import Redactor
+
+
+def test_priority_decides_matches_at_the_same_position():
+    patterns = {'digits': r'\d+', 'long': r'\d{4,}'}
+    replacements = {'digits': '[n]', 'long': '[long]'}
+
+    assert Redactor(patterns, replacements, ['long', 'digits']).redact('id 12345 or 12') == (
+        'id [long] or [n]', {'long': 1, 'digits': 1})
+    assert Redactor(patterns, replacements, ['digits', 'long']).redact('id 12345 or 12') == (
+        'id [n] or [n]', {'digits': 2, 'long': 0})
+
+
+def test_earliest_match_wins_over_priority():
+    redactor = Redactor({'short': 'bc', 'wide': 'abc'}, {}, ['short', 'wide'])
+    assert redactor.redact('xabcd') == ('x[removed]d', {'short': 0, 'wide': 1})
+
+
+def test_consumed_text_is_not_matched_again():
+    redactor = Redactor({'card': r'\d{4} \d{4}', 'number': r'\d{4}'}, {'card': '[card]', 'number': '[number]'})
+    assert redactor.redact('1234 5678 9012') == ('[card] [number]', {'card': 1, 'number': 1})
+
+
+def test_unknown_priority_name():
+    with pytest.raises(ValueError, match='missing'):
+        Redactor({'email': r'\S+@\S+'}, {}, ['email', 'missing'])
+
+
+def test_time_patterns_leaves_the_text_alone():
+    redactor = Redactor({'email': r'\S+@\S+', 'digits': r'\d+'}, {})
+    assert set(redactor.time_patterns('mail a@b.com 123')) == {'email', 'digits'}
+    assert redactor.redact('mail a@b.com')[0] == 'mail [removed]'
+
+
+@pytest.fixture(scope='module')
+def redactor():
+    return load_script('process-emails.py').REDACTOR
+
+
+def test_card_is_not_a_phone(redactor):
+    text, counts = redactor.redact('Card 4111 1111 1111 1111 or call 555-123-4567.')
+    assert text == 'Card [card number removed] or call [phone removed].'
+    assert counts['credit_card'] == 1 and counts['phone'] == 1
+
+
+def test_email_with_digits_is_one_email(redactor):
+    text, counts = redactor.redact('Write to joe5551234567@example.com today')
+    assert text == 'Write to [email removed] today'
+    assert counts['email'] == 1 and counts['phone'] == 0
+
+
+def test_ssn_before_phone_and_account_numbers(redactor):
+    text, counts = redactor.redact('SSN 123-45-6789, Account #: 998877, total $1,250.00')
+    assert text == 'SSN [SSN removed], [account removed], total $[amount]'
+    assert (counts['ssn'], counts['account_number'], counts['currency'], counts['phone']) == (1, 1, 1, 0)
@@ -0,0 +1,62 @@
+"""Reply-chain detection: boundaries, false positives and the time budget."""
+
+import time
+
+import pytest
+
+from reply_quotes import TimeBudgetExceeded, find_quote_start, strip_quoted, time_patterns
+
+OWN = 'Hi Pat,\n\nThe lumber is ready.\n\nThanks,\nJoe'
+
+
+@pytest.mark.parametrize('quoted', [
+    'On Mon, Jan 6, 2025 at 10:00 AM Pat Smith <pat@example.com> wrote:\n> When is it ready?',
+    'On Mon, Jan 6, 2025 at 10:00 AM Pat Smith\n<pat@example.com>\nwrote:\n\nWhen is it ready?',
+    'From: Pat Smith\nSent: Monday, January 6, 2025 10:00 AM\nTo: Joe\nSubject: Lumber\n\nWhen?',
+    '*From:* Pat Smith\n\n*Subject:* Lumber\n\nWhen?',
+    '-----Original Message-----\nFrom: Pat\nWhen?',
+    '---------- Forwarded message ---------\nFrom: Pat\nWhen?',
+    '________________________________\nFrom: Pat\nWhen?',
+    '> When is it ready?\n> Pat',
+])
+def test_quoted_part_is_removed(quoted):
+    assert strip_quoted(f'{OWN}\n\n{quoted}') == OWN
+
+
+def test_nothing_quoted():
+    assert strip_quoted(OWN) is None
+
+
+@pytest.mark.parametrize('line', [
+    'On Monday we can deliver the drywall.',
+    'From: the yard, we have plenty of PVC.',
+    'We ship --- fast --- every day.',
+])
+def test_ordinary_lines_are_not_boundaries(line):
+    text = f'{OWN}\n{line}\nMore text.'
+    assert strip_quoted(text) is None
+
+
+def test_earliest_boundary_wins():
+    text = 'Sure.\n> quoted\nOn Mon, Pat wrote:\n> older'
+    assert find_quote_start(text.split('\n')) == 1
+
+
+def test_time_budget():
+    # No boundary anywhere, so every line is checked
+    lines = ['plain line of text'] * 10000
+    with pytest.raises(TimeBudgetExceeded):
+        find_quote_start(lines, deadline=time.perf_counter() - 1)
+    assert find_quote_start(lines, deadline=time.perf_counter() + 60) is None
+
+
+def test_long_bodies_scan_in_linear_time():
+    # Lines that each start a candidate header but never complete one
+    body = '\n'.join(['On the 5th', 'From: Pat'] * 20000)
+    start = time.perf_counter()
+    assert strip_quoted(body) is None
+    assert time.perf_counter() - start < 2
+
+
+def test_time_patterns_names_every_check():
+    assert set(time_patterns(OWN)) == {'separator', 'reply_start', 'from_field', 'header_field', 'wrote'}
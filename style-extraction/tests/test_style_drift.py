@@ -0,0 +1,97 @@
+"""Style drift: adding and subtracting buckets, the sliding window and decay."""
+
+import random
+from datetime import date
+
+from indicators import style_indicator_scanner
+from style_drift import DriftAccumulator, SlidingWindow, StyleCounts, week_start
+from style_features import EmailFeatures
+
+GREETINGS = ['Hi', 'Hello', None]
+SIGNOFFS = ['Thanks', 'Best', None]
+
+
+def random_bucket(rng):
+    counts = StyleCounts()
+    for _ in range(rng.randint(0, 6)):
+        counts.add_email(rng.randint(1, 3), rng.choice(GREETINGS), rng.choice(SIGNOFFS),
+                         {'formal': rng.randint(0, 2), 'friendly': rng.randint(0, 3)},
+                         {'email_length': [rng.randint(5, 200)],
+                          'sentence_length': [rng.randint(1, 30) for _ in range(rng.randint(1, 5))],
+                          'paragraph_count': [rng.randint(1, 6)]})
+    return counts
+
+
+def test_add_email_moments():
+    counts = StyleCounts()
+    counts.add_email(2, 'Hi', None, {'formal': 1}, {'email_length': [10], 'sentence_length': [3, 5]})
+    assert counts.emails == 2 and counts.greetings == {'Hi': 2} and counts.tone == {'formal': 2}
+    assert counts.lengths['sentence_length'] == [4, 16, 68]
+    summary = counts.summary()
+    assert summary['greetings'] == {'Hi': 100.0} and summary['sign_offs'] == {}
+    assert summary['sentence_length'] == {'mean': 4.0, 'std_dev': 1.0}
+
+
+def test_subtract_undoes_add():
+    rng = random.Random(1)
+    base, other = random_bucket(rng), random_bucket(rng)
+    expected = base.summary()
+    base.add(other)
+    base.subtract(other)
+    assert base.summary() == expected
+
+
+def test_sliding_window_matches_summing_the_last_weeks():
+    rng = random.Random(2)
+    buckets = [random_bucket(rng) for _ in range(40)]
+    window = SlidingWindow(6)
+    for end, bucket in enumerate(buckets, 1):
+        window.push(bucket)
+        direct = StyleCounts()
+        for week in buckets[max(0, end - 6):end]:
+            direct.add(week)
+        assert window.full == (end >= 6)
+        assert window.counts.summary() == direct.summary()
+
+
+def features(sent, body, subject='Hello'):
+    return EmailFeatures({'subject': subject, 'body': body, 'sentDate': sent}, style_indicator_scanner())
+
+
+def test_weeks_months_rolling_and_undated():
+    drift = DriftAccumulator(window_days=14, half_life_days=7)
+    for sent in ('2025-01-06T09:00:00Z', '2025-01-12T09:00:00Z', '2025-01-27T09:00:00Z', '', 'soon'):
+        drift.add(features(sent, 'Hi Pat,\n\nThe lumber is ready.\n\nThanks,\nJoe'))
+    result = drift.result()
+    assert [week['period'] for week in result['weekly']] == ['2025-01-06', '2025-01-27']
+    assert [month['emails'] for month in result['monthly']] == [3]
+    assert result['undated_emails'] == 2 and result['latest_week'] == '2025-01-27'
+    # Two-week windows ending with each week, empty weeks included
+    assert [(window['end'], window['emails']) for window in result['rolling']] == [
+        ('2025-01-19', 2), ('2025-01-26', 0), ('2025-02-02', 1)]
+    # Three weeks before the latest: each counts 0.5 ** 3
+    assert result['current']['emails'] == round(1 + 2 * 0.125, 1)
+
+
+def test_merge_and_state_match_one_pass():
+    rng = random.Random(3)
+    emails = [(f'2025-{rng.randint(1, 6):02d}-{rng.randint(1, 28):02d}',
+               rng.choice(['Hi,\n\nOk.\n\nJoe', 'Thanks!'])) for _ in range(200)]
+    single = DriftAccumulator()
+    for sent, body in emails:
+        single.add(features(sent, body))
+
+    merged = DriftAccumulator()
+    for start in range(0, len(emails), 70):
+        shard = DriftAccumulator()
+        for sent, body in emails[start:start + 70]:
+            shard.add(features(sent, body))
+        restored = DriftAccumulator()
+        restored.load_state(shard.state())
+        merged.merge(restored)
+    assert merged.result() == single.result()
+
+
+def test_week_start():
+    assert week_start(date(2025, 1, 12)) == date(2025, 1, 6)
+    assert week_start(date(2025, 1, 6)) == date(2025, 1, 6)